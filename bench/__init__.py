@@ -0,0 +1,3 @@
+"""
+Benchmark de carga do backend (python -m bench.runner --help)
+"""
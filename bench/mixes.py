@@ -0,0 +1,217 @@
+"""
+Mixes de tráfego por blueprint (questoes, dashboard, jogos, planos)
+
+Cada passo monta uma requisição para um usuário virtual; o peso define a
+frequência relativa dentro do mix. Passos que dependem de estado (jogada
+precisa de uma sessão iniciada) usam o contexto do usuário virtual.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .seed import BLOCO_PADRAO, CARGO_PADRAO
+
+
+@dataclass
+class UsuarioVirtual:
+    """Estado de um usuário simulado durante o benchmark"""
+    usuario_id: str
+    aleatorio: random.Random
+    sessao_jogo: Optional[str] = None
+    letras_tentadas: List[str] = field(default_factory=list)
+    questoes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Requisicao:
+    metodo: str
+    caminho: str
+    json: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+
+
+@dataclass
+class Passo:
+    nome: str
+    peso: float
+    montar: Callable[[UsuarioVirtual], Optional[Requisicao]]
+    ao_responder: Optional[Callable[[UsuarioVirtual, Dict[str, Any]], None]] = None
+
+
+def _bearer(usuario: UsuarioVirtual) -> Dict[str, str]:
+    return {'Authorization': f"Bearer {usuario.usuario_id}"}
+
+
+# ----------------------------------------------------------------------
+# questoes
+# ----------------------------------------------------------------------
+
+def _gerar_questao(usuario):
+    return Requisicao('POST', '/api/questoes/gerar', {
+        'usuario_id': usuario.usuario_id,
+        'cargo': CARGO_PADRAO,
+        'bloco': BLOCO_PADRAO,
+        'tipo_conhecimento': usuario.aleatorio.choice(['todos', 'conhecimentos_gerais', 'conhecimentos_especificos']),
+    })
+
+
+def _guardar_questao(usuario, resposta):
+    questao = resposta.get('questao') or {}
+    if questao.get('id'):
+        usuario.questoes = (usuario.questoes + [questao['id']])[-20:]
+
+
+def _responder_questao(usuario):
+    questao_id = usuario.aleatorio.choice(usuario.questoes) if usuario.questoes else f"q-{usuario.usuario_id}"
+    return Requisicao('POST', '/api/questoes/responder', {
+        'questao_id': questao_id,
+        'usuario_id': usuario.usuario_id,
+        'alternativa_escolhida': usuario.aleatorio.choice('ABCDE'),
+        'tempo_resposta': usuario.aleatorio.randint(20, 180),
+    })
+
+
+def _macetes(usuario):
+    questao_id = usuario.questoes[-1] if usuario.questoes else 'q-bench'
+    return Requisicao('GET', f"/api/questoes/macetes/{questao_id}")
+
+
+QUESTOES = [
+    Passo('questoes.gerar', 3, _gerar_questao, _guardar_questao),
+    Passo('questoes.responder', 4, _responder_questao),
+    Passo('questoes.historico', 2, lambda u: Requisicao('GET', f"/api/questoes/historico/{u.usuario_id}?limite=20")),
+    Passo('questoes.estatisticas', 1, lambda u: Requisicao('GET', f"/api/questoes/estatisticas/{u.usuario_id}")),
+    Passo('questoes.materias_foco', 1, lambda u: Requisicao('GET', f"/api/questoes/materias-foco/{CARGO_PADRAO}/{BLOCO_PADRAO}")),
+    Passo('questoes.macetes', 1, _macetes),
+]
+
+# ----------------------------------------------------------------------
+# dashboard
+# ----------------------------------------------------------------------
+
+DASHBOARD = [
+    Passo(f"dashboard.{nome.replace('-', '_')}", peso,
+          (lambda rota: lambda u: Requisicao('GET', f"/api/questoes/dashboard/{rota}/{u.usuario_id}"))(nome))
+    for nome, peso in [
+        ('estatisticas-gerais', 3),
+        ('desempenho-semanal', 2),
+        ('evolucao-mensal', 1),
+        ('metas', 1),
+        ('atividades-recentes', 2),
+        ('notificacoes', 1),
+    ]
+]
+
+# ----------------------------------------------------------------------
+# jogos
+# ----------------------------------------------------------------------
+
+def _iniciar_forca(usuario):
+    return Requisicao('POST', '/api/jogos/iniciar/forca', {
+        'usuario_id': usuario.usuario_id,
+        'bloco': 'saude',
+        'dificuldade': usuario.aleatorio.choice(['facil', 'medio', 'dificil']),
+    })
+
+
+def _guardar_sessao(usuario, resposta):
+    if resposta.get('sessao_id'):
+        usuario.sessao_jogo = resposta['sessao_id']
+        usuario.letras_tentadas = []
+
+
+def _jogada_forca(usuario):
+    letras = [letra for letra in 'AEIOURSTLMNCDP' if letra not in usuario.letras_tentadas]
+    if not usuario.sessao_jogo or not letras:
+        return None
+    letra = usuario.aleatorio.choice(letras)
+    usuario.letras_tentadas.append(letra)
+    return Requisicao('POST', '/api/jogos/jogada', {
+        'sessao_id': usuario.sessao_jogo,
+        'jogada': {'letra': letra},
+    })
+
+
+def _encerrar_sessao(usuario, resposta):
+    if resposta.get('jogo_finalizado'):
+        usuario.sessao_jogo = None
+
+
+JOGOS = [
+    Passo('jogos.listar', 1, lambda u: Requisicao('GET', f"/api/jogos/listar?usuario_id={u.usuario_id}")),
+    Passo('jogos.iniciar', 2, _iniciar_forca, _guardar_sessao),
+    Passo('jogos.jogada', 4, _jogada_forca, _encerrar_sessao),
+    Passo('jogos.ranking', 1, lambda u: Requisicao('GET', '/api/jogos/ranking?limite=10')),
+    Passo('jogos.estatisticas', 1, lambda u: Requisicao('GET', f"/api/jogos/estatisticas/{u.usuario_id}")),
+]
+
+# ----------------------------------------------------------------------
+# planos
+# ----------------------------------------------------------------------
+
+def _criar_preferencia(usuario):
+    return Requisicao('POST', '/api/payments/create-preference', {
+        'title': 'Plano Premium',
+        'price': 29.9,
+        'quantity': 1,
+        'external_reference': usuario.usuario_id,
+    })
+
+
+def _verificar_pagamento(usuario):
+    return Requisicao('POST', '/api/payments/verify', {
+        'payment_id': str(usuario.aleatorio.randint(10 ** 9, 10 ** 10)),
+        'user_id': usuario.usuario_id,
+    })
+
+
+def _notificar_pagamento(usuario):
+    return Requisicao('POST', '/api/payments/webhook', {
+        'type': 'payment',
+        'action': 'payment.updated',
+        'data': {'id': str(usuario.aleatorio.randint(10 ** 9, 10 ** 10))},
+    })
+
+
+PLANOS = [
+    Passo('planos.listar', 3, lambda u: Requisicao('GET', '/api/planos')),
+    Passo('planos.usuario', 2, lambda u: Requisicao('GET', '/api/planos/usuario', headers=_bearer(u))),
+    Passo('planos.limite_questoes', 1, lambda u: Requisicao('GET', '/api/planos/limite-questoes', headers=_bearer(u))),
+    Passo('planos.verificar_acesso', 1, lambda u: Requisicao(
+        'POST', '/api/planos/verificar-acesso', {'recurso': u.aleatorio.choice(['jogos', 'simulados', 'questoes'])},
+        headers=_bearer(u))),
+    Passo('planos.historico', 1, lambda u: Requisicao('GET', '/api/planos/historico', headers=_bearer(u))),
+    Passo('payments.create_preference', 1, _criar_preferencia),
+    Passo('payments.verify', 1, _verificar_pagamento),
+    Passo('payments.webhook', 1, _notificar_pagamento),
+]
+
+MIXES: Dict[str, List[Passo]] = {
+    'questoes': QUESTOES,
+    'dashboard': DASHBOARD,
+    'jogos': JOGOS,
+    'planos': PLANOS,
+}
+
+# Participação de cada blueprint no mix 'todos'
+PESOS_PADRAO = {'questoes': 4, 'dashboard': 3, 'jogos': 2, 'planos': 1}
+
+
+def montar_mix(especificacao: str) -> List[Passo]:
+    """'todos', 'questoes,jogos' ou 'questoes=4,planos=1' -> lista de passos com pesos normalizados"""
+    if especificacao == 'todos':
+        pesos = dict(PESOS_PADRAO)
+    else:
+        pesos = {}
+        for item in especificacao.split(','):
+            nome, _, peso = item.strip().partition('=')
+            if nome not in MIXES:
+                raise ValueError(f"Mix desconhecido: {nome} (opções: {', '.join(MIXES)})")
+            pesos[nome] = float(peso) if peso else PESOS_PADRAO[nome]
+
+    passos = []
+    for nome, peso_mix in pesos.items():
+        total = sum(passo.peso for passo in MIXES[nome])
+        for passo in MIXES[nome]:
+            passos.append(Passo(passo.nome, peso_mix * passo.peso / total, passo.montar, passo.ao_responder))
+    return passos
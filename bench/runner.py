@@ -0,0 +1,289 @@
+"""
+Benchmark de carga do backend
+
+Sobe src.main:app com armazenamento local e stand-ins das APIs externas,
+popula a base e dispara o mix de tráfego escolhido com N usuários virtuais.
+Reporta p50/p95/p99, throughput e operações do Firestore por requisição.
+
+Uso:
+    python -m bench.runner --mix todos --duracao 30 --concorrencia 8
+    python -m bench.runner --mix questoes=3,dashboard=1 --openai-latency 800:2500
+    python -m bench.runner --json atual.json --baseline anterior.json --tolerancia 0.2
+    python -m bench.runner --url http://localhost:5000 --mix planos   # servidor já em execução
+    python -m bench.runner --cassete record --cassete-dir cassettes  # grava respostas dos LLMs
+    python -m bench.runner --cassete replay --cassete-escala 0       # reproduz sem rede nem espera
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from .mixes import Passo, UsuarioVirtual, montar_mix
+from .seed import id_usuario, popular_base
+from .stand_ins import DistribuicaoLatencia, ServidorLLM, instalar_mercadopago_stand_in
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    indice = math.ceil(p * len(valores) / 100) - 1
+    return valores[min(max(indice, 0), len(valores) - 1)]
+
+
+class Coletor:
+    """Guarda as amostras de cada passo (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+
+    def registrar(self, nome: str, status: int, latencia: float, leituras: int, escritas: int):
+        with self._lock:
+            self.amostras[nome].append({
+                'status': status, 'latencia': latencia, 'leituras': leituras, 'escritas': escritas,
+            })
+
+    def resumo(self, duracao: float) -> Dict[str, Any]:
+        por_passo = {}
+        todas = []
+        for nome, amostras in sorted(self.amostras.items()):
+            latencias = sorted(a['latencia'] * 1000 for a in amostras)
+            todas.extend(latencias)
+            por_passo[nome] = {
+                'requisicoes': len(amostras),
+                'erros': sum(1 for a in amostras if a['status'] >= 500 or a['status'] == 0),
+                'p50_ms': percentil(latencias, 50),
+                'p95_ms': percentil(latencias, 95),
+                'p99_ms': percentil(latencias, 99),
+                'media_ms': sum(latencias) / len(latencias),
+                'leituras_por_req': sum(a['leituras'] for a in amostras) / len(amostras),
+                'escritas_por_req': sum(a['escritas'] for a in amostras) / len(amostras),
+            }
+        todas.sort()
+        total = sum(p['requisicoes'] for p in por_passo.values())
+        return {
+            'duracao_s': duracao,
+            'requisicoes': total,
+            'throughput_rps': total / duracao if duracao else 0.0,
+            'erros': sum(p['erros'] for p in por_passo.values()),
+            'p50_ms': percentil(todas, 50),
+            'p95_ms': percentil(todas, 95),
+            'p99_ms': percentil(todas, 99),
+            'leituras_por_req': sum(p['leituras_por_req'] * p['requisicoes'] for p in por_passo.values()) / total if total else 0.0,
+            'escritas_por_req': sum(p['escritas_por_req'] * p['requisicoes'] for p in por_passo.values()) / total if total else 0.0,
+            'passos': por_passo,
+        }
+
+
+def _executar_usuario(url: str, passos: List[Passo], usuario: UsuarioVirtual, coletor: Optional[Coletor],
+                      fim: float, limite: Optional[int], contador: Dict[str, int], lock: threading.Lock,
+                      timeout: float):
+    sessao = requests.Session()
+    pesos = [passo.peso for passo in passos]
+    while time.monotonic() < fim:
+        if limite is not None:
+            with lock:
+                if contador['enviadas'] >= limite:
+                    return
+                contador['enviadas'] += 1
+        passo = usuario.aleatorio.choices(passos, weights=pesos)[0]
+        requisicao = passo.montar(usuario)
+        if requisicao is None:
+            continue
+        inicio = time.perf_counter()
+        try:
+            resposta = sessao.request(requisicao.metodo, url + requisicao.caminho, json=requisicao.json,
+                                      headers=requisicao.headers, timeout=timeout)
+            latencia = time.perf_counter() - inicio
+            status = resposta.status_code
+            leituras = int(resposta.headers.get('X-Firestore-Reads', 0))
+            escritas = int(resposta.headers.get('X-Firestore-Writes', 0))
+            if passo.ao_responder and resposta.headers.get('Content-Type', '').startswith('application/json'):
+                passo.ao_responder(usuario, resposta.json())
+        except requests.RequestException:
+            latencia = time.perf_counter() - inicio
+            status, leituras, escritas = 0, 0, 0
+        if coletor is not None:
+            coletor.registrar(passo.nome, status, latencia, leituras, escritas)
+
+
+def disparar(url: str, passos: List[Passo], usuarios: List[str], concorrencia: int, duracao: float,
+             requisicoes: Optional[int], aquecimento: float, semente: int, timeout: float) -> Dict[str, Any]:
+    """Executa a carga (fase de aquecimento descartada) e retorna o resumo"""
+    aleatorio = random.Random(semente)
+    virtuais = [UsuarioVirtual(aleatorio.choice(usuarios), random.Random(aleatorio.random()))
+                for _ in range(concorrencia)]
+
+    def _rodada(coletor, segundos, limite):
+        contador, lock = {'enviadas': 0}, threading.Lock()
+        fim = time.monotonic() + segundos
+        threads = [
+            threading.Thread(target=_executar_usuario,
+                             args=(url, passos, usuario, coletor, fim, limite, contador, lock, timeout),
+                             daemon=True)
+            for usuario in virtuais
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - inicio
+
+    if aquecimento > 0:
+        _rodada(None, aquecimento, None)
+    coletor = Coletor()
+    segundos = duracao if requisicoes is None else float('inf')
+    decorrido = _rodada(coletor, segundos, requisicoes)
+    return coletor.resumo(decorrido)
+
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Regressões de p95 e de leituras/escritas por requisição em relação ao baseline"""
+    regressoes = []
+    for nome, passo in atual['passos'].items():
+        anterior = baseline.get('passos', {}).get(nome)
+        if not anterior:
+            continue
+        for metrica in ('p95_ms', 'leituras_por_req', 'escritas_por_req'):
+            limite = anterior[metrica] * (1 + tolerancia)
+            # Folga absoluta para métricas próximas de zero
+            if passo[metrica] > limite and passo[metrica] - anterior[metrica] > (1.0 if metrica == 'p95_ms' else 0.5):
+                regressoes.append(f"{nome}: {metrica} {anterior[metrica]:.1f} -> {passo[metrica]:.1f}")
+    return regressoes
+
+
+def imprimir(resumo: Dict[str, Any], saida=sys.stdout):
+    print(f"\n{'passo':32} {'reqs':>6} {'erros':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'leit/req':>9} {'escr/req':>9}", file=saida)
+    for nome, passo in resumo['passos'].items():
+        print(f"{nome:32} {passo['requisicoes']:6d} {passo['erros']:5d} {passo['p50_ms']:8.1f} {passo['p95_ms']:8.1f} "
+              f"{passo['p99_ms']:8.1f} {passo['leituras_por_req']:9.1f} {passo['escritas_por_req']:9.1f}", file=saida)
+    print(f"{'TOTAL':32} {resumo['requisicoes']:6d} {resumo['erros']:5d} {resumo['p50_ms']:8.1f} {resumo['p95_ms']:8.1f} "
+          f"{resumo['p99_ms']:8.1f} {resumo['leituras_por_req']:9.1f} {resumo['escritas_por_req']:9.1f}", file=saida)
+    print(f"\nThroughput: {resumo['throughput_rps']:.1f} req/s em {resumo['duracao_s']:.1f}s (latências em ms)", file=saida)
+
+
+def _subir_aplicacao(args):
+    """Configura o ambiente, sobe stand-ins e a aplicação; retorna (url, ids, stand-ins, servidor)"""
+    llm = ServidorLLM(DistribuicaoLatencia.de_texto(args.openai_latency),
+                      DistribuicaoLatencia.de_texto(args.perplexity_latency)).iniciar()
+    os.environ.update({
+        'OPENAI_API_BASE': f"{llm.url}/v1",
+        'OPENAI_API_KEY': 'bench',
+        'PERPLEXITY_API_BASE': llm.url,
+        'PERPLEXITY_API_KEY': 'bench',
+        'MERCADOPAGO_ACCESS_TOKEN': 'bench',
+        'STORAGE_BACKEND': args.backend,
+        'PAYMENTS_QUEUE_PATH': os.path.join(tempfile.mkdtemp(prefix='bench-'), 'pagamentos.sqlite3'),
+    })
+    if args.cassete != 'off':
+        os.environ.update({
+            'LLM_CASSETTE_MODE': args.cassete,
+            'LLM_CASSETTE_DIR': args.cassete_dir,
+            'LLM_CASSETTE_LATENCY_SCALE': str(args.cassete_escala),
+        })
+    if args.backend == 'sqlite':
+        os.environ['SQLITE_PATH'] = args.sqlite_path or os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.sqlite3')
+    mercadopago = instalar_mercadopago_stand_in(DistribuicaoLatencia.de_texto(args.mp_latency))
+
+    from werkzeug.serving import make_server
+    from src.main import app
+    from src.config.firebase_config import firebase_config
+    from src.services.firestore_repository import firestore_repository
+
+    inicio = time.perf_counter()
+    ids = popular_base(firebase_config.get_db(), args.usuarios, args.questoes_por_usuario, semente=args.semente)
+    print(f"Base populada: {len(ids)} usuários x {args.questoes_por_usuario} questões "
+          f"({args.backend}) em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    firestore_repository.estatisticas.limpar()
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name='bench-app', daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}", ids, llm, mercadopago, servidor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de carga do backend Gabarita.AI')
+    parser.add_argument('--mix', default='todos', help="todos | questoes,dashboard,jogos,planos (peso opcional: questoes=4)")
+    parser.add_argument('--duracao', type=float, default=30.0, help='segundos de medição')
+    parser.add_argument('--requisicoes', type=int, help='número fixo de requisições (ignora --duracao)')
+    parser.add_argument('--aquecimento', type=float, default=3.0, help='segundos de aquecimento descartados')
+    parser.add_argument('--concorrencia', type=int, default=8, help='usuários virtuais simultâneos')
+    parser.add_argument('--usuarios', type=int, default=200, help='usuários na massa de dados')
+    parser.add_argument('--questoes-por-usuario', type=int, default=50)
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--sqlite-path', help='arquivo SQLite (padrão: diretório temporário)')
+    parser.add_argument('--openai-latency', default='800:2500', help='mediana[:p95[:taxa_erro]] em ms')
+    parser.add_argument('--perplexity-latency', default='600:1800', help='mediana[:p95[:taxa_erro]] em ms')
+    parser.add_argument('--mp-latency', default='150:400', help='mediana[:p95[:taxa_erro]] em ms')
+    parser.add_argument('--cassete', choices=['off', 'record', 'replay'], default='off',
+                        help='grava ou reproduz as respostas dos LLMs (LLM_CASSETTE_MODE)')
+    parser.add_argument('--cassete-dir', default='cassettes')
+    parser.add_argument('--cassete-escala', type=float, default=1.0, help='multiplicador da latência gravada no replay')
+    parser.add_argument('--url', help='servidor já em execução (não sobe app, stand-ins nem massa de dados)')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help='grava o resumo em JSON')
+    parser.add_argument('--baseline', help='resumo JSON anterior para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo aceito sobre o baseline')
+    parser.add_argument('--verbose', action='store_true', help='mostra os logs da aplicação durante a carga')
+    args = parser.parse_args(argv)
+
+    passos = montar_mix(args.mix)
+    standins = None
+    if args.url:
+        url, ids = args.url.rstrip('/'), [id_usuario(i) for i in range(args.usuarios)]
+    else:
+        url, ids, *standins = _subir_aplicacao(args)
+
+    print(f"Disparando mix '{args.mix}' contra {url} com {args.concorrencia} usuários virtuais...", file=sys.stderr)
+    # Os logs das rotas distorcem a medição e poluem o relatório
+    silencio = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    with silencio:
+        resumo = disparar(url, passos, ids, args.concorrencia, args.duracao, args.requisicoes,
+                          args.aquecimento, args.semente, args.timeout)
+
+    if standins:
+        llm, mercadopago, servidor = standins
+        resumo['chamadas_externas'] = {**llm.chamadas, 'mercadopago': mercadopago.chamadas}
+        servidor.shutdown()
+        llm.parar()
+
+    imprimir(resumo)
+    if 'chamadas_externas' in resumo:
+        print(f"Chamadas aos stand-ins (inclui aquecimento): {resumo['chamadas_externas']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            regressoes = comparar(resumo, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print(f"\n❌ Regressões acima de {args.tolerancia:.0%}:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            return 1
+        print(f"\n✅ Sem regressões acima de {args.tolerancia:.0%} em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
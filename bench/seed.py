@@ -0,0 +1,115 @@
+"""
+Massa de dados do benchmark: usuários, log de respostas e sessões de jogos
+
+Grava direto no backend local (STORAGE_BACKEND=memory|sqlite) em lotes,
+nos mesmos formatos que as rotas produzem.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from src.services.log_respostas import montar_resposta
+
+TAMANHO_LOTE = 500
+
+CARGO_PADRAO = 'Enfermeiro'
+BLOCO_PADRAO = 'Bloco 1 - Seguridade Social'
+MATERIAS = [
+    'Sistema Único de Saúde', 'Atenção Básica', 'Vigilância em Saúde',
+    'Ética Profissional', 'Língua Portuguesa', 'Raciocínio Lógico',
+]
+PLANOS = ['trial', 'premium', 'ate_final_concurso']
+
+
+def id_usuario(indice: int) -> str:
+    return f"bench-user-{indice:05d}"
+
+
+class _Gravador:
+    """Acumula escritas e faz commit a cada TAMANHO_LOTE operações"""
+
+    def __init__(self, db):
+        self.db = db
+        self.batch = db.batch()
+        self.pendentes = 0
+        self.total = 0
+
+    def set(self, referencia, dados):
+        self.batch.set(referencia, dados)
+        self.pendentes += 1
+        self.total += 1
+        if self.pendentes >= TAMANHO_LOTE:
+            self.finalizar()
+
+    def finalizar(self):
+        if self.pendentes:
+            self.batch.commit()
+            self.batch = self.db.batch()
+            self.pendentes = 0
+
+
+def popular_base(db, usuarios: int, questoes_por_usuario: int, sessoes_por_usuario: int = 3,
+                 semente: int = 42) -> List[str]:
+    """Cria a massa de dados e retorna os ids dos usuários"""
+    aleatorio = random.Random(semente)
+    agora = datetime.now()
+    gravador = _Gravador(db)
+    ids = []
+
+    for indice in range(usuarios):
+        usuario_id = id_usuario(indice)
+        ids.append(usuario_id)
+        respondidas = questoes_por_usuario
+        corretas = int(respondidas * aleatorio.uniform(0.4, 0.9))
+
+        gravador.set(db.collection('usuarios').document(usuario_id), {
+            'nome': f"Usuário {indice}",
+            'email': f"{usuario_id}@bench.local",
+            'cargo': CARGO_PADRAO,
+            'bloco': BLOCO_PADRAO,
+            'plano': aleatorio.choice(PLANOS),
+            'questoes_respondidas': respondidas,
+            'questoes_corretas': corretas,
+            'tempo_total_estudo': respondidas * 2,
+            'dias_consecutivos': aleatorio.randint(0, 30),
+            'melhor_sequencia': aleatorio.randint(0, 40),
+            'xp_atual': corretas * 10,
+            'pontos_jogos': aleatorio.randint(0, 5000),
+            'jogos_completados': sessoes_por_usuario,
+            'data_criacao': (agora - timedelta(days=90)).isoformat(),
+        })
+
+        for numero in range(questoes_por_usuario):
+            quando = agora - timedelta(minutes=aleatorio.randint(1, 60 * 24 * 60))
+            acertou = numero < corretas
+            materia = aleatorio.choice(MATERIAS)
+            questao_id = uuid.UUID(int=aleatorio.getrandbits(128)).hex
+
+            gravador.set(
+                db.collection('usuarios').document(usuario_id).collection('respostas').document(questao_id),
+                montar_resposta(
+                    questao_id=questao_id,
+                    acertou=acertou,
+                    respondida_em=quando,
+                    questao=f"Questão de {materia} número {numero} para {CARGO_PADRAO}",
+                    tema=materia,
+                    alternativa_escolhida='B' if acertou else 'A',
+                    gabarito='B',
+                    tempo_resposta=aleatorio.randint(20, 180),
+                ),
+            )
+
+        for numero in range(sessoes_por_usuario):
+            sessao_id = f"{usuario_id}-sessao-{numero}"
+            gravador.set(db.collection('jogos_sessoes').document(sessao_id), {
+                'id': sessao_id,
+                'usuario_id': usuario_id,
+                'tipo': aleatorio.choice(['forca', 'quiz', 'memoria']),
+                'status': 'finalizado',
+                'pontos': aleatorio.randint(0, 200),
+                'inicio': (agora - timedelta(days=numero)).isoformat(),
+            })
+
+    gravador.finalizar()
+    return ids
@@ -0,0 +1,212 @@
+"""
+Stand-ins locais das dependências externas usadas no benchmark
+
+- ServidorLLM: servidor HTTP compatível com /v1/chat/completions (OpenAI,
+  via OPENAI_API_BASE) e /chat/completions (Perplexity, via PERPLEXITY_API_BASE)
+- MercadoPagoStandIn: substitui o SDK do mercadopago_client no processo do benchmark
+
+Todos respondem com latência amostrada de uma distribuição configurável.
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class DistribuicaoLatencia:
+    """Latência log-normal definida pela mediana e pelo p95 (em ms)"""
+
+    def __init__(self, mediana_ms: float, p95_ms: Optional[float] = None, taxa_erro: float = 0.0):
+        self.mediana_ms = max(mediana_ms, 0.0)
+        self.p95_ms = max(p95_ms if p95_ms is not None else mediana_ms, self.mediana_ms)
+        self.taxa_erro = taxa_erro
+        # p95 = mediana * exp(1.645 * sigma)
+        self._sigma = math.log(self.p95_ms / self.mediana_ms) / 1.645 if self.mediana_ms > 0 else 0.0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def de_texto(cls, texto: str) -> 'DistribuicaoLatencia':
+        """Formato 'mediana[:p95[:taxa_erro]]', por exemplo '800:2500' ou '300:900:0.01'"""
+        partes = [float(p) for p in texto.split(':')]
+        return cls(*partes)
+
+    def amostrar(self) -> float:
+        """Latência em segundos"""
+        if self.mediana_ms <= 0:
+            return 0.0
+        with self._lock:
+            return self.mediana_ms * math.exp(self._random.gauss(0.0, self._sigma)) / 1000
+
+    def falhar(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.taxa_erro
+
+    def esperar(self):
+        time.sleep(self.amostrar())
+
+    def __repr__(self):
+        return f"{self.mediana_ms:g}ms/p95 {self.p95_ms:g}ms/erro {self.taxa_erro:g}"
+
+
+def _json_do_prompt(prompt: str) -> Optional[Dict[str, Any]]:
+    """Primeiro objeto JSON de exemplo do prompt ('...no seguinte formato: {...}')"""
+    decoder = json.JSONDecoder()
+    inicio = prompt.find('formato')
+    posicao = prompt.find('{', max(inicio, 0))
+    while posicao != -1:
+        try:
+            objeto, _ = decoder.raw_decode(prompt[posicao:])
+            if isinstance(objeto, dict):
+                return objeto
+        except ValueError:
+            pass
+        posicao = prompt.find('{', posicao + 1)
+    return None
+
+
+def resposta_para_prompt(prompt: str, max_tokens: int) -> str:
+    """Conteúdo plausível: ecoa o JSON pedido pelo prompt ou gera texto do tamanho esperado"""
+    exemplo = _json_do_prompt(prompt)
+    if exemplo is not None:
+        return json.dumps(exemplo, ensure_ascii=False)
+    palavras = max(int(max_tokens * 0.6), 20)
+    return ' '.join(['Explicação de referência gerada pelo stand-in do benchmark.'] * (palavras // 8))
+
+
+class ServidorLLM:
+    """Servidor HTTP local que imita as APIs de chat da OpenAI e do Perplexity"""
+
+    def __init__(self, latencia_openai: DistribuicaoLatencia, latencia_perplexity: DistribuicaoLatencia,
+                 host: str = '127.0.0.1', porta: int = 0):
+        self.latencias = {'openai': latencia_openai, 'perplexity': latencia_perplexity}
+        self.chamadas = {'openai': 0, 'perplexity': 0}
+        self._lock = threading.Lock()
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                provedor = 'openai' if self.path.startswith('/v1/') else 'perplexity'
+                status, resposta = servidor._responder(provedor, corpo)
+                dados = json.dumps(resposta).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        self._http = ThreadingHTTPServer((host, porta), _Handler)
+        self._http.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def _responder(self, provedor: str, corpo: Dict[str, Any]):
+        with self._lock:
+            self.chamadas[provedor] += 1
+        latencia = self.latencias[provedor]
+        latencia.esperar()
+        if latencia.falhar():
+            return 503, {'error': {'message': 'stand-in: falha simulada', 'type': 'server_error'}}
+
+        mensagens = corpo.get('messages') or [{}]
+        prompt = mensagens[-1].get('content', '')
+        conteudo = resposta_para_prompt(prompt, int(corpo.get('max_tokens') or 800))
+        return 200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': corpo.get('model', 'stand-in'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': conteudo},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': sum(len(m.get('content', '')) for m in mensagens) // 4,
+                'completion_tokens': len(conteudo) // 4,
+                'total_tokens': (sum(len(m.get('content', '')) for m in mensagens) + len(conteudo)) // 4,
+            },
+        }
+
+    def iniciar(self) -> 'ServidorLLM':
+        self._thread = threading.Thread(target=self._http.serve_forever, name='bench-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+class MercadoPagoStandIn:
+    """Substituto do mercadopago.SDK com preference().create e payment().get"""
+
+    def __init__(self, latencia: DistribuicaoLatencia, status_pagamento: str = 'approved'):
+        self.latencia = latencia
+        self.status_pagamento = status_pagamento
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, access_token: str, *args, **kwargs):
+        # Usado no lugar da classe: mercadopago.SDK(token) retorna o próprio stand-in
+        return self
+
+    def _chamar(self, resposta: Dict[str, Any], status: int = 200) -> Dict[str, Any]:
+        with self._lock:
+            self.chamadas += 1
+        self.latencia.esperar()
+        if self.latencia.falhar():
+            return {'status': 500, 'response': {'message': 'stand-in: falha simulada'}}
+        return {'status': status, 'response': resposta}
+
+    def preference(self):
+        standin = self
+
+        class _Preference:
+            def create(self, dados):
+                preferencia_id = uuid.uuid4().hex
+                return standin._chamar({
+                    'id': preferencia_id,
+                    'init_point': f"https://mercadopago.stand-in/checkout/{preferencia_id}",
+                    'sandbox_init_point': f"https://sandbox.mercadopago.stand-in/checkout/{preferencia_id}",
+                    'external_reference': dados.get('external_reference'),
+                }, status=201)
+
+        return _Preference()
+
+    def payment(self):
+        standin = self
+
+        class _Payment:
+            def get(self, payment_id):
+                return standin._chamar({
+                    'id': payment_id,
+                    'status': standin.status_pagamento,
+                    'external_reference': f"bench-{payment_id}",
+                })
+
+        return _Payment()
+
+
+def instalar_mercadopago_stand_in(latencia: DistribuicaoLatencia) -> MercadoPagoStandIn:
+    """Troca o SDK do cliente compartilhado do MercadoPago pelo stand-in no processo atual"""
+    from src.services.mercadopago_client import mercadopago_client
+
+    standin = MercadoPagoStandIn(latencia)
+    mercadopago_client.usar_sdk(standin)
+    return standin
@@ -0,0 +1,151 @@
+"""
+Benchmark de inicialização dos workers
+
+Cada repetição roda num processo Python novo e mede:
+
+- import_ms: `import src.main` (o que um worker sem preload paga ao subir)
+- primeira_req_ms: primeira requisição de cada caminho (inclui a criação
+  tardia dos clientes, ex.: conexão com o armazenamento)
+- rss_mb: memória residente máxima do processo
+
+No modo preload o processo importa a app e as dependências pesadas como o
+master do gunicorn (pre_importar + gc.freeze) e mede um worker criado por fork:
+import_ms passa a ser o tempo do fork até o worker estar pronto.
+
+Uso:
+    python -m bench.startup --repeticoes 10
+    python -m bench.startup --modo preload --caminho /health --caminho /api/questoes/historico/u1
+    python -m bench.startup --json startup.json --baseline startup_anterior.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+CAMINHOS_PADRAO = ['/health', '/api/opcoes/cargos-blocos', '/api/questoes/historico/bench-usuario']
+
+
+def _medir_requisicoes(app, caminhos: List[str]) -> Dict[str, float]:
+    cliente = app.test_client()
+    tempos = {}
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        cliente.get(caminho)
+        tempos[caminho] = (time.perf_counter() - inicio) * 1000
+    return tempos
+
+
+def _rss_mb() -> float:
+    # ru_maxrss em KiB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _filho(modo: str, caminhos: List[str]):
+    """Executado no processo novo; escreve as medidas em JSON no stdout"""
+    if modo == 'import':
+        inicio = time.perf_counter()
+        from src.main import app
+        medida = {'import_ms': (time.perf_counter() - inicio) * 1000}
+        medida['primeira_req_ms'] = _medir_requisicoes(app, caminhos)
+        medida['rss_mb'] = _rss_mb()
+        print(json.dumps(medida))
+        return
+
+    import gc
+    from src.main import app
+    from src.config.inicializacao import pre_importar
+    pre_importar()
+    gc.freeze()
+    leitura, escrita = os.pipe()
+    inicio = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(leitura)
+        medida = {'import_ms': (time.perf_counter() - inicio) * 1000}
+        medida['primeira_req_ms'] = _medir_requisicoes(app, caminhos)
+        medida['rss_mb'] = _rss_mb()
+        os.write(escrita, json.dumps(medida).encode('utf-8'))
+        os._exit(0)
+    os.close(escrita)
+    with os.fdopen(leitura, 'rb') as arquivo:
+        dados = arquivo.read()
+    os.waitpid(pid, 0)
+    print(dados.decode('utf-8'))
+
+
+def medir(modo: str, repeticoes: int, caminhos: List[str]) -> Dict[str, Any]:
+    """Roda as repetições em processos novos e retorna as medianas"""
+    ambiente = {
+        **os.environ,
+        'STORAGE_BACKEND': os.getenv('STORAGE_BACKEND', 'memory'),
+        'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY', 'bench'),
+        'LOG_LEVEL': 'ERROR',
+    }
+    comando = [sys.executable, '-m', 'bench.startup', '--filho', modo] + [f"--caminho={c}" for c in caminhos]
+    amostras = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(comando, env=ambiente, capture_output=True, text=True, check=True).stdout
+        amostras.append(json.loads(saida.strip().splitlines()[-1]))
+
+    def _mediana(valores):
+        return statistics.median(valores)
+
+    return {
+        'modo': modo,
+        'repeticoes': repeticoes,
+        'import_ms': _mediana([a['import_ms'] for a in amostras]),
+        'primeira_req_ms': {c: _mediana([a['primeira_req_ms'][c] for a in amostras]) for c in caminhos},
+        'rss_mb': _mediana([a['rss_mb'] for a in amostras]),
+    }
+
+
+def imprimir(resumo: Dict[str, Any], saida=sys.stdout):
+    print(f"\nModo {resumo['modo']} (mediana de {resumo['repeticoes']} processos)", file=saida)
+    print(f"{'import/fork até pronto':48} {resumo['import_ms']:8.1f} ms", file=saida)
+    for caminho, tempo in resumo['primeira_req_ms'].items():
+        print(f"{'1ª req ' + caminho:48} {tempo:8.1f} ms", file=saida)
+    print(f"{'RSS máximo':48} {resumo['rss_mb']:8.1f} MB", file=saida)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização dos workers do Gabarita.AI')
+    parser.add_argument('--modo', choices=['import', 'preload'], default='import')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--caminho', action='append', help='caminho da primeira requisição (repetível)')
+    parser.add_argument('--json', help='grava o resumo em JSON')
+    parser.add_argument('--baseline', help='resumo JSON anterior para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo aceito sobre o baseline')
+    parser.add_argument('--filho', choices=['import', 'preload'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    caminhos = args.caminho or CAMINHOS_PADRAO
+
+    if args.filho:
+        _filho(args.filho, caminhos)
+        return 0
+
+    resumo = medir(args.modo, args.repeticoes, caminhos)
+    imprimir(resumo)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        limite = anterior['import_ms'] * (1 + args.tolerancia)
+        if resumo['import_ms'] > limite:
+            print(f"\n❌ import_ms {anterior['import_ms']:.1f} -> {resumo['import_ms']:.1f} "
+                  f"(acima de {args.tolerancia:.0%})")
+            return 1
+        print(f"\n✅ Inicialização sem regressões acima de {args.tolerancia:.0%} em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
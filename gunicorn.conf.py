@@ -0,0 +1,29 @@
+"""
+Configuração do gunicorn (lida automaticamente a partir da raiz do projeto)
+
+Com preload_app a aplicação é importada uma vez no master e os workers nascem
+por fork, compartilhando a memória (copy-on-write):
+
+- o master pré-importa openai/firebase/mercadopago sem criar clientes; cada
+  worker abre as próprias conexões no primeiro uso
+- gc.freeze() antes do fork tira os objetos já carregados (catálogos, módulos)
+  das coletas do GC, que senão tocariam as páginas compartilhadas
+
+GUNICORN_PRELOAD=false volta ao modo em que cada worker importa a app.
+"""
+import gc
+import os
+
+# Bind e número de workers vêm do Procfile / WEB_CONCURRENCY
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    if preload_app:
+        from src.config.inicializacao import pre_importar
+        pre_importar()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
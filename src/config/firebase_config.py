@@ -1,24 +1,61 @@
 """
 Configuração do Firebase para o Gabarita.AI
 """
+import logging
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
+import threading
 from dotenv import load_dotenv
+from .inicializacao import ModuloTardio
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 class FirebaseConfig:
-    """Classe para gerenciar configurações do Firebase"""
+    """Classe para gerenciar configurações do Firebase
+    
+    A conexão é aberta no primeiro acesso (get_db, is_connected, auth), não no
+    import: com preload_app o cliente gRPC nasce depois do fork, em cada worker.
+    """
     
     def __init__(self):
-        self.db = None
-        self.auth = None
-        self._initialize_firebase()
+        self._db = None
+        self._auth = None
+        self._inicializado = False
+        self._lock = threading.Lock()
+    
+    def _garantir_inicializado(self):
+        if not self._inicializado:
+            with self._lock:
+                if not self._inicializado:
+                    self._initialize_firebase()
+                    self._inicializado = True
+    
+    @property
+    def db(self):
+        self._garantir_inicializado()
+        return self._db
+    
+    @property
+    def auth(self):
+        self._garantir_inicializado()
+        return self._auth
     
     def _initialize_firebase(self):
         """Inicializa o Firebase com as credenciais"""
+        from ..storage import BACKENDS_LOCAIS, backend_configurado, criar_backend_local
+        
+        backend = backend_configurado()
+        if backend in BACKENDS_LOCAIS:
+            # Armazenamento local para testes de carga e profiling sem credenciais
+            self._db = criar_backend_local(backend)
+            logger.info(f"Armazenamento local '{backend}' ativo (STORAGE_BACKEND)")
+            return
+        
         try:
+            import firebase_admin
+            from firebase_admin import auth, credentials, firestore
+            
             if not firebase_admin._apps:
                 # Configuração para desenvolvimento usando variáveis de ambiente
                 cred_dict = {
@@ -36,20 +73,20 @@ class FirebaseConfig:
                 if all(cred_dict.values()):
                     cred = credentials.Certificate(cred_dict)
                     firebase_admin.initialize_app(cred)
-                    print("✅ Firebase inicializado com sucesso!")
+                    logger.info("Firebase inicializado com sucesso!")
                 else:
-                    print("⚠️ Credenciais do Firebase não encontradas. Usando modo desenvolvimento.")
+                    logger.warning("Credenciais do Firebase não encontradas. Usando modo desenvolvimento.")
                     return
             
             # Inicializar serviços
-            self.db = firestore.client()
-            self.auth = auth
-            print("✅ Firestore e Auth conectados com sucesso!")
+            self._db = firestore.client()
+            self._auth = auth
+            logger.info("Firestore e Auth conectados com sucesso!")
             
         except Exception as e:
-            print(f"❌ Erro ao inicializar Firebase: {e}")
-            self.db = None
-            self.auth = None
+            logger.error(f"Erro ao inicializar Firebase: {e}")
+            self._db = None
+            self._auth = None
     
     def get_db(self):
         """Retorna a instância do Firestore"""
@@ -66,3 +103,6 @@ class FirebaseConfig:
 # Instância global do Firebase
 firebase_config = FirebaseConfig()
 
+# firebase_admin.auth sob demanda; o app padrão do Firebase é inicializado antes do primeiro uso
+firebase_auth = ModuloTardio('firebase_admin.auth', preparar=firebase_config._garantir_inicializado)
+
@@ -0,0 +1,103 @@
+"""
+Inicialização tardia dos clientes externos e preload do gunicorn
+
+Importar src.main não deve carregar openai, firebase_admin/google-cloud nem
+mercadopago, nem abrir conexões: isso fica para o primeiro uso, já dentro do
+worker.
+
+- ModuloTardio: substitui um `import pesado` no topo do módulo; o import real
+  acontece no primeiro acesso a um atributo
+- inicializacao_tardia: propriedade calculada uma única vez por instância,
+  protegida por lock (várias threads do worker podem chegar juntas)
+
+Com preload_app (gunicorn.conf.py), o master chama pre_importar() para que os
+módulos já estejam na memória compartilhada dos workers, mas nenhum cliente
+(gRPC, HTTP) é criado antes do fork.
+"""
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Dependências carregadas só sob demanda; o master do gunicorn as importa antes do fork
+MODULOS_PESADOS = (
+    'openai',
+    'firebase_admin.auth',
+    'firebase_admin.firestore',
+    'google.cloud.firestore_v1',
+    'mercadopago',
+)
+
+_VAZIO = object()
+
+
+class ModuloTardio:
+    """Proxy de módulo importado no primeiro acesso a um atributo"""
+
+    def __init__(self, nome: str, preparar: Optional[Callable[[], None]] = None):
+        self._nome = nome
+        self._preparar = preparar
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    if self._preparar is not None:
+                        self._preparar()
+                    self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    def __getattr__(self, nome: str):
+        return getattr(self._carregar(), nome)
+
+    def __repr__(self):
+        estado = 'carregado' if self._modulo is not None else 'pendente'
+        return f"<ModuloTardio {self._nome} ({estado})>"
+
+
+class inicializacao_tardia:
+    """Como functools.cached_property, mas com lock: o valor é criado uma única vez
+
+    O resultado fica no __dict__ da instância, então os acessos seguintes não
+    passam mais pelo descritor. Atribuir ao atributo substitui o valor (testes,
+    stand-ins) e `del` força uma nova criação no próximo acesso.
+    """
+
+    def __init__(self, funcao: Callable):
+        self.funcao = funcao
+        self.nome = funcao.__name__
+        self.__doc__ = funcao.__doc__
+        self._lock = threading.Lock()
+
+    def __set_name__(self, dono, nome: str):
+        self.nome = nome
+
+    def __get__(self, instancia, dono=None):
+        if instancia is None:
+            return self
+        valor = instancia.__dict__.get(self.nome, _VAZIO)
+        if valor is _VAZIO:
+            with self._lock:
+                valor = instancia.__dict__.get(self.nome, _VAZIO)
+                if valor is _VAZIO:
+                    valor = self.funcao(instancia)
+                    instancia.__dict__[self.nome] = valor
+        return valor
+
+
+def pre_importar(modulos=MODULOS_PESADOS):
+    """Importa as dependências pesadas sem criar clientes (master do gunicorn com preload)"""
+    inicio = time.perf_counter()
+    for nome in modulos:
+        try:
+            importlib.import_module(nome)
+        except ImportError as e:
+            logger.warning(f"Não foi possível pré-importar {nome}: {e}")
+    logger.info("Dependências pré-importadas", extra={'campos': {
+        'modulos': len(modulos), 'duracao_ms': round((time.perf_counter() - inicio) * 1000, 1)
+    }})
@@ -0,0 +1,136 @@
+"""
+Logging estruturado e não bloqueante
+
+As rotas e serviços usam `logging.getLogger(__name__)`. configurar_logging()
+instala na raiz um QueueHandler: a thread da requisição só enfileira o
+registro e uma thread de fundo (QueueListener) formata e escreve no stdout.
+
+- LOG_LEVEL: nível mínimo (padrão INFO)
+- LOG_FORMAT: json (padrão, um objeto por linha) ou text
+- LOG_DEBUG_SAMPLE_RATE: fração das requisições cujos logs DEBUG são emitidos
+  quando LOG_LEVEL=DEBUG (a decisão vale para a requisição inteira)
+
+Cada registro leva o request_id (X-Request-ID) e o endpoint da requisição.
+Campos estruturados vão em `extra={'campos': {...}}`.
+
+Threads não sobrevivem ao fork: nos workers do gunicorn com preload_app, o
+processo filho cria uma fila e um listener novos (os.register_at_fork).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import zlib
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+_listener = None
+
+
+class ContextoRequisicaoFilter(logging.Filter):
+    """Anexa request_id/endpoint e amostra os logs DEBUG por requisição"""
+
+    def __init__(self, taxa_debug: float = 1.0):
+        super().__init__()
+        self.taxa_debug = min(max(taxa_debug, 0.0), 1.0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = None
+        if has_request_context():
+            request_id = g.get('request_id')
+            record.endpoint = request.endpoint
+        record.request_id = request_id
+        if record.levelno > logging.DEBUG or self.taxa_debug >= 1:
+            return True
+        if request_id is None:
+            return self.taxa_debug > 0
+        return zlib.crc32(request_id.encode('utf-8')) / 0xFFFFFFFF < self.taxa_debug
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for campo in ('request_id', 'endpoint'):
+            valor = getattr(record, campo, None)
+            if valor:
+                registro[campo] = valor
+        campos = getattr(record, 'campos', None)
+        if isinstance(campos, dict):
+            registro.update(campos)
+        if record.exc_info:
+            registro['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            registro['exc'] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enfileira o registro sem formatá-lo na thread da requisição"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Mensagem e traceback viram texto aqui: os argumentos podem mudar depois
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configurar_logging(nivel: str = None, formato: str = None, taxa_debug: float = None):
+    """Instala o handler em fila na raiz (idempotente)"""
+    global _listener
+    nivel = (nivel or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    formato = (formato or os.getenv('LOG_FORMAT', 'json')).lower()
+    taxa_debug = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0')) if taxa_debug is None else taxa_debug
+
+    raiz = logging.getLogger()
+    raiz.setLevel(nivel)
+    if _listener is not None:
+        return
+
+    saida = logging.StreamHandler(sys.stdout)
+    if formato == 'json':
+        saida.setFormatter(JsonFormatter())
+    else:
+        saida.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s', defaults={'request_id': '-'}))
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(ContextoRequisicaoFilter(taxa_debug))
+    raiz.handlers = [handler]
+
+    _listener = logging.handlers.QueueListener(handler.queue, saida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_parar_listener)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_reiniciar_apos_fork)
+
+
+def _parar_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _reiniciar_apos_fork():
+    """No processo filho: fila e thread de escrita novas (a do pai não existe aqui)"""
+    global _listener
+    if _listener is None:
+        return
+    handler = next((h for h in logging.getLogger().handlers if isinstance(h, _QueueHandler)), None)
+    if handler is None:
+        return
+    handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
@@ -1,9 +1,15 @@
+import logging
+from .config.logging_config import configurar_logging
+
+# Antes dos demais imports: Firebase e serviços já registram mensagens ao carregar
+configurar_logging()
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
 from datetime import datetime
+from urllib.parse import quote
 from .services.chatgpt_service import chatgpt_service
-from .routes.questoes import CONTEUDOS_EDITAL
 from .routes.auth import auth_bp
 from .routes.questoes import questoes_bp  # Manter se houver outras funções
 from .routes.planos import planos_bp
@@ -11,23 +17,19 @@ from .routes.jogos import jogos_bp
 from .routes.news import news_bp
 from .routes.opcoes import opcoes_bp
 from .routes.payments import payments_bp
+from .services.firestore_repository import firestore_repository
+from .services.metrics import metrics
+from .services.tracing import tracer
+from .services.profiler import profiler
+from .services.json_provider import configurar_json
+from .services.compressao import compressao
+from .services.respostas_estaticas import respostas_estaticas
+from .services.catalogo_edital import catalogo_edital
+from .services.fila_pagamentos import fila_pagamentos
+from .services.expiracao_planos import varredura_planos
 
-app = Flask(__name__)
-CORS(app, origins=['http://localhost:3000', 'http://localhost:5173', 'https://j6h5i7c0x703.manus.space', 'https://gabaritai.app.br', 'https://www.gabaritai.app.br'], supports_credentials=True)
-
-# Carrega configuração do MercadoPago para a app
-app.config["MERCADOPAGO_ACCESS_TOKEN"] = os.getenv("MERCADOPAGO_ACCESS_TOKEN", "")
+logger = logging.getLogger(__name__)
 
-# Registrar blueprints
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(questoes_bp, url_prefix='/api/questoes')
-app.register_blueprint(planos_bp, url_prefix='/api')
-app.register_blueprint(jogos_bp, url_prefix='/api/jogos')
-app.register_blueprint(news_bp, url_prefix='/api')
-app.register_blueprint(opcoes_bp, url_prefix='/api')
-app.register_blueprint(payments_bp, url_prefix='/api')
-
-@app.route('/', methods=['GET'])
 def root():
     """Rota raiz da API"""
     return jsonify({
@@ -45,7 +47,6 @@ def root():
         }
     })
 
-@app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -55,12 +56,7 @@ def health_check():
 
 # Remover stubs que conflitam com os blueprints reais
 
-@app.route('/api/perplexity/explicacao', methods=['POST'])
 def obter_explicacao_perplexity():
-    import sys
-    print("🔍 Requisição recebida para explicação do Perplexity")
-    sys.stdout.flush()
-    
     data = request.get_json()
     questao = data.get('questao', '')
     alternativa_correta = data.get('alternativa_correta', '')
@@ -68,12 +64,11 @@ def obter_explicacao_perplexity():
     materia = data.get('materia', '')
     tema = data.get('tema', '')
     
-    print(f"📝 Questão: {questao[:100]}...")
-    print(f"✅ Alternativa correta: {alternativa_correta}")
-    print(f"❌ Alternativa escolhida: {alternativa_escolhida}")
-    print(f"📚 Matéria: {materia}")
-    print(f"🎯 Tema: {tema}")
-    sys.stdout.flush()
+    logger.info("Explicação solicitada", extra={'campos': {
+        'materia': materia, 'tema': tema,
+        'alternativa_correta': alternativa_correta, 'alternativa_escolhida': alternativa_escolhida
+    }})
+    logger.debug("Questão: %s", questao[:100])
     
     try:
         # Criar prompt para explicação detalhada
@@ -93,14 +88,11 @@ def obter_explicacao_perplexity():
         Seja didático e inclua referências normativas quando aplicável.
         """
         
-        print("🤖 Enviando prompt para o Perplexity...")
-        sys.stdout.flush()
-        
         # Usar o serviço ChatGPT/Perplexity para gerar explicação
         explicacao_detalhada = chatgpt_service.gerar_explicacao(prompt_explicacao)
         
         if explicacao_detalhada:
-            print(f"✅ Explicação gerada com sucesso: {explicacao_detalhada[:100]}...")
+            logger.debug("Explicação gerada: %s", explicacao_detalhada[:100])
             return jsonify({
                 'success': True,
                 'explicacao': explicacao_detalhada,
@@ -114,8 +106,7 @@ def obter_explicacao_perplexity():
             raise Exception("Não foi possível gerar explicação")
             
     except Exception as e:
-        print(f"❌ Erro ao gerar explicação: {e}")
-        sys.stdout.flush()
+        logger.error(f"Erro ao gerar explicação: {e}")
         
         # Fallback com explicação genérica
         explicacao_fallback = f"""
@@ -139,7 +130,6 @@ def obter_explicacao_perplexity():
             ]
         })
 
-@app.route('/api/simulados/submit', methods=['POST'])
 def submit_simulado():
     """Submete um simulado e calcula o score"""
     try:
@@ -183,10 +173,9 @@ def submit_simulado():
         })
         
     except Exception as e:
-        print(f"Erro ao processar simulado: {e}")
+        logger.error(f"Erro ao processar simulado: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
-@app.route('/api/performance', methods=['GET'])
 def get_performance():
     """Retorna dados de performance do usuário"""
     try:
@@ -216,10 +205,9 @@ def get_performance():
         }
         return jsonify(performance_data)
     except Exception as e:
-        print(f"Erro ao obter performance: {e}")
+        logger.error(f"Erro ao obter performance: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
-@app.route('/api/ranking', methods=['GET'])
 def get_ranking():
     """Retorna o ranking de usuários"""
     try:
@@ -236,9 +224,78 @@ def get_ranking():
         }
         return jsonify(ranking_data)
     except Exception as e:
-        print(f"Erro ao obter ranking: {e}")
+        logger.error(f"Erro ao obter ranking: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
+def criar_app() -> Flask:
+    """Monta a aplicação: extensões, blueprints e catálogos pré-computados
+    
+    Não cria clientes externos (Firestore, OpenAI, MercadoPago): eles nascem no
+    primeiro uso, o que permite carregar a app no master do gunicorn
+    (preload_app, ver gunicorn.conf.py) e compartilhar a memória com os workers.
+    """
+    app = Flask(__name__)
+    # jsonify com orjson e respostas msgpack via Accept
+    configurar_json(app)
+    CORS(app, origins=['http://localhost:3000', 'http://localhost:5173', 'https://j6h5i7c0x703.manus.space', 'https://gabaritai.app.br', 'https://www.gabaritai.app.br'], supports_credentials=True)
+
+    # Carrega configuração do MercadoPago para a app
+    app.config["MERCADOPAGO_ACCESS_TOKEN"] = os.getenv("MERCADOPAGO_ACCESS_TOKEN", "")
+
+    # Contabilização de leituras/escritas do Firestore por requisição e endpoint
+    firestore_repository.init_app(app)
+
+    # Métricas no formato Prometheus (GET /metrics)
+    metrics.init_app(app)
+
+    # X-Request-ID e traces amostrados (TRACE_SAMPLE_RATE)
+    tracer.init_app(app)
+
+    # Profiling de CPU/memória sob demanda (PROFILING_ENABLED)
+    profiler.init_app(app)
+
+    # Compressão gzip/brotli das respostas (COMPRESSION_MIN_SIZE)
+    compressao.init_app(app)
+
+    # Recarga do catálogo do edital quando o arquivo muda (CATALOGO_EDITAL_CHECK_INTERVAL)
+    catalogo_edital.init_app(app)
+
+    # Webhooks do MercadoPago processados em segundo plano (PAYMENTS_QUEUE_PATH)
+    fila_pagamentos.init_app(app)
+
+    # Reversão dos planos vencidos em segundo plano (PLAN_EXPIRY_SWEEP_INTERVAL)
+    varredura_planos.init_app(app)
+
+    # Registrar blueprints
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(questoes_bp, url_prefix='/api/questoes')
+    app.register_blueprint(planos_bp, url_prefix='/api')
+    app.register_blueprint(jogos_bp, url_prefix='/api/jogos')
+    app.register_blueprint(news_bp, url_prefix='/api')
+    app.register_blueprint(opcoes_bp, url_prefix='/api')
+    app.register_blueprint(payments_bp, url_prefix='/api')
+
+    # Catálogos estáticos: corpo, ETag e versões comprimidas montados uma única vez
+    respostas_estaticas.pre_aquecer(app, ['/api/planos', '/api/opcoes/cargos-blocos', '/api/news/categories'] + [
+        f"/api/opcoes/blocos/{quote(cargo)}" for cargo in catalogo_edital.cargos()
+    ] + [
+        f"/api/questoes/materias-foco/{quote(cargo)}/{quote(bloco)}"
+        for cargo in catalogo_edital.cargos() for bloco in catalogo_edital.blocos_do_cargo(cargo)
+    ])
+    # Nova versão do edital em disco: os corpos prontos são remontados no próximo acesso
+    catalogo_edital.ao_recarregar(respostas_estaticas.limpar)
+    
+    # Rotas definidas neste módulo
+    app.add_url_rule('/', view_func=root, methods=['GET'])
+    app.add_url_rule('/health', view_func=health_check, methods=['GET'])
+    app.add_url_rule('/api/perplexity/explicacao', view_func=obter_explicacao_perplexity, methods=['POST'])
+    app.add_url_rule('/api/simulados/submit', view_func=submit_simulado, methods=['POST'])
+    app.add_url_rule('/api/performance', view_func=get_performance, methods=['GET'])
+    app.add_url_rule('/api/ranking', view_func=get_ranking, methods=['GET'])
+    return app
+
+app = criar_app()
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -1,12 +1,16 @@
 """
 Rotas de autenticação para o Gabarita.AI
 """
+import logging
 from flask import Blueprint, request, jsonify
-from firebase_admin import auth, firestore
-from src.config.firebase_config import firebase_config
+from src.config.firebase_config import firebase_auth as auth
+from src.services.firestore_repository import firestore_repository
+from src.services.activity_tracker import activity_tracker
 import uuid
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['POST'])
@@ -22,7 +26,7 @@ def login():
         
         # Para desenvolvimento, simular autenticação
         # Em produção, usar Firebase Auth
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
                 # Tentar autenticar com Firebase
                 user = auth.get_user_by_email(email)
@@ -40,7 +44,7 @@ def login():
             except auth.UserNotFoundError:
                 return jsonify({'erro': 'Credenciais inválidas'}), 401
             except Exception as e:
-                print(f"Erro na autenticação Firebase: {e}")
+                logger.error(f"Erro na autenticação Firebase: {e}")
                 # Fallback para autenticação simulada
                 pass
         
@@ -66,7 +70,7 @@ def login():
         })
         
     except Exception as e:
-        print(f"Erro no login: {e}")
+        logger.error(f"Erro no login: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/signup', methods=['POST'])
@@ -94,7 +98,7 @@ def signup():
         nivel_escolaridade = data.get('nivel_escolaridade', 'Superior')
         
         # Verificar se e-mail já existe
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
                 # Tentar criar usuário no Firebase Auth
                 user = auth.create_user(
@@ -120,8 +124,7 @@ def signup():
                 }
                 
                 # Salvar no Firestore
-                db = firebase_config.get_db()
-                db.collection('usuarios').document(user.uid).set(usuario_data)
+                firestore_repository.salvar_usuario(user.uid, usuario_data, merge=False)
                 
                 return jsonify({
                     'sucesso': True,
@@ -132,7 +135,7 @@ def signup():
             except auth.EmailAlreadyExistsError:
                 return jsonify({'erro': 'E-mail já cadastrado'}), 409
             except Exception as e:
-                print(f"Erro no cadastro Firebase: {e}")
+                logger.error(f"Erro no cadastro Firebase: {e}")
                 # Fallback para cadastro simulado
                 pass
         
@@ -160,7 +163,7 @@ def signup():
         })
         
     except Exception as e:
-        print(f"Erro no cadastro: {e}")
+        logger.error(f"Erro no cadastro: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/verificar-token', methods=['POST'])
@@ -173,7 +176,7 @@ def verificar_token():
         if not token:
             return jsonify({'erro': 'Token é obrigatório'}), 400
         
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
                 # Verificar token com Firebase Auth
                 decoded_token = auth.verify_id_token(token)
@@ -196,7 +199,7 @@ def verificar_token():
             except auth.InvalidIdTokenError:
                 return jsonify({'erro': 'Token inválido'}), 401
             except Exception as e:
-                print(f"Erro na verificação do token: {e}")
+                logger.error(f"Erro na verificação do token: {e}")
                 # Fallback para verificação simulada
                 pass
         
@@ -218,7 +221,7 @@ def verificar_token():
         })
         
     except Exception as e:
-        print(f"Erro na verificação do token: {e}")
+        logger.error(f"Erro na verificação do token: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/google-auth', methods=['POST'])
@@ -231,7 +234,7 @@ def google_auth():
         if not id_token:
             return jsonify({'erro': 'Token do Google é obrigatório'}), 400
         
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
                 # Verificar o token do Google
                 decoded_token = auth.verify_id_token(id_token)
@@ -253,7 +256,6 @@ def google_auth():
                     })
                 else:
                     # Novo usuário, criar perfil básico
-                    db = firebase_config.get_db()
                     usuario_data = {
                         'nome': nome,
                         'nickname': nome.split(' ')[0] if nome else '',
@@ -267,7 +269,7 @@ def google_auth():
                     }
                     
                     # Salvar no Firestore
-                    db.collection('usuarios').document(uid).set(usuario_data)
+                    firestore_repository.salvar_usuario(uid, usuario_data, merge=False)
                     
                     return jsonify({
                         'sucesso': True,
@@ -279,7 +281,7 @@ def google_auth():
             except auth.InvalidIdTokenError:
                 return jsonify({'erro': 'Token do Google inválido'}), 401
             except Exception as e:
-                print(f"Erro na autenticação Google: {e}")
+                logger.error(f"Erro na autenticação Google: {e}")
                 return jsonify({'erro': 'Erro na autenticação com Google'}), 500
         else:
             # Modo desenvolvimento - simular autenticação Google
@@ -303,7 +305,7 @@ def google_auth():
             })
             
     except Exception as e:
-        print(f"Erro no Google Auth: {e}")
+        logger.error(f"Erro no Google Auth: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/complete-profile', methods=['POST'])
@@ -326,15 +328,14 @@ def complete_profile():
         if len(nickname) < 3 or len(nickname) > 20:
             return jsonify({'erro': 'Nickname deve ter entre 3 e 20 caracteres'}), 400
         
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
                 # Verificar se o token é válido
                 decoded_token = auth.verify_id_token(token)
                 uid = decoded_token['uid']
                 
                 # Atualizar perfil no Firestore
-                db = firebase_config.get_db()
-                db.collection('usuarios').document(uid).update({
+                firestore_repository.atualizar_usuario(uid, {
                     'nickname': nickname,
                     'profileComplete': True,
                     'updatedAt': datetime.now().isoformat()
@@ -352,7 +353,7 @@ def complete_profile():
             except auth.InvalidIdTokenError:
                 return jsonify({'erro': 'Token inválido'}), 401
             except Exception as e:
-                print(f"Erro ao completar perfil: {e}")
+                logger.error(f"Erro ao completar perfil: {e}")
                 return jsonify({'erro': 'Erro ao atualizar perfil'}), 500
         else:
             # Modo desenvolvimento
@@ -376,7 +377,7 @@ def complete_profile():
             })
             
     except Exception as e:
-        print(f"Erro ao completar perfil: {e}")
+        logger.error(f"Erro ao completar perfil: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -388,33 +389,24 @@ def logout():
         return jsonify({'sucesso': True, 'mensagem': 'Logout realizado com sucesso'})
         
     except Exception as e:
-        print(f"Erro no logout: {e}")
+        logger.error(f"Erro no logout: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 def _get_usuario_firestore(uid):
     """Busca dados do usuário no Firestore"""
     try:
-        db = firebase_config.get_db()
-        doc = db.collection('usuarios').document(uid).get()
-        
-        if doc.exists:
-            return doc.to_dict()
-        else:
-            return None
+        return firestore_repository.obter_usuario(uid)
             
     except Exception as e:
-        print(f"Erro ao buscar usuário no Firestore: {e}")
+        logger.error(f"Erro ao buscar usuário no Firestore: {e}")
         return None
 
 def _atualizar_ultimo_acesso(uid):
-    """Atualiza o último acesso do usuário"""
+    """Registra o último acesso do usuário (gravado em lote pelo activity_tracker)"""
     try:
-        db = firebase_config.get_db()
-        db.collection('usuarios').document(uid).update({
-            'ultimo_acesso': datetime.now().isoformat()
-        })
+        activity_tracker.registrar(uid, 'ultimo_acesso')
         
     except Exception as e:
-        print(f"Erro ao atualizar último acesso: {e}")
+        logger.error(f"Erro ao atualizar último acesso: {e}")
         pass
 
@@ -1,13 +1,17 @@
 """\nRotas para sistema de jogos educativos\n"""
+import logging
 from flask import Blueprint, request, jsonify
 from ..services.chatgpt_service import chatgpt_service
-from ..config.firebase_config import firebase_config
+from ..services.firestore_repository import firestore_repository
+from ..services.activity_tracker import activity_tracker
 from datetime import datetime, timedelta
 import uuid
 import random
 import json
 from typing import Dict, List, Any
 
+logger = logging.getLogger(__name__)
+
 # Importações dos prompts especializados
 try:
     from ..services.prompts_jogos import (
@@ -156,7 +160,7 @@ def iniciar_jogo(jogo_tipo):
         })
     
     except Exception as e:
-        print(f"Erro ao iniciar jogo: {e}")
+        logger.error(f"Erro ao iniciar jogo: {e}")
         return jsonify({'erro': str(e)}), 500
 
 @jogos_bp.route('/jogada', methods=['POST'])
@@ -512,7 +516,7 @@ def gerar_palavra_forca(bloco, dificuldade='medio'):
         return content
         
     except Exception as e:
-        print(f"Erro ao gerar palavra forca: {e}")
+        logger.error(f"Erro ao gerar palavra forca: {e}")
         # Fallback melhorado com mais opções
         palavras_mock = {
             'saude': [
@@ -558,7 +562,7 @@ def gerar_questoes_quiz(bloco, quantidade, dificuldade='medio'):
         return questoes
         
     except Exception as e:
-        print(f"Erro ao gerar questões quiz: {e}")
+        logger.error(f"Erro ao gerar questões quiz: {e}")
         # Fallback melhorado com questões por bloco
         questoes_mock = {
             'saude': [
@@ -635,7 +639,7 @@ def gerar_pares_memoria(bloco, quantidade, dificuldade='medio'):
         return pares
         
     except Exception as e:
-        print(f"Erro ao gerar pares memória: {e}")
+        logger.error(f"Erro ao gerar pares memória: {e}")
         # Fallback melhorado com pares por bloco
         pares_mock = {
             'saude': [
@@ -692,7 +696,7 @@ def gerar_palavras_cruzadas(bloco, quantidade, dificuldade='medio'):
         return palavras
         
     except Exception as e:
-        print(f"Erro ao gerar palavras cruzadas: {e}")
+        logger.error(f"Erro ao gerar palavras cruzadas: {e}")
         # Fallback melhorado com palavras por bloco
         palavras_mock = {
             'saude': [
@@ -749,16 +753,11 @@ def gerar_grid_palavras_cruzadas(palavras):
 
 def obter_plano_usuario(usuario_id):
     """Obtém o plano do usuário"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 return user_data.get('plano', 'trial')
         except:
             pass
@@ -767,74 +766,50 @@ def obter_plano_usuario(usuario_id):
 
 def salvar_sessao_jogo(sessao):
     """Salva a sessão do jogo no Firebase"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            db.collection('jogos_sessoes').document(sessao['id']).set(sessao)
+            firestore_repository.salvar_sessao_jogo(sessao)
         except Exception as e:
-            print(f'Erro ao salvar sessão: {e}')
+            logger.error(f'Erro ao salvar sessão: {e}')
 
 def buscar_sessao_jogo(sessao_id):
     """Busca uma sessão de jogo no Firebase"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            doc = db.collection('jogos_sessoes').document(sessao_id).get()
-            if doc.exists:
-                return doc.to_dict()
+            return firestore_repository.obter_sessao_jogo(sessao_id)
         except Exception as e:
-            print(f'Erro ao buscar sessão: {e}')
+            logger.error(f'Erro ao buscar sessão: {e}')
     
     return None
 
 def atualizar_sessao_jogo(sessao_id, sessao_atualizada):
     """Atualiza uma sessão de jogo no Firebase"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            db.collection('jogos_sessoes').document(sessao_id).update(sessao_atualizada)
+            firestore_repository.atualizar_sessao_jogo(sessao_id, sessao_atualizada)
         except Exception as e:
-            print(f'Erro ao atualizar sessão: {e}')
+            logger.error(f'Erro ao atualizar sessão: {e}')
 
 def atualizar_pontuacao_usuario(usuario_id, pontos):
     """Atualiza a pontuação do usuário"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                pontos_atuais = user_data.get('pontos_jogos', 0)
-                
-                user_ref.update({
-                    'pontos_jogos': pontos_atuais + pontos,
-                    'ultima_atividade_jogos': datetime.now().isoformat()
-                })
+            # Incremento atômico: dispensa a leitura prévia do usuário
+            firestore_repository.incrementar_usuario(usuario_id, {'pontos_jogos': pontos})
+            # ultima_atividade_jogos é gravada em lote pelo activity_tracker
+            activity_tracker.registrar(usuario_id, 'ultima_atividade_jogos')
         except Exception as e:
-            print(f'Erro ao atualizar pontuação: {e}')
+            logger.error(f'Erro ao atualizar pontuação: {e}')
 
 def obter_ranking_jogos(bloco, limite):
     """Obtém o ranking de jogadores"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            query = db.collection('usuarios')
+            query = firestore_repository.db.collection('usuarios')
             if bloco != 'geral':
                 query = query.where('bloco', '==', bloco)
             
-            docs = query.order_by('pontos_jogos', direction=firestore.Query.DESCENDING).limit(limite).get()
+            docs = query.order_by('pontos_jogos', direction=firestore_repository.DESCENDENTE).limit(limite).get()
             
             ranking = []
             for i, doc in enumerate(docs):
@@ -848,37 +823,29 @@ def obter_ranking_jogos(bloco, limite):
             
             return ranking
         except Exception as e:
-            print(f'Erro ao obter ranking: {e}')
+            logger.error(f'Erro ao obter ranking: {e}')
     
     return []
 
 def obter_estatisticas_usuario(usuario_id):
     """Obtém estatísticas de jogos do usuário"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
             # Buscar dados do usuário
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
-                
+            if user_data:
                 # Buscar sessões de jogos do usuário
-                sessoes_query = db.collection('jogos_sessoes').where('usuario_id', '==', usuario_id)
-                sessoes_docs = sessoes_query.get()
+                sessoes = firestore_repository.listar_sessoes_jogo(usuario_id)
                 
                 stats = {
                     'pontos_total': user_data.get('pontos_jogos', 0),
-                    'jogos_jogados': len(sessoes_docs),
+                    'jogos_jogados': len(sessoes),
                     'jogos_por_tipo': {},
                     'ultima_atividade': user_data.get('ultima_atividade_jogos')
                 }
                 
-                for doc in sessoes_docs:
-                    sessao = doc.to_dict()
+                for sessao in sessoes:
                     tipo = sessao.get('tipo', 'desconhecido')
                     
                     if tipo not in stats['jogos_por_tipo']:
@@ -897,7 +864,7 @@ def obter_estatisticas_usuario(usuario_id):
                 
                 return stats
         except Exception as e:
-            print(f'Erro ao obter estatísticas: {e}')
+            logger.error(f'Erro ao obter estatísticas: {e}')
     
     return {
         'pontos_total': 0,
@@ -921,7 +888,7 @@ def validar_resposta_gpt():
             return jsonify({'erro': 'Dados incompletos'}), 400
             
         # Busca sessão do jogo
-        sessao = obter_sessao_jogo(session_id)
+        sessao = buscar_sessao_jogo(session_id)
         if not sessao:
             return jsonify({'erro': 'Sessão não encontrada'}), 404
             
@@ -960,7 +927,7 @@ def validar_resposta_gpt():
             'timestamp': datetime.now().isoformat()
         })
         
-        salvar_sessao_jogo(session_id, sessao)
+        atualizar_sessao_jogo(session_id, sessao)
         
         return jsonify({
             'validacao': validacao,
@@ -968,7 +935,7 @@ def validar_resposta_gpt():
         })
         
     except Exception as e:
-        print(f"Erro ao validar resposta: {e}")
+        logger.error(f"Erro ao validar resposta: {e}")
         return jsonify({'erro': str(e)}), 500
 
 @jogos_bp.route('/dica', methods=['POST'])
@@ -983,7 +950,7 @@ def obter_dica_gpt():
             return jsonify({'erro': 'session_id é obrigatório'}), 400
             
         # Busca sessão do jogo
-        sessao = obter_sessao_jogo(session_id)
+        sessao = buscar_sessao_jogo(session_id)
         if not sessao:
             return jsonify({'erro': 'Sessão não encontrada'}), 404
             
@@ -1019,7 +986,7 @@ def obter_dica_gpt():
         sessao['pontos'] -= custo
         sessao['dicas_usadas'] = sessao.get('dicas_usadas', 0) + 1
         
-        salvar_sessao_jogo(session_id, sessao)
+        atualizar_sessao_jogo(session_id, sessao)
         
         return jsonify({
             'dica': dica_data,
@@ -1028,7 +995,7 @@ def obter_dica_gpt():
         })
         
     except Exception as e:
-        print(f"Erro ao obter dica: {e}")
+        logger.error(f"Erro ao obter dica: {e}")
         return jsonify({'erro': str(e)}), 500
 
 @jogos_bp.route('/feedback-sessao', methods=['POST'])
@@ -1042,7 +1009,7 @@ def obter_feedback_sessao():
             return jsonify({'erro': 'session_id é obrigatório'}), 400
             
         # Busca sessão do jogo
-        sessao = obter_sessao_jogo(session_id)
+        sessao = buscar_sessao_jogo(session_id)
         if not sessao:
             return jsonify({'erro': 'Sessão não encontrada'}), 404
             
@@ -1086,7 +1053,7 @@ def obter_feedback_sessao():
         # Salva feedback na sessão
         sessao['feedback_final'] = feedback_data
         sessao['status'] = 'finalizado'
-        salvar_sessao_jogo(session_id, sessao)
+        atualizar_sessao_jogo(session_id, sessao)
         
         return jsonify({
             'feedback': feedback_data,
@@ -1101,7 +1068,7 @@ def obter_feedback_sessao():
         })
         
     except Exception as e:
-        print(f"Erro ao obter feedback: {e}")
+        logger.error(f"Erro ao obter feedback: {e}")
         return jsonify({'erro': str(e)}), 500
 
 # Sistema de roleta para economizar questões
@@ -1154,10 +1121,9 @@ def sistema_roleta():
 
 def verificar_limite_roleta(usuario_id):
     """Verifica se o usuário pode usar a roleta hoje"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
+            db = firestore_repository.db
             
             hoje = datetime.now().date().isoformat()
             
@@ -1188,59 +1154,32 @@ def sortear_premio_roleta(premios):
 
 def aplicar_premio_roleta(usuario_id, premio):
     """Aplica o prêmio sorteado ao usuário"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                updates = {}
-                
-                if premio['tipo'] == 'tentativas_extra':
-                    user_data = user_doc.to_dict()
-                    tentativas_atuais = user_data.get('tentativas_extra_jogos', 0)
-                    updates['tentativas_extra_jogos'] = tentativas_atuais + premio['valor']
-                
-                elif premio['tipo'] == 'pontos_bonus':
-                    user_data = user_doc.to_dict()
-                    pontos_atuais = user_data.get('pontos_jogos', 0)
-                    updates['pontos_jogos'] = pontos_atuais + premio['valor']
-                
-                elif premio['tipo'] == 'jogo_gratis':
-                    user_data = user_doc.to_dict()
-                    jogos_gratis = user_data.get('jogos_premium_gratis', 0)
-                    updates['jogos_premium_gratis'] = jogos_gratis + premio['valor']
-                
-                if updates:
-                    user_ref.update(updates)
+            # Campo incrementado por tipo de prêmio (incremento atômico, sem leitura prévia)
+            campos_premio = {
+                'tentativas_extra': 'tentativas_extra_jogos',
+                'pontos_bonus': 'pontos_jogos',
+                'jogo_gratis': 'jogos_premium_gratis'
+            }
+            campo = campos_premio.get(premio['tipo'])
+            if campo:
+                firestore_repository.incrementar_usuario(usuario_id, {campo: premio['valor']})
         except Exception as e:
-            print(f'Erro ao aplicar prêmio: {e}')
+            logger.error(f'Erro ao aplicar prêmio: {e}')
 
 def registrar_uso_roleta(usuario_id):
     """Registra o uso da roleta pelo usuário"""
-    if firebase_config.is_configured():
+    if firestore_repository.is_connected():
         try:
-            from firebase_admin import firestore
-            db = firestore.client()
-            
             hoje = datetime.now().date().isoformat()
             doc_id = f'{usuario_id}_{hoje}'
             
-            doc_ref = db.collection('roleta_usos').document(doc_id)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                usos_atuais = data.get('usos', 0)
-                doc_ref.update({'usos': usos_atuais + 1})
-            else:
-                doc_ref.set({
-                    'usuario_id': usuario_id,
-                    'data': hoje,
-                    'usos': 1
-                })
+            # set com merge + Increment cria ou atualiza o contador numa única escrita
+            firestore_repository.db.collection('roleta_usos').document(doc_id).set({
+                'usuario_id': usuario_id,
+                'data': hoje,
+                'usos': firestore_repository.incremento(1)
+            }, merge=True)
         except Exception as e:
-            print(f'Erro ao registrar uso da roleta: {e}')
\ No newline at end of file
+            logger.error(f'Erro ao registrar uso da roleta: {e}')
\ No newline at end of file
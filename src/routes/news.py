@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime, timedelta
 import random
+from ..services.respostas_estaticas import respostas_estaticas
 
 news_bp = Blueprint('news', __name__)
 
@@ -110,10 +111,12 @@ def get_news_by_id(news_id):
         }), 500
 
 @news_bp.route('/news/categories', methods=['GET'])
+@respostas_estaticas.imutavel
 def get_news_categories():
     """Retorna lista de categorias disponíveis"""
     try:
-        categories = list(set([news['category'] for news in MOCK_NEWS]))
+        # Ordenadas: o corpo (e o ETag) é o mesmo em todos os workers
+        categories = sorted(set(news['category'] for news in MOCK_NEWS))
         
         return jsonify({
             'success': True,
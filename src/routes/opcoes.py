@@ -1,44 +1,42 @@
+import logging
 from flask import Blueprint, jsonify
-from src.routes.questoes import CONTEUDOS_EDITAL
+from src.services.catalogo_edital import catalogo_edital
+from src.services.respostas_estaticas import respostas_estaticas
+
+logger = logging.getLogger(__name__)
 
 opcoes_bp = Blueprint('opcoes', __name__)
 
 @opcoes_bp.route('/opcoes/cargos-blocos', methods=['GET'])
+@respostas_estaticas.imutavel
 def get_cargos_blocos():
     """Endpoint para obter lista de cargos e blocos disponíveis"""
     try:
-        # Extrair cargos e seus blocos do mapeamento CONTEUDOS_EDITAL
-        opcoes = {}
-        
-        for cargo, blocos_data in CONTEUDOS_EDITAL.items():
-            opcoes[cargo] = list(blocos_data.keys())
-        
-        # Criar lista única de blocos para facilitar a busca
-        todos_blocos = set()
-        for blocos in opcoes.values():
-            todos_blocos.update(blocos)
+        # Índices cargo → blocos já compilados no catálogo do edital
+        opcoes = {cargo: catalogo_edital.blocos_do_cargo(cargo) for cargo in catalogo_edital.cargos()}
         
         return jsonify({
             'sucesso': True,
             'dados': {
                 'cargos_blocos': opcoes,
                 'todos_cargos': list(opcoes.keys()),
-                'todos_blocos': sorted(list(todos_blocos))
+                'todos_blocos': catalogo_edital.todos_blocos()
             }
         }), 200
         
     except Exception as e:
-        print(f"Erro ao obter opções: {str(e)}")
+        logger.error(f"Erro ao obter opções: {str(e)}")
         return jsonify({
             'sucesso': False,
             'erro': 'Erro interno do servidor'
         }), 500
 
 @opcoes_bp.route('/opcoes/blocos/<cargo>', methods=['GET'])
+@respostas_estaticas.imutavel
 def get_blocos_por_cargo(cargo):
     """Endpoint para obter blocos disponíveis para um cargo específico"""
     try:
-        blocos = list(CONTEUDOS_EDITAL.get(cargo, {}).keys())
+        blocos = catalogo_edital.blocos_do_cargo(cargo)
         
         if not blocos:
             return jsonify({
@@ -55,7 +53,7 @@ def get_blocos_por_cargo(cargo):
         }), 200
         
     except Exception as e:
-        print(f"Erro ao obter blocos para cargo {cargo}: {str(e)}")
+        logger.error(f"Erro ao obter blocos para cargo {cargo}: {str(e)}")
         return jsonify({
             'sucesso': False,
             'erro': 'Erro interno do servidor'
@@ -1,16 +1,18 @@
-import os
 from flask import Blueprint, current_app, jsonify, request
-import mercadopago
+from ..services.fila_pagamentos import fila_pagamentos
+from ..services.mercadopago_client import mercadopago_client
 
 payments_bp = Blueprint("payments", __name__)
 
+# Status que o MercadoPago não muda mais para fins de ativação do plano
+STATUS_FINAIS = {'approved', 'rejected', 'cancelled', 'refunded', 'charged_back'}
+
+# O MercadoPago trunca external_reference em 256 caracteres (tokens JWT longos)
+LIMITE_EXTERNAL_REFERENCE = 256
+
 def get_mp_sdk():
-    """Inicializa o SDK do MercadoPago de forma lazy com validação"""
-    token = current_app.config.get("MERCADOPAGO_ACCESS_TOKEN") or os.getenv("MERCADOPAGO_ACCESS_TOKEN")
-    if not isinstance(token, str) or not token.strip():
-        # Deixa claro no log e evita quebrar o processo inteiro
-        raise RuntimeError("MERCADOPAGO_ACCESS_TOKEN não configurado. Defina a env var no Render.")
-    return mercadopago.SDK(token)
+    """SDK do MercadoPago compartilhado pelo processo (criado no primeiro uso, com validação do token)"""
+    return mercadopago_client.sdk
 
 @payments_bp.route("/payments/ping", methods=["GET"])
 def payments_ping():
@@ -39,7 +41,7 @@ def payments_ping():
 def create_payment_preference():
     """Cria uma preferência de pagamento no MercadoPago"""
     try:
-        sdk = get_mp_sdk()
+        get_mp_sdk()
         
         data = request.get_json()
         if not data:
@@ -72,7 +74,7 @@ def create_payment_preference():
         if "external_reference" in data:
             preference_data["external_reference"] = data["external_reference"]
         
-        preference_response = sdk.preference().create(preference_data)
+        preference_response = mercadopago_client.criar_preferencia(preference_data)
         preference = preference_response["response"]
         
         return jsonify({
@@ -95,9 +97,68 @@ def create_payment_preference():
             "error": "Erro interno do servidor"
         }), 500
 
+def _consultar_pagamento(payment_id, user_id=None, usar_cache=False):
+    """Consulta o pagamento no MercadoPago, grava o status e ativa o plano se aprovado
+    
+    O worker do webhook consulta sem cache (a notificação indica mudança de status);
+    o /payments/verify aceita o status em cache por alguns segundos.
+    """
+    payment_info = mercadopago_client.consultar_pagamento(payment_id, usar_cache=usar_cache)
+    if payment_info.get("status") != 200:
+        # Notificações podem chegar antes do pagamento ficar visível na API: a fila tenta de novo
+        raise RuntimeError(f"MercadoPago respondeu {payment_info.get('status')} para o pagamento {payment_id}")
+    payment_data = payment_info["response"]
+    
+    status = payment_data.get('status')
+    metadata = payment_data.get('metadata') or {}
+    external_reference = payment_data.get('external_reference')
+    if external_reference and len(external_reference) >= LIMITE_EXTERNAL_REFERENCE:
+        # Referência possivelmente truncada: o usuário vem do /payments/verify
+        external_reference = None
+    user_id = user_id or metadata.get('user_id') or external_reference
+    # Como padrão, assumimos premium se o tipo não veio no metadata
+    tipo_plano = metadata.get('tipo_plano') or 'premium'
+    
+    fila_pagamentos.registrar_status(payment_id, status, user_id, tipo_plano, {
+        'status_detail': payment_data.get('status_detail'),
+        'external_reference': payment_data.get('external_reference'),
+    })
+    if status == 'approved' and user_id:
+        _ativar_uma_vez(payment_id, user_id, tipo_plano)
+
+def _ativar_uma_vez(payment_id, user_id, tipo_plano):
+    """Ativa o plano do pagamento; chamadas concorrentes ou repetidas não ativam de novo"""
+    if not fila_pagamentos.reservar_ativacao(payment_id):
+        return False
+    from .planos import ativar_plano_usuario
+    try:
+        ativar_plano_usuario(user_id, tipo_plano, pagamento_id=payment_id)
+    except Exception:
+        fila_pagamentos.liberar_ativacao(payment_id)
+        raise
+    fila_pagamentos.concluir_ativacao(payment_id, user_id)
+    current_app.logger.info(f"Plano {tipo_plano} ativado para {user_id} (pagamento {payment_id})")
+    return True
+
+fila_pagamentos.registrar_processador(_consultar_pagamento)
+
+def _id_pagamento_notificado(data, args):
+    """payment_id de uma notificação do MercadoPago (webhook JSON ou IPN na query string)"""
+    tipo = data.get('type') or data.get('topic') or args.get('type') or args.get('topic')
+    if tipo and tipo != 'payment':
+        return None
+    payment_id = (data.get('data') or {}).get('id') or args.get('data.id')
+    if not payment_id and tipo == 'payment':
+        payment_id = data.get('id') or args.get('id')
+    return str(payment_id) if payment_id else None
+
 @payments_bp.route("/payments/verify", methods=["POST"])
 def verify_payment():
-    """Endpoint para verificar o pagamento manualmente via frontend após o sucesso"""
+    """Endpoint para verificar o pagamento manualmente via frontend após o sucesso
+    
+    Responde pelo status já processado a partir do webhook; o MercadoPago só é
+    consultado se o pagamento ainda não chegou à fila ou não está em status final.
+    """
     try:
         data = request.get_json()
         payment_id = data.get('payment_id')
@@ -105,23 +166,33 @@ def verify_payment():
         
         if not payment_id:
             return jsonify({"success": False, "error": "payment_id é obrigatório"}), 400
-            
-        sdk = get_mp_sdk()
-        payment_info = sdk.payment().get(payment_id)
-        payment_data = payment_info["response"]
+        payment_id = str(payment_id)
         
-        status = payment_data.get('status')
-        external_reference = payment_data.get('external_reference')
+        pagamento = fila_pagamentos.status(payment_id)
+        if pagamento is None or pagamento['status'] not in STATUS_FINAIS:
+            _consultar_pagamento(payment_id, user_id_request, usar_cache=True)
+            pagamento = fila_pagamentos.status(payment_id)
         
+        status = pagamento['status']
         # Priorizar user_id enviado pelo front se o external_reference parecer truncado
         # (O MP trunca após 256 caracteres, o que acontece com tokens JWT longos)
-        user_id = user_id_request if user_id_request else external_reference
+        user_id = pagamento['ativado_para'] or user_id_request or pagamento['user_id']
         
         if status == 'approved' and user_id:
-            from .planos import ativar_plano_usuario
-            # Determinar tipo de plano (pode vir no metadata ou external_ref se não for apenas o ID)
-            # Como padrão para verificação manual, assumimos premium se o pagamento foi aprovado
-            ativar_plano_usuario(user_id, 'premium')
+            ativado = pagamento['ativacao'] == 'concluida'
+            if not ativado:
+                ativado = _ativar_uma_vez(payment_id, user_id, pagamento['tipo_plano'] or 'premium') \
+                    or fila_pagamentos.status(payment_id)['ativacao'] == 'concluida'
+            
+            if not ativado:
+                # Ativação reservada por outro worker (ou reserva ainda no prazo): o front consulta de novo
+                return jsonify({
+                    "success": False,
+                    "status": status,
+                    "user_id": user_id,
+                    "ativacao": "em_andamento",
+                    "message": "Pagamento aprovado; ativação do plano em andamento"
+                }), 202
             
             return jsonify({
                 "success": True,
@@ -142,13 +213,18 @@ def verify_payment():
 
 @payments_bp.route("/payments/webhook", methods=["POST"])
 def payment_webhook():
-    """Webhook para receber notificações do MercadoPago"""
+    """Webhook para receber notificações do MercadoPago
+    
+    Só enfileira o ID do pagamento; a consulta ao MercadoPago e a ativação do
+    plano acontecem no worker da fila (src/services/fila_pagamentos.py).
+    """
     try:
-        data = request.get_json()
-        current_app.logger.info(f"Webhook recebido: {data}")
+        data = request.get_json(silent=True) or {}
+        current_app.logger.debug("Webhook recebido: %s", data)
         
-        # Aqui você pode processar a notificação do pagamento
-        # Por exemplo, atualizar o status do pedido no banco de dados
+        payment_id = _id_pagamento_notificado(data, request.args)
+        if payment_id:
+            fila_pagamentos.enfileirar(payment_id)
         
         return jsonify({"success": True}), 200
         
@@ -1,12 +1,18 @@
+import logging
 from flask import Blueprint, request, jsonify
 from ..services.plano_service import plano_service
-from firebase_admin import auth
+from ..services.firestore_repository import firestore_repository
+from ..services.respostas_estaticas import respostas_estaticas
+from ..services.paginacao import tamanho_pagina
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 planos_bp = Blueprint('planos', __name__)
 
 @planos_bp.route('/planos', methods=['GET'])
 @planos_bp.route('/plans', methods=['GET'])  # Alias em inglês
+@respostas_estaticas.imutavel
 def listar_planos():
     """Lista todos os planos disponíveis"""
     try:
@@ -134,7 +140,7 @@ def listar_planos():
         })
         
     except Exception as e:
-        print(f"Erro ao listar planos: {e}")
+        logger.error(f"Erro ao listar planos: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/usuario', methods=['GET'])
@@ -160,7 +166,7 @@ def obter_plano_usuario():
         })
         
     except Exception as e:
-        print(f"Erro ao obter plano do usuário: {e}")
+        logger.error(f"Erro ao obter plano do usuário: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/ativar', methods=['POST'])
@@ -194,7 +200,7 @@ def ativar_plano():
     except ValueError as e:
         return jsonify({'erro': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao ativar plano: {e}")
+        logger.error(f"Erro ao ativar plano: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/verificar-acesso', methods=['POST'])
@@ -224,7 +230,7 @@ def verificar_acesso():
         })
         
     except Exception as e:
-        print(f"Erro ao verificar acesso: {e}")
+        logger.error(f"Erro ao verificar acesso: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/limite-questoes', methods=['GET'])
@@ -248,7 +254,7 @@ def obter_limite_questoes():
         })
         
     except Exception as e:
-        print(f"Erro ao obter limite de questões: {e}")
+        logger.error(f"Erro ao obter limite de questões: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/processar-pagamento', methods=['POST'])
@@ -309,12 +315,12 @@ def processar_pagamento():
     except ValueError as e:
         return jsonify({'erro': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao processar pagamento: {e}")
+        logger.error(f"Erro ao processar pagamento: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @planos_bp.route('/planos/historico', methods=['GET'])
 def obter_historico_planos():
-    """Obtém o histórico de planos do usuário"""
+    """Obtém o histórico de planos do usuário (paginado por `limite` e `cursor`)"""
     try:
         # Obter token do header Authorization
         auth_header = request.headers.get('Authorization')
@@ -325,24 +331,33 @@ def obter_historico_planos():
         user_id = token
         
         # Buscar histórico no Firestore
-        db = plano_service.db
-        if not db:
-            return jsonify({
-                'sucesso': True,
-                'historico': []
-            })
-        
-        historico_docs = db.collection('historico_planos').where('user_id', '==', user_id).order_by('data_registro', direction=firestore.Query.DESCENDING).get()
-        
-        historico = []
-        for doc in historico_docs:
-            historico.append(doc.to_dict())
+        limite = tamanho_pagina(request.args.get('limite'), 50)
+        historico, proximo_cursor = firestore_repository.listar_historico_planos(
+            user_id, limite, request.args.get('cursor'))
         
         return jsonify({
             'sucesso': True,
-            'historico': historico
+            'historico': historico,
+            'proximo_cursor': proximo_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao obter histórico de planos: {e}")
-        return jsonify({'erro': 'Erro interno do servidor'}), 500
\ No newline at end of file
+        logger.error(f"Erro ao obter histórico de planos: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+
+def ativar_plano_usuario(user_id, tipo_plano, pagamento_id=None):
+    """Ativa o plano pago após a confirmação do MercadoPago
+    
+    Idempotente por pagamento: se o plano atual já foi ativado por este
+    pagamento_id (ex.: o processo caiu antes de marcar a ativação como
+    concluída), nada é regravado e a validade não é estendida de novo.
+    """
+    if pagamento_id:
+        plano_atual = (firestore_repository.obter_usuario(user_id) or {}).get('plano') or {}
+        if isinstance(plano_atual, dict) and plano_atual.get('pagamento_id') == str(pagamento_id):
+            logger.info(f"Pagamento {pagamento_id} já ativou o plano do usuário {user_id}")
+            return plano_atual
+    return plano_service.ativar_plano(user_id, tipo_plano, 'mercado_pago', pagamento_id=pagamento_id)
@@ -1,15 +1,38 @@
 """
 Rotas para geração e gerenciamento de questões
 """
-from flask import Blueprint, request, jsonify
+import logging
+import os
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from ..services.chatgpt_service import chatgpt_service
 from ..services.perplexity_service import perplexity_service
-from ..config.firebase_config import firebase_config
-from datetime import datetime
+from ..services.firestore_repository import firestore_repository
+from ..services.activity_tracker import activity_tracker
+from ..services.tracing import tracer
+from ..services.respostas_estaticas import respostas_estaticas
+from ..services.catalogo_edital import catalogo_edital
+from ..services.paginacao import tamanho_pagina
+from ..services import log_respostas
+from ..services import exportacao
+from ..services import revisao_espacada
+from ..services import proficiencia
+from ..services.amostrador_topicos import amostrador_topicos
+from ..services.compressao import compressao
+from datetime import datetime, timezone
 import uuid
 
+logger = logging.getLogger(__name__)
+
 questoes_bp = Blueprint('questoes', __name__)
 
+# Fonte das questões de /gerar quando o pedido não informa 'fonte':
+# 'ia' (ChatGPT) ou 'banco' (provas anteriores importadas, sem latência de LLM)
+FONTES_QUESTAO = ('ia', 'banco')
+FONTE_PADRAO = os.getenv('QUESTOES_FONTE_PADRAO', 'ia')
+
+# Prefixo dos IDs de banco_questoes (ver importador_questoes.id_questao)
+PREFIXO_BANCO = 'b_'
+
 @questoes_bp.route('/responder', methods=['POST'])
 def responder_questao():
     """
@@ -31,24 +54,26 @@ def responder_questao():
         alternativa_escolhida = data['alternativa_escolhida']
         tempo_resposta = data.get('tempo_resposta', 0)
         
-        # Simular busca da questão (em produção, buscar do banco de dados)
-        # Por enquanto, vamos simular o gabarito baseado na questão
+        # Questões importadas têm gabarito oficial em banco_questoes (uma leitura);
+        # as geradas por IA ainda não são guardadas, então o gabarito é simulado
         gabarito_simulado = 'B'  # Gabarito padrão para simulação
+        questao_banco = None
+        if str(questao_id).startswith(PREFIXO_BANCO):
+            try:
+                questao_banco = firestore_repository.obter_questao_banco(questao_id)
+            except Exception as e:
+                logger.error(f"Erro ao buscar questão do banco: {e}")
+        if questao_banco:
+            gabarito_simulado = questao_banco['gabarito']
         acertou = alternativa_escolhida == gabarito_simulado
         
         # Atualizar estatísticas do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
+        if firestore_repository.is_connected():
             try:
-                from firebase_admin import firestore
-                db = firestore.client()
-                
                 # Buscar dados atuais do usuário
-                user_ref = db.collection('usuarios').document(usuario_id)
-                user_doc = user_ref.get()
+                user_data = firestore_repository.obter_usuario(usuario_id)
                 
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
-                else:
+                if not user_data:
                     user_data = {
                         'questoes_respondidas': 0,
                         'acertos': 0,
@@ -62,22 +87,67 @@ def responder_questao():
                     'questoes_respondidas': user_data.get('questoes_respondidas', 0) + 1,
                     'acertos': user_data.get('acertos', 0) + (1 if acertou else 0),
                     'sequencia_atual': user_data.get('sequencia_atual', 0) + 1 if acertou else 0,
-                    'xp': user_data.get('xp', 0) + (10 if acertou else 3),
-                    'ultima_atividade': datetime.now().isoformat()
+                    'xp': user_data.get('xp', 0) + (10 if acertou else 3)
                 }
                 
                 # Calcular novo nível
                 novas_stats['nivel'] = (novas_stats['xp'] // 100) + 1
                 
-                # Atualizar no Firestore
-                user_ref.set(novas_stats, merge=True)
+                # Rating Elo do usuário no tópico (e da questão, se for do banco): O(1), sem leituras extras
+                campos_proficiencia = {}
+                topico_id = (questao_banco or {}).get('topico_id')
+                if topico_id is None and data.get('tema'):
+                    topico = catalogo_edital.resolver_topico(data['tema'], user_data.get('cargo'), user_data.get('bloco'))
+                    topico_id = topico.id if topico else None
+                if topico_id:
+                    campos_proficiencia, campos_questao = proficiencia.atualizar(user_data, topico_id, acertou, questao_banco)
+                    if campos_questao:
+                        firestore_repository.atualizar_questao_banco(questao_id, campos_questao)
+                
+                # Erros por tema (nome do tópico do edital quando reconhecido): pesos do sorteio de tópicos
+                if not acertou:
+                    topico = catalogo_edital.topico(topico_id) if topico_id else None
+                    tema_erro = topico.nome if topico else data.get('tema')
+                    if tema_erro:
+                        campos_proficiencia['erros_por_tema'] = {tema_erro: firestore_repository.incremento(1)}
+                
+                # Atualizar no Firestore (ultima_atividade é gravada em lote pelo activity_tracker)
+                firestore_repository.salvar_usuario(usuario_id, dict(novas_stats, **campos_proficiencia))
+                agora = datetime.now()
+                
+                # Uma entrada no log de respostas (histórico, estatísticas e atividades leem daqui)
+                log_respostas.registrar(
+                    usuario_id,
+                    questao_id=questao_id,
+                    acertou=acertou,
+                    respondida_em=agora,
+                    questao=data.get('questao') or (questao_banco or {}).get('questao'),
+                    tema=data.get('tema') or (questao_banco or {}).get('tema'),
+                    materia=data.get('materia'),
+                    alternativa_escolhida=alternativa_escolhida,
+                    gabarito=gabarito_simulado,
+                    tempo_resposta=tempo_resposta
+                )
+                # Fila de revisão espaçada: erros entram, respostas a questões da fila reagendam
+                revisao_espacada.registrar(
+                    usuario_id,
+                    questao_id,
+                    acertou,
+                    tempo_resposta=tempo_resposta,
+                    questao=data.get('questao') or (questao_banco or {}).get('questao'),
+                    tema=data.get('tema') or (questao_banco or {}).get('tema')
+                )
+                activity_tracker.registrar(usuario_id, 'ultima_atividade', agora)
+                novas_stats['ultima_atividade'] = agora.isoformat()
                 
             except Exception as e:
-                print(f"Erro ao atualizar Firestore: {e}")
+                logger.error(f"Erro ao atualizar Firestore: {e}")
         
         # Gerar explicação usando Perplexity para questões erradas
         explicacao = "Explicação não disponível no momento."
-        if not acertou:
+        if questao_banco and questao_banco.get('explicacao'):
+            explicacao = questao_banco['explicacao']
+        elif not acertou:
             try:
                 prompt_explicacao = f"""
                 Explique de forma didática por que a alternativa {gabarito_simulado} é a correta 
@@ -86,12 +156,12 @@ def responder_questao():
                 """
                 explicacao = perplexity_service.gerar_explicacao(prompt_explicacao)
             except Exception as e:
-                print(f"Erro ao gerar explicação Perplexity: {e}")
+                logger.error(f"Erro ao gerar explicação Perplexity: {e}")
                 # Fallback para ChatGPT se Perplexity falhar
                 try:
                     explicacao = chatgpt_service.gerar_explicacao(prompt_explicacao)
                 except Exception as e2:
-                    print(f"Erro ao gerar explicação ChatGPT: {e2}")
+                    logger.error(f"Erro ao gerar explicação ChatGPT: {e2}")
         
         return jsonify({
             'sucesso': True,
@@ -104,7 +174,7 @@ def responder_questao():
         })
         
     except Exception as e:
-        print(f"Erro ao processar resposta: {e}")
+        logger.error(f"Erro ao processar resposta: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
@@ -145,7 +215,7 @@ def chat_tira_duvidas():
         try:
             resposta = perplexity_service.gerar_explicacao(prompt_chat)
         except Exception as e:
-            print(f"Erro Perplexity: {e}")
+            logger.error(f"Erro Perplexity: {e}")
             resposta = chatgpt_service.gerar_explicacao(prompt_chat)
         
         return jsonify({
@@ -155,7 +225,7 @@ def chat_tira_duvidas():
         })
         
     except Exception as e:
-        print(f"Erro no chat tira-dúvidas: {e}")
+        logger.error(f"Erro no chat tira-dúvidas: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
@@ -180,10 +250,10 @@ def obter_macetes(questao_id):
         """
         
         try:
-            macetes = perplexity_service.gerar_explicacao(prompt_macetes)
+            macetes = perplexity_service.gerar_explicacao(prompt_macetes, tipo_prompt='macetes')
         except Exception as e:
-            print(f"Erro Perplexity: {e}")
-            macetes = chatgpt_service.gerar_explicacao(prompt_macetes)
+            logger.error(f"Erro Perplexity: {e}")
+            macetes = chatgpt_service.gerar_explicacao(prompt_macetes, tipo_prompt='macetes')
         
         return jsonify({
             'sucesso': True,
@@ -192,7 +262,7 @@ def obter_macetes(questao_id):
         })
         
     except Exception as e:
-        print(f"Erro ao obter macetes: {e}")
+        logger.error(f"Erro ao obter macetes: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
@@ -219,7 +289,7 @@ def obter_pontos_centrais(questao_id):
         try:
             pontos = perplexity_service.gerar_explicacao(prompt_pontos)
         except Exception as e:
-            print(f"Erro Perplexity: {e}")
+            logger.error(f"Erro Perplexity: {e}")
             pontos = chatgpt_service.gerar_explicacao(prompt_pontos)
         
         return jsonify({
@@ -229,7 +299,7 @@ def obter_pontos_centrais(questao_id):
         })
         
     except Exception as e:
-        print(f"Erro ao obter pontos centrais: {e}")
+        logger.error(f"Erro ao obter pontos centrais: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
@@ -256,7 +326,7 @@ def obter_outras_exploracoes(questao_id):
         try:
             exploracoes = perplexity_service.gerar_explicacao(prompt_exploracoes)
         except Exception as e:
-            print(f"Erro Perplexity: {e}")
+            logger.error(f"Erro Perplexity: {e}")
             exploracoes = chatgpt_service.gerar_explicacao(prompt_exploracoes)
         
         return jsonify({
@@ -266,7 +336,7 @@ def obter_outras_exploracoes(questao_id):
         })
         
     except Exception as e:
-        print(f"Erro ao obter outras explorações: {e}")
+        logger.error(f"Erro ao obter outras explorações: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
@@ -278,16 +348,11 @@ def buscar_estatisticas(usuario_id):
     Rota para buscar estatísticas do usuário
     """
     try:
-        if firebase_config.is_configured():
+        if firestore_repository.is_connected():
             try:
-                from firebase_admin import firestore
-                db = firestore.client()
-                
-                user_ref = db.collection('usuarios').document(usuario_id)
-                user_doc = user_ref.get()
+                user_data = firestore_repository.obter_usuario(usuario_id)
                 
-                if user_doc.exists:
-                    user_data = user_doc.to_dict()
+                if user_data:
                     
                     # Calcular estatísticas derivadas
                     questoes_respondidas = user_data.get('questoes_respondidas', 0)
@@ -321,7 +386,7 @@ def buscar_estatisticas(usuario_id):
                     })
                     
             except Exception as e:
-                print(f"Erro ao buscar do Firestore: {e}")
+                logger.error(f"Erro ao buscar do Firestore: {e}")
         
         # Fallback para estatísticas simuladas
         estatisticas_simuladas = {
@@ -351,595 +416,18 @@ def buscar_estatisticas(usuario_id):
         })
         
     except Exception as e:
-        print(f"Erro ao buscar estatísticas: {e}")
+        logger.error(f"Erro ao buscar estatísticas: {e}")
         return jsonify({
             'erro': 'Erro interno do servidor',
             'detalhes': str(e)
         }), 500
 
-# Mapeamento de conteúdos por cargo e bloco com flag de conhecimentos
-CONTEUDOS_EDITAL = {
-    # Bloco 1 - Seguridade Social: Saúde, Assistência Social e Previdência Social
-    'Enfermeiro': {
-        'Bloco 1 - Seguridade Social': {
-            'conhecimentos_especificos': [
-                'Conceito, evolução legislativa e Constituição de 1988',
-                'Financiamento, orçamento e Lei 8.212/1991',
-                'História e legislação da saúde no Brasil',
-                'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-                'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-                'Determinantes do processo saúde-doença',
-                'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-                'Proteção social básica, especial e benefícios eventuais',
-                'Avaliação da deficiência e legislação específica',
-                'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-                'Regime Geral e Próprio de Previdência Social',
-                'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-                'Legislação, perícia, acompanhamento médico, promoção à saúde',
-                'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-            ],
-            'conhecimentos_gerais': [
-                'Desafios do Estado de Direito',
-                'Políticas públicas',
-                'Ética e integridade',
-                'Diversidade e inclusão na sociedade',
-                'Administração pública federal',
-                'Trabalho e tecnologia'
-            ]
-        }
-    },
-    'Médico': {
-        'Bloco 1 - Seguridade Social': {
-            'conhecimentos_especificos': [
-                'Conceito, evolução legislativa e Constituição de 1988',
-                'Financiamento, orçamento e Lei 8.212/1991',
-                'História e legislação da saúde no Brasil',
-                'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-                'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-                'Determinantes do processo saúde-doença',
-                'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-                'Proteção social básica, especial e benefícios eventuais',
-                'Avaliação da deficiência e legislação específica',
-                'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-                'Regime Geral e Próprio de Previdência Social',
-                'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-                'Legislação, perícia, acompanhamento médico, promoção à saúde',
-                'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-            ],
-            'conhecimentos_gerais': [
-                'Desafios do Estado de Direito',
-                'Políticas públicas',
-                'Ética e integridade',
-                'Diversidade e inclusão na sociedade',
-                'Administração pública federal',
-                'Trabalho e tecnologia'
-            ]
-        }
-    },
-    'Assistente Social': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Nutricionista': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Psicólogo': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Pesquisador': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Tecnologista': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Analista do Seguro Social': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Biólogo': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Farmacêutico': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Fisioterapeuta': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Fonoaudiólogo': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    'Terapeuta Ocupacional': {
-        'Bloco 1 - Seguridade Social': [
-            'Conceito, evolução legislativa e Constituição de 1988',
-            'Financiamento, orçamento e Lei 8.212/1991',
-            'História e legislação da saúde no Brasil',
-            'Sistema Único de Saúde (SUS): estrutura, organização, modelos assistenciais',
-            'Vigilância em saúde, promoção e prevenção, emergências sanitárias',
-            'Determinantes do processo saúde-doença',
-            'Histórico, políticas públicas, Lei 8.742/1993 (LOAS), PNAS 2004, SUAS',
-            'Proteção social básica, especial e benefícios eventuais',
-            'Avaliação da deficiência e legislação específica',
-            'Noções de direito previdenciário, CF/88, Lei 8.213/1991',
-            'Regime Geral e Próprio de Previdência Social',
-            'Benefícios, benefícios eventuais, qualidade de segurado, avaliação biopsicossocial',
-            'Legislação, perícia, acompanhamento médico, promoção à saúde',
-            'Acidentes do trabalho, doenças relacionadas, riscos ocupacionais e legislações aplicáveis'
-        ]
-    },
-    
-    # Bloco 2 - Cultura e Educação
-    'Técnico em Comunicação Social': {
-        'Bloco 2 - Cultura e Educação': [
-            'Lei de Acesso à Informação, LGPD, políticas de comunicação, mídias digitais',
-            'LDB, Constituição, Plano Nacional de Educação, educação básica e superior, EAD, ODS',
-            'Sistema Nacional de Cultura, políticas e legislação patrimonial, direitos culturais, instrumentos de fomento (ex: Lei Rouanet, Lei Paulo Gustavo)',
-            'Fundamentos, métodos qualitativos e quantitativos, ciclo da pesquisa, ética em pesquisa',
-            'Construção e análise de indicadores, monitoramento, métodos quantitativos e Big Data'
-        ]
-    },
-    'Técnico em Documentação': {
-        'Bloco 2 - Cultura e Educação': [
-            'Lei de Acesso à Informação, LGPD, políticas de comunicação, mídias digitais',
-            'LDB, Constituição, Plano Nacional de Educação, educação básica e superior, EAD, ODS',
-            'Sistema Nacional de Cultura, políticas e legislação patrimonial, direitos culturais, instrumentos de fomento (ex: Lei Rouanet, Lei Paulo Gustavo)',
-            'Fundamentos, métodos qualitativos e quantitativos, ciclo da pesquisa, ética em pesquisa',
-            'Construção e análise de indicadores, monitoramento, métodos quantitativos e Big Data'
-        ]
-    },
-    'Técnico em Assuntos Culturais': {
-        'Bloco 2 - Cultura e Educação': [
-            'Lei de Acesso à Informação, LGPD, políticas de comunicação, mídias digitais',
-            'LDB, Constituição, Plano Nacional de Educação, educação básica e superior, EAD, ODS',
-            'Sistema Nacional de Cultura, políticas e legislação patrimonial, direitos culturais, instrumentos de fomento (ex: Lei Rouanet, Lei Paulo Gustavo)',
-            'Fundamentos, métodos qualitativos e quantitativos, ciclo da pesquisa, ética em pesquisa',
-            'Construção e análise de indicadores, monitoramento, métodos quantitativos e Big Data'
-        ]
-    },
-    'Analista Cultural': {
-        'Bloco 2 - Cultura e Educação': [
-            'Lei de Acesso à Informação, LGPD, políticas de comunicação, mídias digitais',
-            'LDB, Constituição, Plano Nacional de Educação, educação básica e superior, EAD, ODS',
-            'Sistema Nacional de Cultura, políticas e legislação patrimonial, direitos culturais, instrumentos de fomento (ex: Lei Rouanet, Lei Paulo Gustavo)',
-            'Fundamentos, métodos qualitativos e quantitativos, ciclo da pesquisa, ética em pesquisa',
-            'Construção e análise de indicadores, monitoramento, métodos quantitativos e Big Data'
-        ]
-    },
-    'Técnico em Assuntos Educacionais': {
-        'Bloco 2 - Cultura e Educação': [
-            'Lei de Acesso à Informação, LGPD, políticas de comunicação, mídias digitais',
-            'LDB, Constituição, Plano Nacional de Educação, educação básica e superior, EAD, ODS',
-            'Sistema Nacional de Cultura, políticas e legislação patrimonial, direitos culturais, instrumentos de fomento (ex: Lei Rouanet, Lei Paulo Gustavo)',
-            'Fundamentos, métodos qualitativos e quantitativos, ciclo da pesquisa, ética em pesquisa',
-            'Construção e análise de indicadores, monitoramento, métodos quantitativos e Big Data'
-        ]
-    },
-    
-    # Bloco 3 - Ciências, Dados e Tecnologia
-    'Especialista em Geologia e Geofísica': {
-        'Bloco 3 - Ciências, Dados e Tecnologia': [
-            'Fundamentos, paradigmas de inovação, impactos sociais, ética e popularização científica',
-            'Sistema Nacional de CT&I, marco legal, instrumentos de fomento, governança, indicadores de inovação, ODS',
-            'Condução de projetos (iniciação, execução, monitoramento, encerramento), métodos ágeis (Scrum, Kanban), modelos institucionais',
-            'Noções de TICs, ciência de dados, inteligência artificial, uso de dados na gestão pública, LGPD, interoperabilidade, dados abertos',
-            'Práticas de pesquisa, classificação, abordagens qualitativas e quantitativas, estruturação de projetos, normas técnicas'
-        ]
-    },
-    'Analista de Tecnologia Militar': {
-        'Bloco 3 - Ciências, Dados e Tecnologia': [
-            'Fundamentos, paradigmas de inovação, impactos sociais, ética e popularização científica',
-            'Sistema Nacional de CT&I, marco legal, instrumentos de fomento, governança, indicadores de inovação, ODS',
-            'Condução de projetos (iniciação, execução, monitoramento, encerramento), métodos ágeis (Scrum, Kanban), modelos institucionais',
-            'Noções de TICs, ciência de dados, inteligência artificial, uso de dados na gestão pública, LGPD, interoperabilidade, dados abertos',
-            'Práticas de pesquisa, classificação, abordagens qualitativas e quantitativas, estruturação de projetos, normas técnicas'
-        ]
-    },
-    'Analista de Ciência e Tecnologia': {
-        'Bloco 3 - Ciências, Dados e Tecnologia': [
-            'Fundamentos, paradigmas de inovação, impactos sociais, ética e popularização científica',
-            'Sistema Nacional de CT&I, marco legal, instrumentos de fomento, governança, indicadores de inovação, ODS',
-            'Condução de projetos (iniciação, execução, monitoramento, encerramento), métodos ágeis (Scrum, Kanban), modelos institucionais',
-            'Noções de TICs, ciência de dados, inteligência artificial, uso de dados na gestão pública, LGPD, interoperabilidade, dados abertos',
-            'Práticas de pesquisa, classificação, abordagens qualitativas e quantitativas, estruturação de projetos, normas técnicas'
-        ]
-    },
-    
-    # Bloco 4 - Engenharias e Arquitetura
-    'Especialista em Regulação de Petróleo': {
-        'Bloco 4 - Engenharias e Arquitetura': [
-            'Planejamento, orçamento, licitação, execução, controle de obras, manutenção, segurança, qualidade',
-            'Políticas urbanas e regionais, regularização fundiária, cartografia, urbanismo, geografia urbana',
-            'Elaboração de projetos, acessibilidade, sustentabilidade, patologias em edificações, conforto ambiental',
-            'Políticas agrícolas, manejo sustentável, certificação, pesca e aquicultura, biotecnologia aplicada',
-            'Gestão e licenciamento ambiental, mudanças climáticas, economia ambiental, gestão de resíduos, patrimônios, políticas energéticas, recursos hídricos'
-        ]
-    },
-    'Engenheiro de Tecnologia Militar': {
-        'Bloco 4 - Engenharias e Arquitetura': [
-            'Planejamento, orçamento, licitação, execução, controle de obras, manutenção, segurança, qualidade',
-            'Políticas urbanas e regionais, regularização fundiária, cartografia, urbanismo, geografia urbana',
-            'Elaboração de projetos, acessibilidade, sustentabilidade, patologias em edificações, conforto ambiental',
-            'Políticas agrícolas, manejo sustentável, certificação, pesca e aquicultura, biotecnologia aplicada',
-            'Gestão e licenciamento ambiental, mudanças climáticas, economia ambiental, gestão de resíduos, patrimônios, políticas energéticas, recursos hídricos'
-        ]
-    },
-    'Arquiteto': {
-        'Bloco 4 - Engenharias e Arquitetura': [
-            'Planejamento, orçamento, licitação, execução, controle de obras, manutenção, segurança, qualidade',
-            'Políticas urbanas e regionais, regularização fundiária, cartografia, urbanismo, geografia urbana',
-            'Elaboração de projetos, acessibilidade, sustentabilidade, patologias em edificações, conforto ambiental',
-            'Políticas agrícolas, manejo sustentável, certificação, pesca e aquicultura, biotecnologia aplicada',
-            'Gestão e licenciamento ambiental, mudanças climáticas, economia ambiental, gestão de resíduos, patrimônios, políticas energéticas, recursos hídricos'
-        ]
-    },
-    'Engenheiro': {
-        'Bloco 4 - Engenharias e Arquitetura': [
-            'Planejamento, orçamento, licitação, execução, controle de obras, manutenção, segurança, qualidade',
-            'Políticas urbanas e regionais, regularização fundiária, cartografia, urbanismo, geografia urbana',
-            'Elaboração de projetos, acessibilidade, sustentabilidade, patologias em edificações, conforto ambiental',
-            'Políticas agrícolas, manejo sustentável, certificação, pesca e aquicultura, biotecnologia aplicada',
-            'Gestão e licenciamento ambiental, mudanças climáticas, economia ambiental, gestão de resíduos, patrimônios, políticas energéticas, recursos hídricos'
-        ]
-    },
-    'Engenheiro Agrônomo': {
-        'Bloco 4 - Engenharias e Arquitetura': [
-            'Planejamento, orçamento, licitação, execução, controle de obras, manutenção, segurança, qualidade',
-            'Políticas urbanas e regionais, regularização fundiária, cartografia, urbanismo, geografia urbana',
-            'Elaboração de projetos, acessibilidade, sustentabilidade, patologias em edificações, conforto ambiental',
-            'Políticas agrícolas, manejo sustentável, certificação, pesca e aquicultura, biotecnologia aplicada',
-            'Gestão e licenciamento ambiental, mudanças climáticas, economia ambiental, gestão de resíduos, patrimônios, políticas energéticas, recursos hídricos'
-        ]
-    },
-    
-    # Bloco 5 - Administração
-    'Analista Técnico-Administrativo': {
-        'Bloco 5 - Administração': [
-            'Gestão Governamental e Governança Pública: Estratégia, Pessoas, Projetos e Processos',
-            'Gestão Governamental e Governança Pública: Riscos, Inovação, Participação, Coordenação e Patrimônio',
-            'Políticas Públicas: Ciclo, formulação e avaliação',
-            'Administração Financeira e Orçamentária, Contabilidade Pública e Compras na Administração Pública',
-            'Transparência, Proteção de Dados, Comunicação e Atendimento ao Cidadão'
-        ]
-    },
-    'Contador': {
-        'Bloco 5 - Administração': [
-            'Gestão Governamental e Governança Pública: Estratégia, Pessoas, Projetos e Processos',
-            'Gestão Governamental e Governança Pública: Riscos, Inovação, Participação, Coordenação e Patrimônio',
-            'Políticas Públicas: Ciclo, formulação e avaliação',
-            'Administração Financeira e Orçamentária, Contabilidade Pública e Compras na Administração Pública',
-            'Transparência, Proteção de Dados, Comunicação e Atendimento ao Cidadão'
-        ]
-    },
-    
-    # Bloco 6 - Desenvolvimento Socioeconômico
-    'Analista Técnico de Desenvolvimento Socioeconômico': {
-        'Bloco 6 - Desenvolvimento Socioeconômico': [
-            'Desenvolvimento, Sustentabilidade e Inclusão',
-            'Desenvolvimento Produtivo e Regional no Brasil',
-            'Gestão Estratégica e Regulação',
-            'Desenvolvimento Socioeconômico no Brasil (histórico e contemporâneo)',
-            'Desigualdades e Dinâmicas Socioeconômicas'
-        ]
-    },
-    'Especialista em Regulação de Petróleo e Derivados': {
-        'Bloco 6 - Desenvolvimento Socioeconômico': [
-            'Desenvolvimento, Sustentabilidade e Inclusão',
-            'Desenvolvimento Produtivo e Regional no Brasil',
-            'Gestão Estratégica e Regulação',
-            'Desenvolvimento Socioeconômico no Brasil (histórico e contemporâneo)',
-            'Desigualdades e Dinâmicas Socioeconômicas'
-        ]
-    },
-    'Especialista em Regulação da Atividade Cinematográfica': {
-        'Bloco 6 - Desenvolvimento Socioeconômico': [
-            'Desenvolvimento, Sustentabilidade e Inclusão',
-            'Desenvolvimento Produtivo e Regional no Brasil',
-            'Gestão Estratégica e Regulação',
-            'Desenvolvimento Socioeconômico no Brasil (histórico e contemporâneo)',
-            'Desigualdades e Dinâmicas Socioeconômicas'
-        ]
-    },
-    
-    # Bloco 7 - Justiça e Defesa
-    'Analista Técnico de Justiça e Defesa': {
-        'Bloco 7 - Justiça e Defesa': [
-            'Gestão Governamental e Métodos Aplicados',
-            'Políticas de Segurança e Defesa – Ambiente Internacional e Tecnologias Emergentes',
-            'Políticas de Segurança e Defesa – Ambiente Nacional e Questões Emergentes',
-            'Políticas de Segurança Pública',
-            'Políticas de Justiça e Cidadania'
-        ]
-    },
-    
-    # Bloco 8 - Intermediário - Saúde
-    'Técnico em Atividades Médico-Hospitalares': {
-        'Bloco 8 - Intermediário - Saúde': {
-            'conhecimentos_especificos': [
-                'Saúde'
-            ],
-            'conhecimentos_gerais': [
-                'Língua Portuguesa',
-                'Matemática',
-                'Noções de Direito',
-                'Realidade Brasileira'
-            ]
-        }
-    },
-    'Técnico de Enfermagem': {
-        'Bloco 8 - Intermediário - Saúde': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde'
-        ]
-    },
-    'Técnico em Pesquisa e Investigação Biomédica': {
-        'Bloco 8 - Intermediário - Saúde': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde'
-        ]
-    },
-    'Técnico em Radiologia': {
-        'Bloco 8 - Intermediário - Saúde': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde'
-        ]
-    },
-    
-    # Bloco 9 - Intermediário - Regulação
-    'Técnico em Regulação de Aviação Civil': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Atividades de Mineração': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação de Petróleo': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação de Saúde Suplementar': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação de Telecomunicações': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação de Transportes Aquaviários': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação de Transportes Terrestres': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação e Vigilância Sanitária': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    },
-    'Técnico em Regulação da Atividade Cinematográfica': {
-        'Bloco 9 - Intermediário - Regulação': [
-            'Língua Portuguesa',
-            'Matemática',
-            'Noções de Direito',
-            'Realidade Brasileira',
-            'Saúde',
-            'Regulação e Agências Reguladoras'
-        ]
-    }
-}
-
 @questoes_bp.route('/gerar', methods=['POST'])
 def gerar_questao():
     """Gera uma nova questão personalizada para o usuário"""
     try:
-        print("🔥 Requisição recebida na API de geração de questões")
         data = request.get_json()
-        print(f"📋 Dados recebidos: {data}")
+        logger.debug("Dados recebidos: %s", data)
         
         usuario_id = data.get('usuario_id')
         cargo = data.get('cargo')
@@ -948,64 +436,110 @@ def gerar_questao():
         tipo_conhecimento = data.get('tipo_conhecimento', 'todos')  # todos, conhecimentos_gerais, conhecimentos_especificos
         modo_foco = data.get('modo_foco', False)
         materia_foco = data.get('materia_foco', None)
+        fonte = data.get('fonte') or FONTE_PADRAO
         
-        print(f"👤 Usuario ID: {usuario_id}")
-        print(f"💼 Cargo: {cargo}")
-        print(f"📚 Bloco: {bloco}")
+        logger.info("Gerando questão", extra={'campos': {
+            'usuario_id': usuario_id, 'cargo': cargo, 'bloco': bloco, 'tipo_conhecimento': tipo_conhecimento,
+            'fonte': fonte
+        }})
         
         if not all([usuario_id, cargo, bloco]):
-            print("❌ Dados obrigatórios faltando")
+            logger.warning("Dados obrigatórios faltando")
             return jsonify({'erro': 'Dados do usuário são obrigatórios'}), 400
+        if fonte not in FONTES_QUESTAO:
+            return jsonify({'erro': f"fonte deve ser {' ou '.join(FONTES_QUESTAO)}"}), 400
+        
+        # Perfil do usuário: erros por tema (sorteio dos tópicos) e proficiência (dificuldade)
+        dados_usuario = None
+        try:
+            dados_usuario = firestore_repository.obter_usuario(usuario_id)
+        except Exception as e:
+            logger.error(f"Erro ao buscar perfil do usuário: {e}")
         
         # Obter conteúdo específico do edital baseado no tipo de conhecimento
         if modo_foco and materia_foco:
             conteudo_edital = [materia_foco]
-            print(f"📖 Modo foco ativado para matéria: {materia_foco}")
+            logger.debug("Modo foco ativado para matéria: %s", materia_foco)
         else:
-            conteudo_edital = _obter_conteudo_edital(cargo, bloco, tipo_conhecimento)
-            print(f"📖 Conteúdo do edital ({tipo_conhecimento}): {conteudo_edital}")
+            conteudo_edital = _obter_conteudo_edital(cargo, bloco, tipo_conhecimento, usuario_id,
+                                                     (dados_usuario or {}).get('erros_por_tema'))
+            logger.debug("Conteúdo do edital (%s): %s", tipo_conhecimento, conteudo_edital)
         
         if not conteudo_edital:
-            print("❌ Cargo ou bloco não encontrado")
+            logger.warning("Cargo ou bloco não encontrado")
             return jsonify({'erro': 'Cargo ou bloco não encontrado'}), 404
         
         historico_perguntas_str = ""
+        recentes = []
         # Fase 1: Buscar histórico para não repetir
-        if firebase_config.is_configured():
-            try:
-                from firebase_admin import firestore
-                db = firestore.client()
+        if firestore_repository.is_connected():
+            with tracer.span('questoes.historico', usuario_id=usuario_id):
+                try:
+                    db = firestore_repository.db
                 
-                # 1. Buscar histórico do usuário
-                historico_ref = db.collection('historico_respostas').where('usuario_id', '==', usuario_id).limit(20).get()
-                recent_ids = [doc.to_dict().get('questao_id') for doc in historico_ref if doc.to_dict().get('questao_id')]
+                    # 1. As 7 respostas mais recentes do log, com o texto da questão
+                    recentes = firestore_repository.listar_respostas(usuario_id, limite=7)
                 
-                # Pegar as 7 mais recentes e extrair o texto para o GPT não repetir
-                textos_recentes = []
-                for qid in recent_ids[:7]:
-                    try:
-                        q_doc = db.collection('questoes_geradas').document(qid).get()
-                        if q_doc.exists:
-                            q_texto = q_doc.to_dict().get('questao', '')
-                            if q_texto:
-                                textos_recentes.append(q_texto[:150] + '...')
-                    except: pass
+                    # Entradas migradas sem texto: buscar em questoes_geradas numa única leitura em lote
+                    sem_texto = [r['questao_id'] for r in recentes if not r.get('questao') and r.get('questao_id')]
+                    textos_gerados = {}
+                    if sem_texto:
+                        refs = [db.collection('questoes_geradas').document(qid) for qid in sem_texto]
+                        for q_doc in db.get_all(refs):
+                            if q_doc.exists:
+                                textos_gerados[q_doc.id] = q_doc.to_dict().get('questao', '')
                 
-                historico_perguntas_str = "\n".join([f"- {t}" for t in textos_recentes])
-            except Exception as e:
-                print(f"Erro ao buscar histórico: {e}")
+                    # Extrair o texto para o GPT não repetir
+                    textos_recentes = []
+                    for resposta in recentes:
+                        q_texto = resposta.get('questao') or textos_gerados.get(resposta.get('questao_id'), '')
+                        if q_texto:
+                            textos_recentes.append(q_texto[:150] + '...')
+                
+                    historico_perguntas_str = "\n".join([f"- {t}" for t in textos_recentes])
+                except Exception as e:
+                    logger.error(f"Erro ao buscar histórico: {e}")
+
+        # Questão de prova anterior: sem chamada ao LLM; sem questões nos tópicos, segue para a IA
+        if fonte == 'banco':
+            with tracer.span('questoes.banco', usuario_id=usuario_id):
+                try:
+                    questao_banco = _sortear_questao_banco(
+                        cargo, bloco, tipo_conhecimento, materia_foco if modo_foco else None,
+                        excluir=[r.get('questao_id') for r in recentes],
+                        dados_usuario=dados_usuario
+                    )
+                except Exception as e:
+                    logger.error(f"Erro ao sortear questão do banco: {e}")
+                    questao_banco = None
+            if questao_banco:
+                return jsonify({
+                    'sucesso': True,
+                    'questao': {
+                        'id': questao_banco['id'],
+                        'questao': questao_banco['questao'],
+                        'tipo': questao_banco['tipo'],
+                        'alternativas': questao_banco['alternativas'],
+                        'tema': questao_banco['tema'],
+                        'dificuldade': questao_banco['dificuldade'],
+                        'banca': questao_banco.get('banca'),
+                        'ano': questao_banco.get('ano'),
+                        'fonte': 'banco'
+                    }
+                })
+            logger.info("Banco de questões sem itens para o pedido, gerando com IA")
 
         # Gerar questão real usando ChatGPT
-        print("🤖 Gerando questão com ChatGPT...")
         try:
             questao_ia = chatgpt_service.gerar_questao(
                 cargo=cargo,
                 conteudo_edital=conteudo_edital,
                 tipo_questao=tipo_questao,
-                historico_perguntas=historico_perguntas_str
+                historico_perguntas=historico_perguntas_str,
+                dificuldade=_dificuldade_para_usuario(dados_usuario, cargo, bloco)
             )
             
-            print(f"DEBUG: Resposta do ChatGPT: {questao_ia}")
+            logger.debug("Resposta do ChatGPT: %s", questao_ia)
             
             if questao_ia:
                 questao_id = str(uuid.uuid4())
@@ -1022,18 +556,13 @@ def gerar_questao():
                     'dificuldade': questao_ia.get('dificuldade', 'medio'),
                     'explicacao': questao_ia.get('explicacao', '')
                 }
-                print(f"✅ Questão IA gerada: {questao_completa['questao'][:100]}...")
-                print(f"DEBUG: Questão completa estruturada: {questao_completa}")
+                logger.info("Questão IA gerada", extra={'campos': {'tema': questao_completa['tema']}})
+                logger.debug("Questão completa estruturada: %s", questao_completa)
             else:
-                print("DEBUG: ChatGPT retornou None ou vazio")
                 raise Exception("ChatGPT não retornou questão válida")
                 
         except Exception as e:
-            print(f"❌ Erro ao gerar questão com IA: {e}")
-            print(f"DEBUG: Traceback completo:")
-            import traceback
-            traceback.print_exc()
-            print("🔄 Usando questão de fallback...")
+            logger.exception(f"Erro ao gerar questão com IA, usando questão de fallback: {e}")
             
             # Fallback: questão de exemplo
             questao_id = str(uuid.uuid4())
@@ -1063,7 +592,8 @@ def gerar_questao():
             'tipo': questao_completa['tipo'],
             'alternativas': questao_completa['alternativas'],
             'tema': questao_completa['tema'],
-            'dificuldade': questao_completa['dificuldade']
+            'dificuldade': questao_completa['dificuldade'],
+            'fonte': 'ia'
         }
         
         return jsonify({
@@ -1072,47 +602,20 @@ def gerar_questao():
         })
         
     except Exception as e:
-        print(f"❌ Erro ao gerar questão: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Erro ao gerar questão: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @questoes_bp.route('/materias-foco/<cargo>/<bloco>', methods=['GET'])
+@respostas_estaticas.imutavel
 def obter_materias_foco(cargo, bloco):
     """Obtém todas as matérias disponíveis para o modo foco"""
     try:
-        # Normalizar o nome do bloco para compatibilidade
-        bloco_normalizado = bloco
-        if ':' in bloco:
-            bloco_normalizado = bloco.split(':')[0].strip()
-        
-        conteudos_bloco = CONTEUDOS_EDITAL.get(cargo, {}).get(bloco_normalizado, {})
-        
-        materias = []
-        
-        # Verificar se é a nova estrutura com conhecimentos gerais/específicos
-        if isinstance(conteudos_bloco, dict) and 'conhecimentos_especificos' in conteudos_bloco:
-            # Adicionar conhecimentos específicos
-            for materia in conteudos_bloco.get('conhecimentos_especificos', []):
-                materias.append({
-                    'nome': materia,
-                    'tipo': 'conhecimentos_especificos'
-                })
-            
-            # Adicionar conhecimentos gerais
-            for materia in conteudos_bloco.get('conhecimentos_gerais', []):
-                materias.append({
-                    'nome': materia,
-                    'tipo': 'conhecimentos_gerais'
-                })
-        else:
-            # Estrutura antiga (lista simples) - considerar como conhecimentos específicos
-            if isinstance(conteudos_bloco, list):
-                for materia in conteudos_bloco:
-                    materias.append({
-                        'nome': materia,
-                        'tipo': 'conhecimentos_especificos'
-                    })
+        # Busca tolerante a acento/caixa e ao sufixo após ':' no nome do bloco
+        conteudos_bloco = catalogo_edital.bloco(cargo, bloco)
+        materias = [
+            {'id': topico.id, 'nome': topico.nome, 'tipo': topico.tipo}
+            for topico in (conteudos_bloco.topicos() if conteudos_bloco else ())
+        ]
         
         return jsonify({
             'sucesso': True,
@@ -1120,55 +623,133 @@ def obter_materias_foco(cargo, bloco):
         })
         
     except Exception as e:
-        print(f"Erro ao obter matérias para modo foco: {e}")
+        logger.error(f"Erro ao obter matérias para modo foco: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 # Função duplicada removida - usando apenas a primeira definição
 
 @questoes_bp.route('/historico/<usuario_id>', methods=['GET'])
 def obter_historico(usuario_id):
-    """Obtém o histórico de questões do usuário"""
+    """Obtém o histórico de questões do usuário
+    
+    Paginação por cursor: `limite` (máx. 100) e `cursor`, o `proximo_cursor`
+    da página anterior (None na última página).
+    """
     try:
         # Parâmetros de paginação
-        limite = int(request.args.get('limite', 20))
-        offset = int(request.args.get('offset', 0))
+        limite = tamanho_pagina(request.args.get('limite'), 20)
+        cursor = request.args.get('cursor')
         
         questoes = []
+        proximo_cursor = None
         
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
-                db = firebase_config.get_db()
-                query = db.collection('questoes')\
-                         .where('usuario_id', '==', usuario_id)\
-                         .where('respondida', '==', True)\
-                         .order_by('data_resposta', direction=firestore.Query.DESCENDING)\
-                         .limit(limite)\
-                         .offset(offset)
-                
-                docs = query.stream()
-                
-                for doc in docs:
-                    questao = doc.to_dict()
-                    questao['id'] = doc.id
-                    questoes.append(questao)
+                respostas, proximo_cursor = firestore_repository.paginar_respostas(usuario_id, limite, cursor)
+                questoes = [log_respostas.para_historico(r) for r in respostas]
                     
+            except ValueError:
+                raise
             except Exception as e:
-                print(f"Erro ao buscar histórico no Firestore: {e}")
+                logger.error(f"Erro ao buscar histórico no Firestore: {e}")
         
-        # Se não há questões no Firestore, retornar dados simulados
-        if not questoes:
+        # Se não há questões no Firestore, retornar dados simulados (só na primeira página)
+        if not questoes and not cursor:
             questoes = _gerar_historico_simulado(usuario_id, limite)
         
         return jsonify({
             'sucesso': True,
             'questoes': questoes,
-            'total': len(questoes)
+            'total': len(questoes),
+            'proximo_cursor': proximo_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
-        print(f"Erro ao obter histórico: {e}")
+        logger.error(f"Erro ao obter histórico: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
+@questoes_bp.route('/revisao/<usuario_id>', methods=['GET'])
+def obter_revisao(usuario_id):
+    """Próximas questões a revisar (SM-2), as mais atrasadas primeiro
+    
+    `limite` (padrão 10, máx. 100). Lê só os cartões devolvidos; com a fila
+    em dia, `proxima_revisao` informa quando vence o próximo. Questões do
+    banco importado voltam com as alternativas (sem o gabarito).
+    """
+    try:
+        limite = tamanho_pagina(request.args.get('limite'), 10)
+        agora = datetime.now(timezone.utc)
+        
+        cartoes = revisao_espacada.pendentes(usuario_id, limite, agora)
+        itens = [revisao_espacada.para_resposta(c, agora) for c in cartoes]
+        
+        do_banco = [i['questao_id'] for i in itens if str(i['questao_id']).startswith(PREFIXO_BANCO)]
+        if do_banco:
+            questoes_banco = firestore_repository.obter_questoes_banco(do_banco)
+            for item in itens:
+                questao = questoes_banco.get(item['questao_id'])
+                if questao:
+                    item.update({
+                        'questao': questao['questao'],
+                        'tipo': questao['tipo'],
+                        'alternativas': questao['alternativas'],
+                        'dificuldade': questao['dificuldade']
+                    })
+        
+        proxima = None
+        if len(itens) < limite:
+            proxima = firestore_repository.proxima_revisao(usuario_id, agora)
+        
+        return jsonify({
+            'sucesso': True,
+            'itens': itens,
+            'total': len(itens),
+            'proxima_revisao': proxima.isoformat() if isinstance(proxima, datetime) else proxima
+        })
+        
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao obter fila de revisão: {e}")
+        return jsonify({'erro': 'Erro interno do servidor'}), 500
+
+@questoes_bp.route('/export/<usuario_id>', methods=['GET'])
+def exportar_historico(usuario_id):
+    """
+    Exporta respostas, sessões de jogos e histórico de planos do usuário
+    
+    `formato`: ndjson (padrão) ou csv. A resposta é transmitida em partes,
+    página a página do Firestore; sai em gzip quando o cliente aceita
+    (Accept-Encoding) ou com `gzip=1` (`gzip=0` desliga). Com `gzip=1` e sem
+    Accept-Encoding: gzip, vai como arquivo .gz (application/gzip).
+    """
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in exportacao.FORMATOS:
+        return jsonify({'erro': f"Formato inválido: use {' ou '.join(exportacao.FORMATOS)}"}), 400
+    
+    aceita_gzip = request.accept_encodings['gzip'] > 0
+    pedido_gzip = request.args.get('gzip')
+    if pedido_gzip is None:
+        usar_gzip = compressao.habilitado and aceita_gzip
+    else:
+        usar_gzip = pedido_gzip.lower() in ('1', 'true', 'sim')
+    
+    # gzip=1 sem Accept-Encoding: gzip sai como arquivo .gz, não como codificação do corpo
+    arquivo_gzip = usar_gzip and not aceita_gzip
+    nome = f'historico-{usuario_id}.{formato}' + ('.gz' if arquivo_gzip else '')
+    resposta = Response(
+        stream_with_context(exportacao.exportar(usuario_id, formato, gzip=usar_gzip)),
+        mimetype='application/gzip' if arquivo_gzip else exportacao.MIMETYPES[formato]
+    )
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    resposta.headers['Cache-Control'] = 'no-store'
+    resposta.vary.add('Accept-Encoding')
+    if usar_gzip and not arquivo_gzip:
+        resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
+
 @questoes_bp.route('/estatisticas/<usuario_id>', methods=['GET'])
 def obter_estatisticas(usuario_id):
     """Obtém estatísticas de desempenho do usuário"""
@@ -1182,23 +763,16 @@ def obter_estatisticas(usuario_id):
             'evolucao_semanal': []
         }
         
-        if firebase_config.is_connected():
+        if firestore_repository.is_connected():
             try:
-                db = firebase_config.get_db()
-                
                 # Buscar todas as questões respondidas
-                query = db.collection('questoes')\
-                         .where('usuario_id', '==', usuario_id)\
-                         .where('respondida', '==', True)
-                
-                docs = query.stream()
-                questoes = [doc.to_dict() for doc in docs]
+                questoes = [log_respostas.para_historico(r) for r in firestore_repository.listar_respostas(usuario_id)]
                 
                 if questoes:
                     estatisticas = _calcular_estatisticas(questoes)
                     
             except Exception as e:
-                print(f"Erro ao buscar estatísticas no Firestore: {e}")
+                logger.error(f"Erro ao buscar estatísticas no Firestore: {e}")
         
         # Se não há dados no Firestore, retornar estatísticas simuladas
         if estatisticas['total_questoes'] == 0:
@@ -1210,24 +784,22 @@ def obter_estatisticas(usuario_id):
         })
         
     except Exception as e:
-        print(f"Erro ao obter estatísticas: {e}")
+        logger.error(f"Erro ao obter estatísticas: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
 @questoes_bp.route('/materias/<cargo>/<bloco>', methods=['GET'])
 def obter_materias_por_cargo_bloco(cargo, bloco):
     """Obtém as matérias específicas baseadas no cargo e bloco do usuário"""
     try:
-        # Buscar no dicionário CONTEUDOS_EDITAL
-        bloco_normalizado = bloco.replace('_', ' ').title()
-        conteudos = CONTEUDOS_EDITAL.get(cargo, {}).get(bloco_normalizado, [])
+        conteudos = catalogo_edital.bloco(cargo, bloco)
         
         materias_performance = []
         
-        if isinstance(conteudos, dict):  # Nova estrutura com conhecimentos_especificos e conhecimentos_gerais
+        if conteudos is not None and conteudos.dividido:  # Conhecimentos específicos e gerais
             # Processar conhecimentos específicos
-            for i, materia in enumerate(conteudos.get('conhecimentos_especificos', [])[:3]):
+            for i, topico in enumerate(conteudos.especificos[:3]):
                 materias_performance.append({
-                    'materia': materia,
+                    'materia': topico.nome,
                     'tipo_conhecimento': 'conhecimentos_especificos',
                     'acertos': 65 + (i * 5) % 30,
                     'total': 100,
@@ -1236,9 +808,9 @@ def obter_materias_por_cargo_bloco(cargo, bloco):
                 })
             
             # Processar conhecimentos gerais
-            for i, materia in enumerate(conteudos.get('conhecimentos_gerais', [])[:2]):
+            for i, topico in enumerate(conteudos.gerais[:2]):
                 materias_performance.append({
-                    'materia': materia,
+                    'materia': topico.nome,
                     'tipo_conhecimento': 'conhecimentos_gerais',
                     'acertos': 70 + (i * 3) % 25,
                     'total': 100,
@@ -1246,30 +818,11 @@ def obter_materias_por_cargo_bloco(cargo, bloco):
                     'tendencia': 'subindo' if i % 2 == 1 else 'descendo'
                 })
         
-        elif isinstance(conteudos, list):  # Estrutura antiga (lista simples)
-            for i, materia in enumerate(conteudos[:5]):
+        elif conteudos is not None:  # Lista simples (considerada como específicos)
+            for i, topico in enumerate(conteudos.especificos[:5]):
                 materias_performance.append({
-                    'materia': materia,
-                    'tipo_conhecimento': 'conhecimentos_especificos',  # Assumir como específicos
-                    'acertos': 65 + (i * 5) % 30,
-                    'total': 100,
-                    'percentual': 65 + (i * 5) % 30,
-                    'tendencia': 'subindo' if i % 2 == 0 else 'descendo'
-                })
-        
-        else:  # Fallback para matérias genéricas
-            materias_genericas = [
-                ('Língua Portuguesa', 'conhecimentos_gerais'),
-                ('Matemática', 'conhecimentos_gerais'), 
-                ('Noções de Direito', 'conhecimentos_gerais'),
-                ('Realidade Brasileira', 'conhecimentos_gerais'),
-                ('Conhecimentos Específicos', 'conhecimentos_especificos')
-            ]
-            
-            for i, (materia, tipo) in enumerate(materias_genericas):
-                materias_performance.append({
-                    'materia': materia,
-                    'tipo_conhecimento': tipo,
+                    'materia': topico.nome,
+                    'tipo_conhecimento': 'conhecimentos_especificos',
                     'acertos': 65 + (i * 5) % 30,
                     'total': 100,
                     'percentual': 65 + (i * 5) % 30,
@@ -1282,85 +835,52 @@ def obter_materias_por_cargo_bloco(cargo, bloco):
         })
         
     except Exception as e:
-        print(f"Erro ao obter matérias: {e}")
+        logger.error(f"Erro ao obter matérias: {e}")
         return jsonify({'erro': 'Erro interno do servidor'}), 500
 
-def _obter_conteudo_edital(cargo, bloco, tipo_conhecimento='todos'):
-    """Obtém conteúdo específico do edital para o cargo e bloco"""
-    # Normalizar o nome do bloco para compatibilidade
-    bloco_normalizado = bloco
-    if ':' in bloco:
-        bloco_normalizado = bloco.split(':')[0].strip()
-    
-    conteudos_bloco = CONTEUDOS_EDITAL.get(cargo, {}).get(bloco_normalizado, {})
-    
-    # Verificar se é a nova estrutura com conhecimentos gerais/específicos
-    if isinstance(conteudos_bloco, dict) and 'conhecimentos_especificos' in conteudos_bloco:
-        if tipo_conhecimento == 'conhecimentos_gerais':
-            conteudos = conteudos_bloco.get('conhecimentos_gerais', [])
-        elif tipo_conhecimento == 'conhecimentos_especificos':
-            conteudos = conteudos_bloco.get('conhecimentos_especificos', [])
-        else:  # todos
-            conteudos = conteudos_bloco.get('conhecimentos_especificos', []) + conteudos_bloco.get('conhecimentos_gerais', [])
-    else:
-        # Estrutura antiga (lista simples) - considerar como conhecimentos específicos
-        conteudos = conteudos_bloco if isinstance(conteudos_bloco, list) else []
+def _obter_conteudo_edital(cargo, bloco, tipo_conhecimento='todos', usuario_id=None, erros_por_tema=None):
+    """Obtém conteúdo específico do edital para o cargo e bloco
     
-    if conteudos:
-        # Selecionar alguns tópicos aleatoriamente
-        import random
-        num_topicos = min(3, len(conteudos))
-        topicos_selecionados = random.sample(conteudos, num_topicos)
-        return ', '.join(topicos_selecionados)
+    Até 3 tópicos sorteados com peso maior para os temas em que o usuário
+    mais erra (amostrador_topicos); sem erros registrados, sorteio uniforme.
+    """
+    topicos_selecionados = amostrador_topicos.sortear(usuario_id, cargo, bloco, tipo_conhecimento, erros_por_tema)
+    if topicos_selecionados:
+        return ', '.join(topico.nome for topico in topicos_selecionados)
     
     # Fallback genérico
     return 'Conhecimentos específicos do cargo conforme edital'
 
-def _atualizar_estatisticas_usuario(usuario_id, acertou, tema):
-    """Atualiza estatísticas do usuário no Firestore"""
-    try:
-        if not firebase_config.is_connected():
-            return
-        
-        db = firebase_config.get_db()
-        usuario_ref = db.collection('usuarios').document(usuario_id)
-        
-        # Buscar dados atuais
-        doc = usuario_ref.get()
-        if not doc.exists:
-            return
-        
-        dados = doc.to_dict()
-        
-        # Atualizar vida
-        vida_atual = dados.get('vida', 80)
-        if acertou:
-            nova_vida = min(vida_atual + 5, 100)
-        else:
-            nova_vida = max(vida_atual - 10, 0)
-        
-        # Atualizar pontuação
-        pontuacao_atual = dados.get('pontuacao', 0)
-        if acertou:
-            nova_pontuacao = pontuacao_atual + 10
-        else:
-            nova_pontuacao = max(pontuacao_atual - 5, 0)
-        
-        # Atualizar erros por tema
-        erros_por_tema = dados.get('erros_por_tema', {})
-        if not acertou and tema:
-            erros_por_tema[tema] = erros_por_tema.get(tema, 0) + 1
-        
-        # Salvar atualizações
-        usuario_ref.update({
-            'vida': nova_vida,
-            'pontuacao': nova_pontuacao,
-            'erros_por_tema': erros_por_tema,
-            'ultimo_acesso': datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        print(f"Erro ao atualizar estatísticas do usuário: {e}")
+def _topicos_do_pedido(cargo, bloco, tipo_conhecimento='todos', materia_foco=None):
+    """Tópicos do catálogo para o cargo/bloco (ou só o da matéria em foco)"""
+    if materia_foco:
+        topico = catalogo_edital.resolver_topico(materia_foco, cargo, bloco)
+        topicos = [topico] if topico else []
+    else:
+        conteudos_bloco = catalogo_edital.bloco(cargo, bloco)
+        topicos = []
+        if conteudos_bloco is not None:
+            tipo = tipo_conhecimento if conteudos_bloco.dividido else 'todos'
+            topicos = list(conteudos_bloco.topicos(tipo))
+    return topicos
+
+def _sortear_questao_banco(cargo, bloco, tipo_conhecimento='todos', materia_foco=None, excluir=(),
+                           dados_usuario=None):
+    """Uma questão importada, na dificuldade ideal para o usuário nos tópicos do pedido; None se não houver"""
+    topicos = _topicos_do_pedido(cargo, bloco, tipo_conhecimento, materia_foco)
+    if not topicos:
+        return None
+    # O filtro 'in' aceita até 30 tópicos: em blocos maiores, 30 sorteados a cada pedido
+    import random
+    ids = random.sample([topico.id for topico in topicos], len(topicos))
+    return proficiencia.selecionar_questao(dados_usuario, ids, excluir=[e for e in excluir if e])
+
+def _dificuldade_para_usuario(dados_usuario, cargo, bloco):
+    """Rótulo de dificuldade para o prompt da IA pelo nível do usuário no bloco (None sem respostas)"""
+    nivel = proficiencia.nivel_geral(dados_usuario, [t.id for t in _topicos_do_pedido(cargo, bloco)])
+    if nivel is None:
+        return None
+    return proficiencia.rotulo(proficiencia.dificuldade_alvo(nivel))
 
 def _gerar_historico_simulado(usuario_id, limite):
     """Gera histórico simulado para desenvolvimento"""
@@ -1407,15 +927,10 @@ def obter_estatisticas_gerais(usuario_id):
     """
     try:
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
-            db = firestore.client()
+        if firestore_repository.is_connected():
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
-            
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 
                 # Calcular estatísticas baseadas nos dados reais
                 questoes_respondidas = user_data.get('questoes_respondidas', 0)
@@ -1520,17 +1035,13 @@ def obter_desempenho_semanal(usuario_id):
     """
     try:
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
+        if firestore_repository.is_connected():
             from datetime import datetime, timedelta
             import random
             
-            db = firestore.client()
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 taxa_acerto_media = user_data.get('taxa_acerto', 85)
                 
                 # Gerar dados da semana baseados na performance do usuário
@@ -1592,17 +1103,13 @@ def obter_evolucao_mensal(usuario_id):
     """
     try:
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
+        if firestore_repository.is_connected():
             from datetime import datetime, timedelta
             import random
             
-            db = firestore.client()
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 taxa_acerto_base = user_data.get('taxa_acerto', 75)
                 
                 # Gerar evolução dos últimos 6 meses
@@ -1654,15 +1161,10 @@ def obter_metas_usuario(usuario_id):
     """
     try:
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
-            
-            db = firestore.client()
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+        if firestore_repository.is_connected():
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 
                 # Calcular progresso das metas baseado nos dados reais
                 questoes_respondidas = user_data.get('questoes_respondidas', 0)
@@ -1767,30 +1269,29 @@ def obter_metas_usuario(usuario_id):
 def obter_atividades_recentes(usuario_id):
     """
     Retorna atividades recentes do usuário
+    
+    Paginação por cursor: `limite` (padrão 5, máx. 100) e `cursor`, o
+    `proximo_cursor` da página anterior.
     """
     try:
+        limite = tamanho_pagina(request.args.get('limite'), 5)
+        cursor = request.args.get('cursor')
+        
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
+        if firestore_repository.is_connected():
             from datetime import datetime, timedelta
             import random
             
-            db = firestore.client()
-            
             # Buscar histórico de questões respondidas
-            questoes_ref = db.collection('questoes_respondidas').where('usuario_id', '==', usuario_id).order_by('timestamp', direction=firestore.Query.DESCENDING).limit(10)
-            questoes_docs = questoes_ref.get()
+            questoes_docs, proximo_cursor = firestore_repository.paginar_respostas(usuario_id, limite, cursor)
             
             atividades = []
             
-            for doc in questoes_docs:
-                data = doc.to_dict()
-                timestamp = data.get('timestamp', datetime.now())
+            for data in questoes_docs:
+                timestamp = log_respostas.como_timestamp(data.get('respondida_em')) or datetime.now().astimezone()
                 
                 # Calcular tempo relativo
-                agora = datetime.now()
-                if isinstance(timestamp, str):
-                    timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                agora = datetime.now(timestamp.tzinfo)
                 
                 diff = agora - timestamp
                 if diff.days > 0:
@@ -1804,14 +1305,14 @@ def obter_atividades_recentes(usuario_id):
                 
                 atividades.append({
                     'tipo': 'questao_respondida',
-                    'descricao': f"Respondeu questão de {data.get('materia', 'Conhecimentos Gerais')}",
-                    'resultado': 'Acertou' if data.get('correta', False) else 'Errou',
+                    'descricao': f"Respondeu questão de {data.get('materia') or 'Conhecimentos Gerais'}",
+                    'resultado': 'Acertou' if data.get('acertou', False) else 'Errou',
                     'tempo': tempo_relativo,
-                    'icone': 'CheckCircle' if data.get('correta', False) else 'XCircle'
+                    'icone': 'CheckCircle' if data.get('acertou', False) else 'XCircle'
                 })
             
-            # Se não houver atividades suficientes, adicionar simuladas
-            if len(atividades) < 5:
+            # Se não houver atividades suficientes, adicionar simuladas (só na primeira página)
+            if len(atividades) < 5 and not cursor:
                 atividades_simuladas = [
                     {
                         'tipo': 'simulado_iniciado',
@@ -1839,7 +1340,8 @@ def obter_atividades_recentes(usuario_id):
             
             return jsonify({
                 'success': True,
-                'atividades': atividades[:5]  # Limitar a 5 atividades
+                'atividades': atividades[:limite],
+                'proximo_cursor': proximo_cursor
             })
         
         # Fallback com dados simulados
@@ -1884,6 +1386,8 @@ def obter_atividades_recentes(usuario_id):
             ]
         })
         
+    except ValueError as e:
+        return jsonify({'success': False, 'erro': str(e)}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -1897,17 +1401,13 @@ def obter_notificacoes(usuario_id):
     """
     try:
         # Buscar dados do usuário no Firebase/Firestore
-        if firebase_config.is_configured():
-            from firebase_admin import firestore
+        if firestore_repository.is_connected():
             from datetime import datetime, timedelta
             import random
             
-            db = firestore.client()
-            user_ref = db.collection('usuarios').document(usuario_id)
-            user_doc = user_ref.get()
+            user_data = firestore_repository.obter_usuario(usuario_id)
             
-            if user_doc.exists:
-                user_data = user_doc.to_dict()
+            if user_data:
                 
                 # Gerar notificações baseadas no perfil do usuário
                 notificacoes = []
@@ -1,10 +1,38 @@
+import logging
 from flask import Blueprint, request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
-from firebase_admin import firestore
+from ..services.firestore_repository import firestore_repository
+from ..services.indices_unicidade import normalizar_cpf, normalizar_email
 import re
 
+logger = logging.getLogger(__name__)
+
 signup_bp = Blueprint('signup', __name__)
-db = firestore.client()
+
+class CadastroDuplicadoError(Exception):
+    """Email ou CPF ja pertencem a outro cadastro"""
+
+def _criar_usuario_unico(transaction, user_data, email, cpf):
+    """Cria o usuario e os documentos emails/{email} e cpfs/{cpf} na mesma transacao"""
+    db = firestore_repository.db
+    email_ref = db.collection('emails').document(email)
+    cpf_ref = db.collection('cpfs').document(cpf)
+    
+    # Leitura por chave dentro da transacao: dois cadastros simultaneos nao passam juntos
+    existentes = {
+        snapshot.reference.path: snapshot.exists
+        for snapshot in db.get_all([email_ref, cpf_ref], transaction=transaction)
+    }
+    if existentes.get(email_ref.path):
+        raise CadastroDuplicadoError('Email ja cadastrado')
+    if existentes.get(cpf_ref.path):
+        raise CadastroDuplicadoError('CPF ja cadastrado')
+    
+    user_ref = db.collection('users').document()
+    transaction.set(user_ref, user_data)
+    transaction.create(email_ref, {'userId': user_ref.id, 'createdAt': firestore_repository.timestamp_servidor()})
+    transaction.create(cpf_ref, {'userId': user_ref.id, 'createdAt': firestore_repository.timestamp_servidor()})
+    return user_ref.id
 
 def validate_email(email):
     """Valida formato do email"""
@@ -40,7 +68,7 @@ def signup():
         
         nome_completo = data['nomeCompleto'].strip()
         cpf = data['cpf'].strip()
-        email = data['email'].strip().lower()
+        email = normalizar_email(data['email'])
         senha = data['senha']
         cargo = data['cargo'].strip()
         bloco = data['bloco'].strip()
@@ -53,7 +81,7 @@ def signup():
             }), 400
         
         # Validar CPF (implementação básica)
-        if not cpf or len(cpf.replace('.', '').replace('-', '')) != 11:
+        if not cpf or len(normalizar_cpf(cpf)) != 11:
             return jsonify({
                 'sucesso': False,
                 'erro': 'CPF invalido'
@@ -66,25 +94,6 @@ def signup():
                 'erro': password_error
             }), 400
         
-        # Verificar se email ja existe
-        users_ref = db.collection('users')
-        existing_user = users_ref.where('email', '==', email).limit(1).get()
-        
-        if existing_user:
-            return jsonify({
-                'sucesso': False,
-                'erro': 'Email ja cadastrado'
-            }), 409
-        
-        # Verificar se CPF ja existe
-        existing_cpf = users_ref.where('cpf', '==', cpf).limit(1).get()
-        
-        if existing_cpf:
-            return jsonify({
-                'sucesso': False,
-                'erro': 'CPF ja cadastrado'
-            }), 409
-        
         # Gerar hash da senha
         password_hash = generate_password_hash(senha)
         
@@ -97,16 +106,23 @@ def signup():
             'cargo': cargo,
             'bloco': bloco,
             'freeQuestionsRemaining': 3,
-            'createdAt': firestore.SERVER_TIMESTAMP,
+            'createdAt': firestore_repository.timestamp_servidor(),
             'totalAnswered': 0,
             'correctAnswers': 0,
             'planId': 'free',
             'profileComplete': True
         }
         
-        # Adicionar usuario
-        doc_ref = users_ref.add(user_data)
-        user_id = doc_ref[1].id
+        # Adicionar usuario verificando email e CPF pelos indices de unicidade
+        try:
+            user_id = firestore_repository.executar_transacao(
+                _criar_usuario_unico, user_data, email, normalizar_cpf(cpf)
+            )
+        except CadastroDuplicadoError as e:
+            return jsonify({
+                'sucesso': False,
+                'erro': str(e)
+            }), 409
         
         return jsonify({
             'sucesso': True,
@@ -115,7 +131,7 @@ def signup():
         }), 201
         
     except Exception as e:
-        print(f"Erro no cadastro: {str(e)}")
+        logger.error(f"Erro no cadastro: {str(e)}")
         return jsonify({
             'sucesso': False,
             'erro': 'Erro interno do servidor'
@@ -137,7 +153,7 @@ def login():
             }), 400
         
         # Buscar usuario por email
-        users_ref = db.collection('users')
+        users_ref = firestore_repository.db.collection('users')
         user_query = users_ref.where('email', '==', email).limit(1).get()
         
         if not user_query:
@@ -167,8 +183,8 @@ def login():
         }), 200
         
     except Exception as e:
-        print(f"Erro no login: {str(e)}")
+        logger.error(f"Erro no login: {str(e)}")
         return jsonify({
             'sucesso': False,
             'erro': 'Erro interno do servidor'
-        }), 500
\ No newline at end of file
+        }), 500
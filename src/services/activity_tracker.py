@@ -0,0 +1,129 @@
+"""
+Rastreador de atividade dos usuários (ultimo_acesso, ultima_atividade, ultima_atividade_jogos)
+
+Os timestamps ficam em memória e são gravados no Firestore em lote, no máximo
+uma vez por usuário a cada intervalo configurável (ACTIVITY_FLUSH_INTERVAL).
+"""
+import os
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from .firestore_repository import firestore_repository
+
+logger = logging.getLogger(__name__)
+
+# Limite de operações por lote de escrita do Firestore
+TAMANHO_MAXIMO_LOTE = 500
+
+
+class ActivityTracker:
+    """Agrega timestamps de atividade por usuário e faz flush periódico em lote"""
+
+    def __init__(self, intervalo: Optional[float] = None):
+        if intervalo is None:
+            intervalo = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', '60'))
+        self.intervalo = max(intervalo, 1.0)
+        self._pendentes: Dict[str, Dict[str, str]] = {}
+        self._ultimo_flush: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.encerrar)
+
+    def registrar(self, usuario_id: str, campo: str, quando: Optional[datetime] = None):
+        """Registra atividade do usuário; a escrita acontece no próximo flush"""
+        if not usuario_id:
+            return
+        valor = (quando or datetime.now()).isoformat()
+        with self._lock:
+            self._pendentes.setdefault(usuario_id, {})[campo] = valor
+        self._garantir_thread()
+
+    def pendentes(self) -> int:
+        """Quantidade de usuários com timestamps ainda não gravados"""
+        with self._lock:
+            return len(self._pendentes)
+
+    def flush(self, forcar: bool = False) -> int:
+        """Grava os timestamps pendentes; retorna quantos usuários foram gravados"""
+        agora = time.monotonic()
+        with self._lock:
+            prontos = {
+                usuario_id: campos
+                for usuario_id, campos in self._pendentes.items()
+                if forcar or agora - self._ultimo_flush.get(usuario_id, float('-inf')) >= self.intervalo
+            }
+            for usuario_id in prontos:
+                del self._pendentes[usuario_id]
+                self._ultimo_flush[usuario_id] = agora
+            # Descartar marcas antigas para a memória não crescer indefinidamente
+            self._ultimo_flush = {
+                usuario_id: instante
+                for usuario_id, instante in self._ultimo_flush.items()
+                if agora - instante < self.intervalo
+            }
+
+        if not prontos:
+            return 0
+
+        db = firestore_repository.db
+        if db is None:
+            # Modo desenvolvimento: não há onde gravar
+            return 0
+
+        itens = list(prontos.items())
+        gravados = 0
+        for inicio in range(0, len(itens), TAMANHO_MAXIMO_LOTE):
+            lote = itens[inicio:inicio + TAMANHO_MAXIMO_LOTE]
+            try:
+                batch = db.batch()
+                for usuario_id, campos in lote:
+                    batch.set(db.collection('usuarios').document(usuario_id), campos, merge=True)
+                batch.commit()
+                gravados += len(lote)
+            except Exception as e:
+                logger.error(f"Erro ao gravar atividade dos usuários: {e}")
+                self._reenfileirar(lote)
+        return gravados
+
+    def encerrar(self):
+        """Interrompe a thread de flush e grava tudo que estiver pendente"""
+        self._parar.set()
+        self.flush(forcar=True)
+
+    def _reenfileirar(self, lote):
+        """Devolve um lote que falhou, sem sobrescrever timestamps mais novos"""
+        with self._lock:
+            for usuario_id, campos in lote:
+                atuais = self._pendentes.setdefault(usuario_id, {})
+                for campo, valor in campos.items():
+                    atuais.setdefault(campo, valor)
+
+    def _garantir_thread(self):
+        """Inicia a thread de flush sob demanda (uma por processo, seguro após fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='activity-tracker', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush de atividade: {e}")
+
+
+# Instância global do rastreador de atividade
+activity_tracker = ActivityTracker()
@@ -0,0 +1,147 @@
+"""
+Sorteio de tópicos do edital ponderado pelos erros do usuário
+
+O peso de cada tópico do bloco é 1 + TOPIC_SAMPLER_ERROR_WEIGHT × erros do
+usuário no tópico (erros_por_tema, gravado por /responder), então tópicos
+fracos saem mais vezes sem que os demais deixem de aparecer.
+
+Cada (usuário, cargo, bloco, tipo de conhecimento) tem uma tabela alias
+(método de Vose): montá-la custa O(n) e cada sorteio O(1). A tabela guarda a
+assinatura dos erros e a versão do catálogo com que foi montada e só é
+refeita quando uma delas muda; as tabelas menos usadas saem do cache quando
+ele passa de TOPIC_SAMPLER_CACHE_SIZE entradas.
+
+Vale para os dois formatos de bloco: nos divididos o tipo de conhecimento
+escolhe gerais/específicos; nas listas simples, todos os tópicos.
+"""
+import logging
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .catalogo_edital import Topico, catalogo_edital
+
+logger = logging.getLogger(__name__)
+
+
+class TabelaAlias:
+    """Distribuição discreta com sorteio O(1) (método alias de Vose)"""
+
+    __slots__ = ('_probabilidade', '_alias')
+
+    def __init__(self, pesos: Sequence[float]):
+        n = len(pesos)
+        total = float(sum(pesos))
+        if n == 0 or total <= 0:
+            raise ValueError('pesos devem ter ao menos um valor positivo')
+        escalados = [p * n / total for p in pesos]
+        self._probabilidade = [1.0] * n
+        self._alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < 1.0]
+        grandes = [i for i, p in enumerate(escalados) if p >= 1.0]
+        while pequenos and grandes:
+            menor, maior = pequenos.pop(), grandes.pop()
+            self._probabilidade[menor] = escalados[menor]
+            self._alias[menor] = maior
+            escalados[maior] -= 1.0 - escalados[menor]
+            (pequenos if escalados[maior] < 1.0 else grandes).append(maior)
+        # Sobras (erro de arredondamento) ficam com probabilidade 1
+
+    def __len__(self):
+        return len(self._alias)
+
+    def sortear(self, gerador: random.Random = random) -> int:
+        indice = int(gerador.random() * len(self._alias))
+        return indice if gerador.random() < self._probabilidade[indice] else self._alias[indice]
+
+
+class AmostradorTopicos:
+    """Tabelas alias por usuário, remontadas só quando os erros ou o catálogo mudam"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tabelas: 'OrderedDict[Tuple, Tuple[Tuple, Tuple[Topico, ...], TabelaAlias]]' = OrderedDict()
+        self.configurar(
+            capacidade=int(os.getenv('TOPIC_SAMPLER_CACHE_SIZE', '10000')),
+            peso_erro=float(os.getenv('TOPIC_SAMPLER_ERROR_WEIGHT', '1.0')),
+        )
+
+    def configurar(self, capacidade: Optional[int] = None, peso_erro: Optional[float] = None):
+        with self._lock:
+            if capacidade is not None:
+                self.capacidade = max(1, capacidade)
+            if peso_erro is not None:
+                self.peso_erro = max(0.0, peso_erro)
+            self._tabelas.clear()
+
+    def limpar(self):
+        with self._lock:
+            self._tabelas.clear()
+
+    def _montar(self, topicos: Tuple[Topico, ...], erros_por_tema: Dict[str, Any],
+                cargo: str, bloco: str) -> TabelaAlias:
+        erros_por_topico: Dict[str, float] = {}
+        ids = {topico.id for topico in topicos}
+        for tema, erros in erros_por_tema.items():
+            topico = catalogo_edital.resolver_topico(tema, cargo, bloco)
+            if topico is not None and topico.id in ids and isinstance(erros, (int, float)):
+                erros_por_topico[topico.id] = erros_por_topico.get(topico.id, 0) + max(erros, 0)
+        return TabelaAlias([1.0 + self.peso_erro * erros_por_topico.get(t.id, 0) for t in topicos])
+
+    def tabela(self, usuario_id: Optional[str], cargo: str, bloco: str, tipo_conhecimento: str = 'todos',
+               erros_por_tema: Optional[Dict[str, Any]] = None) -> Optional[Tuple[Tuple[Topico, ...], TabelaAlias]]:
+        """(tópicos, tabela alias) do bloco para o usuário; None se cargo/bloco não existem"""
+        bloco_edital = catalogo_edital.bloco(cargo, bloco)
+        if bloco_edital is None:
+            return None
+        # Blocos em lista simples não separam gerais/específicos: vale a lista toda
+        tipo = tipo_conhecimento if bloco_edital.dividido else 'todos'
+        topicos = bloco_edital.topicos(tipo)
+        if not topicos:
+            return None
+
+        erros_por_tema = erros_por_tema or {}
+        chave = (usuario_id, bloco_edital.cargo, bloco_edital.bloco, tipo)
+        assinatura = (catalogo_edital.versao, self.peso_erro,
+                      tuple(sorted((str(k), v) for k, v in erros_por_tema.items())))
+        with self._lock:
+            entrada = self._tabelas.get(chave)
+            if entrada is not None and entrada[0] == assinatura:
+                self._tabelas.move_to_end(chave)
+                return entrada[1], entrada[2]
+
+        tabela = self._montar(topicos, erros_por_tema, bloco_edital.cargo, bloco_edital.bloco)
+        with self._lock:
+            self._tabelas[chave] = (assinatura, topicos, tabela)
+            self._tabelas.move_to_end(chave)
+            while len(self._tabelas) > self.capacidade:
+                self._tabelas.popitem(last=False)
+        return topicos, tabela
+
+    def sortear(self, usuario_id: Optional[str], cargo: str, bloco: str, tipo_conhecimento: str = 'todos',
+                erros_por_tema: Optional[Dict[str, Any]] = None, quantidade: int = 3,
+                gerador: random.Random = random) -> List[Topico]:
+        """Até `quantidade` tópicos distintos do bloco, com os de mais erros mais prováveis"""
+        encontrado = self.tabela(usuario_id, cargo, bloco, tipo_conhecimento, erros_por_tema)
+        if encontrado is None:
+            return []
+        topicos, tabela = encontrado
+        quantidade = min(quantidade, len(topicos))
+        escolhidos: List[int] = []
+        # Sorteios repetidos são descartados; se poucos tópicos concentram o peso, completa ao acaso
+        for _ in range(8 * quantidade):
+            if len(escolhidos) == quantidade:
+                break
+            indice = tabela.sortear(gerador)
+            if indice not in escolhidos:
+                escolhidos.append(indice)
+        if len(escolhidos) < quantidade:
+            restantes = [i for i in range(len(topicos)) if i not in escolhidos]
+            escolhidos.extend(gerador.sample(restantes, quantidade - len(escolhidos)))
+        return [topicos[i] for i in escolhidos]
+
+
+# Instância global do amostrador de tópicos
+amostrador_topicos = AmostradorTopicos()
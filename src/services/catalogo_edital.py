@@ -0,0 +1,294 @@
+"""
+Catálogo de conteúdos do edital (cargo → bloco → tópicos)
+
+Os conteúdos ficam em src/data/conteudos_edital.json (ou CATALOGO_EDITAL_PATH)
+e são compilados em índices imutáveis:
+
+- cargo → blocos e bloco → cargos
+- busca de cargo/bloco sem acento e sem diferença de maiúsculas; o bloco também
+  é encontrado pelo prefixo antes de ':' ("Bloco 1 - Seguridade Social: Saúde...")
+  e com '_' no lugar de espaço
+- tópicos com ID estável (o mesmo texto tem o mesmo ID em qualquer cargo)
+- resolução de um tema livre (ex.: "Lei 8.213/91 - Previdência") para o tópico
+  mais próximo, por palavras em comum (resolver_topico)
+
+Cada bloco no arquivo pode ser uma lista simples (tratada como conhecimentos
+específicos) ou um objeto com conhecimentos_especificos/conhecimentos_gerais.
+
+O arquivo é relido quando muda (verificação de mtime no máximo a cada
+CATALOGO_EDITAL_CHECK_INTERVAL segundos, no próprio acesso): cada worker troca
+os índices por inteiro, sem reiniciar. Um arquivo inválido mantém a versão anterior.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(__file__), '..', 'data', 'conteudos_edital.json')
+TIPOS_CONHECIMENTO = ('conhecimentos_especificos', 'conhecimentos_gerais')
+
+# Palavras ignoradas na comparação de temas com tópicos
+_PALAVRAS_VAZIAS = frozenset({
+    'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'na', 'no', 'nas', 'nos', 'a', 'o', 'as', 'os',
+    'para', 'por', 'com', 'sem', 'sobre', 'lei', 'nocoes', 'conceito', 'conceitos',
+})
+
+# Fração mínima das palavras do tema presentes no tópico para aceitar a correspondência
+SIMILARIDADE_MINIMA = 0.6
+
+
+def normalizar_nome(texto: str) -> str:
+    """Chave de busca: sem acentos, minúsculas, espaços simples, sem o sufixo após ':'"""
+    texto = (texto or '').split(':')[0].replace('_', ' ')
+    sem_acento = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', sem_acento).strip().casefold()
+
+
+def palavras(texto: str) -> FrozenSet[str]:
+    """Palavras significativas do texto (sem acento, minúsculas, sem palavras vazias)"""
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii').casefold()
+    return frozenset(p for p in re.findall(r'[a-z0-9]+', sem_acento)
+                     if p not in _PALAVRAS_VAZIAS and (len(p) > 2 or p.isdigit()))
+
+
+def id_topico(nome: str) -> str:
+    """ID estável do tópico, derivado do texto normalizado"""
+    chave = re.sub(r'\s+', ' ', unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii'))
+    return 't_' + hashlib.sha1(chave.strip().casefold().encode('utf-8')).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class Topico:
+    id: str
+    nome: str
+    tipo: str
+
+
+@dataclass(frozen=True)
+class BlocoEdital:
+    """Conteúdos de um bloco para um cargo, já no formato único"""
+    cargo: str
+    bloco: str
+    especificos: Tuple[Topico, ...]
+    gerais: Tuple[Topico, ...]
+    dividido: bool  # False quando o arquivo traz uma lista simples
+
+    def topicos(self, tipo_conhecimento: str = 'todos') -> Tuple[Topico, ...]:
+        if tipo_conhecimento == 'conhecimentos_gerais':
+            return self.gerais
+        if tipo_conhecimento == 'conhecimentos_especificos':
+            return self.especificos
+        return self.especificos + self.gerais
+
+
+class _Indices:
+    """Versão compilada do catálogo (somente leitura; trocada por inteiro no reload)"""
+
+    def __init__(self, conteudos: Dict[str, Dict[str, Any]], versao: str):
+        self.conteudos = conteudos
+        self.versao = versao
+        self.blocos_por_cargo: Dict[str, Tuple[str, ...]] = {}
+        self.cargos_por_bloco: Dict[str, Tuple[str, ...]] = {}
+        self.blocos: Dict[Tuple[str, str], BlocoEdital] = {}
+        self.topicos: Dict[str, Topico] = {}
+        self.palavras_topico: Dict[str, FrozenSet[str]] = {}
+        self.topicos_por_palavra: Dict[str, List[str]] = {}
+        self._cargos_normalizados: Dict[str, str] = {}
+        self._blocos_normalizados: Dict[Tuple[str, str], str] = {}
+
+        cargos_por_bloco: Dict[str, List[str]] = {}
+        for cargo, blocos in conteudos.items():
+            self.blocos_por_cargo[cargo] = tuple(blocos)
+            self._cargos_normalizados.setdefault(normalizar_nome(cargo), cargo)
+            for bloco, dados in blocos.items():
+                cargos_por_bloco.setdefault(bloco, []).append(cargo)
+                self._blocos_normalizados.setdefault((cargo, normalizar_nome(bloco)), bloco)
+                self.blocos[(cargo, bloco)] = self._compilar_bloco(cargo, bloco, dados)
+        self.cargos_por_bloco = {bloco: tuple(cargos) for bloco, cargos in cargos_por_bloco.items()}
+
+    def _compilar_bloco(self, cargo: str, bloco: str, dados: Any) -> BlocoEdital:
+        if isinstance(dados, dict):
+            listas = {tipo: dados.get(tipo, []) for tipo in TIPOS_CONHECIMENTO}
+            dividido = True
+        else:
+            listas = {'conhecimentos_especificos': dados if isinstance(dados, list) else [], 'conhecimentos_gerais': []}
+            dividido = False
+        compilados = {}
+        for tipo, nomes in listas.items():
+            topicos = []
+            for nome in nomes:
+                topico = Topico(id_topico(nome), nome, tipo)
+                if topico.id not in self.topicos:
+                    self.topicos[topico.id] = topico
+                    self.palavras_topico[topico.id] = palavras(nome)
+                    for palavra in self.palavras_topico[topico.id]:
+                        self.topicos_por_palavra.setdefault(palavra, []).append(topico.id)
+                topicos.append(topico)
+            compilados[tipo] = tuple(topicos)
+        return BlocoEdital(cargo, bloco, compilados['conhecimentos_especificos'],
+                           compilados['conhecimentos_gerais'], dividido)
+
+    def resolver_cargo(self, cargo: str) -> Optional[str]:
+        if cargo in self.blocos_por_cargo:
+            return cargo
+        return self._cargos_normalizados.get(normalizar_nome(cargo))
+
+    def resolver_bloco(self, cargo: str, bloco: str) -> Optional[BlocoEdital]:
+        cargo = self.resolver_cargo(cargo)
+        if cargo is None:
+            return None
+        encontrado = self.blocos.get((cargo, bloco))
+        if encontrado is not None:
+            return encontrado
+        nome = self._blocos_normalizados.get((cargo, normalizar_nome(bloco)))
+        return self.blocos.get((cargo, nome)) if nome else None
+
+    def resolver_topico(self, tema: str, candidatos: Optional[List[str]] = None) -> Optional[Topico]:
+        """Tópico com o mesmo texto ou, senão, o que contém mais palavras do tema"""
+        exato = self.topicos.get(id_topico(tema or ''))
+        if exato is not None and (candidatos is None or exato.id in candidatos):
+            return exato
+        buscadas = palavras(tema)
+        if not buscadas:
+            return None
+        permitidos = set(candidatos) if candidatos is not None else None
+        contagem: Dict[str, int] = {}
+        for palavra in buscadas:
+            for topico_id in self.topicos_por_palavra.get(palavra, ()):
+                if permitidos is None or topico_id in permitidos:
+                    contagem[topico_id] = contagem.get(topico_id, 0) + 1
+        if not contagem:
+            return None
+        # Mais palavras do tema em comum; no empate, o tópico mais curto (mais específico)
+        melhor = max(contagem, key=lambda t: (contagem[t], -len(self.palavras_topico[t]), t))
+        if contagem[melhor] / len(buscadas) < SIMILARIDADE_MINIMA:
+            return None
+        return self.topicos[melhor]
+
+
+class CatalogoEdital:
+    """Acesso ao catálogo do edital com recarga automática do arquivo"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._ouvintes: List[Callable[[], None]] = []
+        self.caminho = os.path.abspath(caminho or os.getenv('CATALOGO_EDITAL_PATH') or CAMINHO_PADRAO)
+        self.intervalo_verificacao = float(os.getenv('CATALOGO_EDITAL_CHECK_INTERVAL', '5'))
+        self._mtime: Optional[float] = None
+        self._proxima_verificacao = 0.0
+        self._indices = _Indices({}, '')
+        self.recarregar()
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def recarregar(self) -> bool:
+        """Lê e compila o arquivo; retorna False (mantendo a versão atual) se for inválido"""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.caminho)
+                with open(self.caminho, 'rb') as arquivo:
+                    bruto = arquivo.read()
+                conteudos = json.loads(bruto)
+                if not isinstance(conteudos, dict):
+                    raise ValueError('o catálogo deve ser um objeto cargo → blocos')
+                indices = _Indices(conteudos, hashlib.sha256(bruto).hexdigest()[:16])
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logger.error(f"Erro ao carregar o catálogo do edital {self.caminho}: {e}")
+                return False
+            self._indices = indices
+            self._mtime = mtime
+            self._proxima_verificacao = time.monotonic() + self.intervalo_verificacao
+        logger.info("Catálogo do edital carregado", extra={'campos': {
+            'versao': indices.versao, 'cargos': len(indices.blocos_por_cargo), 'topicos': len(indices.topicos)
+        }})
+        for ouvinte in list(self._ouvintes):
+            try:
+                ouvinte()
+            except Exception as e:
+                logger.error(f"Erro ao notificar recarga do catálogo: {e}")
+        return True
+
+    def _indices_atuais(self) -> _Indices:
+        agora = time.monotonic()
+        if self.intervalo_verificacao >= 0 and agora >= self._proxima_verificacao:
+            self._proxima_verificacao = agora + self.intervalo_verificacao
+            try:
+                mudou = os.path.getmtime(self.caminho) != self._mtime
+            except OSError:
+                mudou = False
+            if mudou:
+                self.recarregar()
+        return self._indices
+
+    def ao_recarregar(self, funcao: Callable[[], None]):
+        """Registra uma função chamada após cada recarga (ex.: limpar caches de resposta)"""
+        self._ouvintes.append(funcao)
+
+    def init_app(self, app):
+        """Verifica o arquivo a cada requisição (respeitando o intervalo), inclusive nas
+        rotas servidas de cache que não consultam o catálogo"""
+
+        @app.before_request
+        def _verificar_catalogo():
+            self._indices_atuais()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @property
+    def versao(self) -> str:
+        return self._indices_atuais().versao
+
+    @property
+    def conteudos(self) -> Dict[str, Dict[str, Any]]:
+        """Estrutura original do arquivo (somente leitura)"""
+        return self._indices_atuais().conteudos
+
+    def cargos(self) -> List[str]:
+        return list(self._indices_atuais().blocos_por_cargo)
+
+    def blocos_do_cargo(self, cargo: str) -> List[str]:
+        indices = self._indices_atuais()
+        cargo = indices.resolver_cargo(cargo)
+        return list(indices.blocos_por_cargo.get(cargo, ())) if cargo else []
+
+    def cargos_do_bloco(self, bloco: str) -> List[str]:
+        return list(self._indices_atuais().cargos_por_bloco.get(bloco, ()))
+
+    def todos_blocos(self) -> List[str]:
+        return sorted(self._indices_atuais().cargos_por_bloco)
+
+    def bloco(self, cargo: str, bloco: str) -> Optional[BlocoEdital]:
+        """Conteúdos do bloco para o cargo (busca tolerante a acento, caixa e sufixo ':')"""
+        return self._indices_atuais().resolver_bloco(cargo, bloco)
+
+    def topicos(self, cargo: str, bloco: str, tipo_conhecimento: str = 'todos') -> List[Topico]:
+        encontrado = self.bloco(cargo, bloco)
+        return list(encontrado.topicos(tipo_conhecimento)) if encontrado else []
+
+    def topico(self, topico_id: str) -> Optional[Topico]:
+        return self._indices_atuais().topicos.get(topico_id)
+
+    def resolver_topico(self, tema: str, cargo: Optional[str] = None, bloco: Optional[str] = None) -> Optional[Topico]:
+        """Tópico do catálogo para um tema livre, restrito ao cargo/bloco quando informados"""
+        indices = self._indices_atuais()
+        candidatos = None
+        if cargo and bloco:
+            encontrado = indices.resolver_bloco(cargo, bloco)
+            candidatos = [t.id for t in encontrado.topicos()] if encontrado else None
+        return indices.resolver_topico(tema, candidatos)
+
+
+# Instância global do catálogo do edital
+catalogo_edital = CatalogoEdital()
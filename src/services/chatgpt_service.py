@@ -1,27 +1,39 @@
 """
 Serviço de integração com ChatGPT para geração de questões
 """
+import logging
 import os
-import openai
 import json
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
+from ..config.inicializacao import ModuloTardio, inicializacao_tardia
+from .llm_cassette import llm_cassette
+from .metrics import metrics
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+openai = ModuloTardio('openai')
+
 class ChatGPTService:
     """Serviço para integração com ChatGPT"""
     
     def __init__(self):
-        self.client = openai.OpenAI(
-            api_key=os.getenv('OPENAI_API_KEY'),
-            base_url=os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
-        )
         self.model = "gpt-4"  # Usando GPT-4 com 250k tokens mensais
         self.temperature = 0.7
         self.max_tokens = 1500
     
+    @inicializacao_tardia
+    def client(self):
+        """Cliente da OpenAI, criado na primeira chamada (no worker, não no import)"""
+        return openai.OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            base_url=os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
+        )
+    
     def _get_prompt_estatico(self) -> str:
         """Retorna o prompt estático para geração de questões FGV"""
         return """Você é um elaborador de questões da banca FGV. Seu papel é criar uma única questão objetiva, com base no edital do cargo abaixo. Siga as instruções com rigor:
@@ -43,15 +55,62 @@ Retorne a resposta no seguinte formato JSON:
   "dificuldade": "facil|medio|dificil"
 }"""
     
-    def _get_prompt_dinamico(self, cargo: str, conteudo_edital: str, tipo_questao: str = "múltipla escolha") -> str:
+    def _get_prompt_dinamico(self, cargo: str, conteudo_edital: str, tipo_questao: str = "múltipla escolha",
+                             dificuldade: Optional[str] = None) -> str:
         """Gera o prompt dinâmico baseado no perfil do usuário"""
-        return f"""
+        prompt = f"""
 Cargo do aluno: {cargo}
 Conteúdo do edital a ser cobrado: {conteudo_edital}
 Tipo de questão desejada: {tipo_questao}
 """
+        if dificuldade:
+            prompt += f"Dificuldade desejada (nível atual do aluno): {dificuldade}\n"
+        return prompt
+    
+    def _completar(self, mensagens: List[Dict[str, str]], temperature: float, max_tokens: int,
+                   tipo_prompt: str = 'explicacao') -> str:
+        """Chamada única à API de chat (OPENAI_API_BASE); retorna o texto da resposta"""
+        pedido = {
+            "model": self.model,
+            "messages": mensagens,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        with tracer.span('llm.openai', prompt_type=tipo_prompt, model=self.model) as span:
+            resposta = metrics.medir_llm(
+                'openai', tipo_prompt,
+                lambda: llm_cassette.executar('openai', pedido, lambda: self._chamar_api(pedido))
+            )
+            if span is not None:
+                span.atributos.update(resposta.get('usage') or {})
+        return resposta['content']
     
-    def gerar_questao(self, cargo: str, conteudo_edital: str, tipo_questao: str = "múltipla escolha", historico_perguntas: str = "") -> Optional[Dict[str, Any]]:
+    def _chamar_api(self, pedido: Dict[str, Any]) -> Dict[str, Any]:
+        """Requisição real à API; retorna o texto e o consumo de tokens"""
+        response = self.client.chat.completions.create(**pedido)
+        usage = response.usage
+        return {
+            'content': response.choices[0].message.content.strip(),
+            'usage': {
+                'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0
+            }
+        }
+    
+    def generate_response(self, prompt: str) -> str:
+        """Gera a resposta bruta para os prompts dos jogos (JSON em texto)"""
+        return self._completar(
+            [
+                {"role": "system", "content": "Você é um criador de jogos educativos para concursos públicos. Responda apenas com o JSON solicitado."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            tipo_prompt='jogos'
+        )
+    
+    def gerar_questao(self, cargo: str, conteudo_edital: str, tipo_questao: str = "múltipla escolha", historico_perguntas: str = "",
+                      dificuldade: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Gera uma questão personalizada usando ChatGPT
         
@@ -60,32 +119,30 @@ Tipo de questão desejada: {tipo_questao}
             conteudo_edital: Conteúdo específico do edital
             tipo_questao: Tipo de questão desejada
             historico_perguntas: Texto com questões anteriores para evitar repetição
+            dificuldade: facil, medio ou dificil, conforme a proficiência do usuário (opcional)
             
         Returns:
             Dict com a questão gerada ou None em caso de erro
         """
         try:
             # Combinar prompts estático e dinâmico
-            prompt_completo = self._get_prompt_estatico() + self._get_prompt_dinamico(cargo, conteudo_edital, tipo_questao)
+            prompt_completo = self._get_prompt_estatico() + self._get_prompt_dinamico(cargo, conteudo_edital, tipo_questao, dificuldade)
             
             # Adicionar histórico se disponível
             if historico_perguntas:
                 prompt_completo += f"\n\nIMPORTANTE - EVITAR REPETIÇÃO:\nO aluno já respondeu estas questões:\n{historico_perguntas}\n\nGere uma questão sobre um TEMA DIFERENTE ou ASPECTO NÃO ABORDADO acima dentro de {conteudo_edital}."
             
             # Fazer chamada para ChatGPT
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
+            resposta = self._completar(
+                [
                     {"role": "system", "content": "Você é um especialista em elaboração de questões para concursos públicos."},
                     {"role": "user", "content": prompt_completo}
                 ],
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                tipo_prompt='questao'
             )
             
-            # Extrair resposta
-            resposta = response.choices[0].message.content.strip()
-            
             # Tentar extrair JSON da resposta
             questao_data = self._extrair_json_resposta(resposta)
             
@@ -97,28 +154,31 @@ Tipo de questão desejada: {tipo_questao}
                 
                 return questao_data
             else:
-                print(f"❌ Erro ao extrair JSON da resposta: {resposta[:200]}...")
+                logger.error(f"Erro ao extrair JSON da resposta: {resposta[:200]}...")
                 return None
                 
         except Exception as e:
-            print(f"❌ Erro ao gerar questão: {e}")
+            logger.error(f"Erro ao gerar questão: {e}")
             return None
     
     def _extrair_json_resposta(self, resposta: str) -> Optional[Dict[str, Any]]:
         """Extrai JSON da resposta do ChatGPT"""
-        try:
-            # Tentar encontrar JSON na resposta
-            json_match = re.search(r'\{.*\}', resposta, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            
-            # Se não encontrar JSON, tentar parsear a resposta inteira
-            return json.loads(resposta)
-            
-        except json.JSONDecodeError:
-            # Se falhar, tentar extrair manualmente
-            return self._extrair_manual_resposta(resposta)
+        with tracer.span('json.extrair', provider='openai', chars=len(resposta or '')) as span:
+            try:
+                # Tentar encontrar JSON na resposta
+                json_match = re.search(r'\{.*\}', resposta, re.DOTALL)
+                if json_match:
+                    json_str = json_match.group()
+                    return json.loads(json_str)
+                
+                # Se não encontrar JSON, tentar parsear a resposta inteira
+                return json.loads(resposta)
+                
+            except json.JSONDecodeError:
+                # Se falhar, tentar extrair manualmente
+                if span is not None:
+                    span.atributos['fallback'] = 'manual'
+                return self._extrair_manual_resposta(resposta)
     
     def _extrair_manual_resposta(self, resposta: str) -> Optional[Dict[str, Any]]:
         """Extrai dados manualmente se JSON falhar"""
@@ -172,7 +232,7 @@ Tipo de questão desejada: {tipo_questao}
             return questao_data if questao_data["questao"] else None
             
         except Exception as e:
-            print(f"❌ Erro na extração manual: {e}")
+            logger.error(f"Erro na extração manual: {e}")
             return None
     
     def validar_questao(self, questao_data: Dict[str, Any]) -> bool:
@@ -194,14 +254,13 @@ Tipo de questão desejada: {tipo_questao}
         
         return True
     
-    def gerar_explicacao(self, prompt_explicacao: str) -> Optional[str]:
+    def gerar_explicacao(self, prompt_explicacao: str, tipo_prompt: str = 'explicacao') -> Optional[str]:
         """Gera explicação detalhada usando o Perplexity/ChatGPT"""
         try:
-            print("🤖 Enviando prompt para gerar explicação...")
+            logger.debug("Enviando prompt para gerar explicação")
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            explicacao = self._completar(
+                [
                     {
                         "role": "system",
                         "content": "Você é um professor especialista em concursos públicos. Forneça explicações claras, didáticas e fundamentadas em legislação quando aplicável."
@@ -212,15 +271,14 @@ Tipo de questão desejada: {tipo_questao}
                     }
                 ],
                 temperature=0.3,  # Menor temperatura para respostas mais precisas
-                max_tokens=800
+                max_tokens=800,
+                tipo_prompt=tipo_prompt
             )
-            
-            explicacao = response.choices[0].message.content.strip()
-            print(f"✅ Explicação gerada: {explicacao[:100]}...")
+            logger.debug("Explicação gerada: %s", explicacao[:100])
             return explicacao
             
         except Exception as e:
-            print(f"❌ Erro ao gerar explicação: {e}")
+            logger.error(f"Erro ao gerar explicação: {e}")
             return None
 
 # Instância global do serviço
@@ -0,0 +1,117 @@
+"""
+Compressão das respostas (gzip/brotli) negociada pelo Accept-Encoding
+
+- after_request comprime respostas compressíveis (JSON, msgpack, texto) acima
+  de COMPRESSION_MIN_SIZE bytes; corpos menores saem como estão
+- brotli é usado quando o cliente aceita e o pacote está instalado; senão gzip
+- respostas de catálogos estáticos chegam já comprimidas (ver
+  respostas_estaticas.py) e passam direto
+
+COMPRESSION_ENABLED=false desliga tudo (ex.: quando um proxy já comprime).
+"""
+import gzip
+import os
+from typing import Optional
+
+from flask import request
+
+from .json_provider import MIMETYPE_MSGPACK
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+MIMETYPES_COMPRESSIVEIS = {
+    'application/json', MIMETYPE_MSGPACK, 'application/javascript',
+    'application/xml', 'application/x-ndjson', 'image/svg+xml',
+}
+
+
+def _compressivel(mimetype: str) -> bool:
+    return mimetype in MIMETYPES_COMPRESSIVEIS or mimetype.startswith('text/')
+
+
+class CompressaoRespostas:
+    """Middleware de compressão das respostas"""
+
+    def __init__(self):
+        self.configurar(
+            habilitado=os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true',
+            tamanho_minimo=int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+            nivel_gzip=int(os.getenv('COMPRESSION_GZIP_LEVEL', '6')),
+            qualidade_brotli=int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5')),
+        )
+
+    def configurar(self, habilitado: bool = True, tamanho_minimo: int = 1024,
+                   nivel_gzip: int = 6, qualidade_brotli: int = 5):
+        """Troca a configuração em tempo de execução (benchmarks, testes)"""
+        self.habilitado = habilitado
+        self.tamanho_minimo = max(tamanho_minimo, 0)
+        self.nivel_gzip = nivel_gzip
+        self.qualidade_brotli = qualidade_brotli
+
+    # ------------------------------------------------------------------
+    # Negociação e compressão
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def codificacao_aceita() -> Optional[str]:
+        """Melhor codificação aceita pelo cliente: 'br', 'gzip' ou None"""
+        aceitas = request.accept_encodings
+        opcoes = [('br', aceitas['br'])] if brotli is not None else []
+        opcoes.append(('gzip', aceitas['gzip']))
+        codificacao, qualidade = max(opcoes, key=lambda opcao: opcao[1])
+        return codificacao if qualidade > 0 else None
+
+    @staticmethod
+    def codificacoes_disponiveis():
+        return ('gzip', 'br') if brotli is not None else ('gzip',)
+
+    def comprimir(self, dados: bytes, codificacao: str, maximo: bool = False) -> bytes:
+        if codificacao == 'br':
+            return brotli.compress(dados, quality=11 if maximo else self.qualidade_brotli)
+        return gzip.compress(dados, compresslevel=9 if maximo else self.nivel_gzip, mtime=0)
+
+    @staticmethod
+    def aplicar(response, corpo: bytes, codificacao: Optional[str]):
+        """Troca o corpo da resposta pelo conteúdo (já) codificado"""
+        response.set_data(corpo)
+        if codificacao:
+            response.headers['Content-Encoding'] = codificacao
+        response.vary.add('Accept-Encoding')
+
+    def _deve_comprimir(self, response) -> bool:
+        return (
+            response.status_code == 200
+            and not response.direct_passthrough
+            and not response.is_streamed
+            and 'Content-Encoding' not in response.headers
+            and _compressivel(response.mimetype or '')
+            and response.content_length is not None
+            and response.content_length >= self.tamanho_minimo
+        )
+
+    # ------------------------------------------------------------------
+    # Flask
+    # ------------------------------------------------------------------
+
+    def init_app(self, app):
+        """Comprime as respostas dinâmicas acima do limite"""
+
+        @app.after_request
+        def _comprimir(response):
+            if not self.habilitado or not self._deve_comprimir(response):
+                return response
+            codificacao = self.codificacao_aceita()
+            response.vary.add('Accept-Encoding')
+            if codificacao:
+                self.aplicar(response, self.comprimir(response.get_data(), codificacao), codificacao)
+            return response
+
+
+# Instância global da compressão
+compressao = CompressaoRespostas()
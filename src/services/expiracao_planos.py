@@ -0,0 +1,91 @@
+"""
+Varredura periódica de planos vencidos
+
+obter_plano_usuario só lê: um plano vencido é tratado como gratuito na
+resposta, mas quem grava a reversão é esta varredura. Uma thread por processo
+chama plano_service.expirar_planos_vencidos a cada PLAN_EXPIRY_SWEEP_INTERVAL
+segundos (0 desativa), consultando apenas os usuários com plano vencido e
+regravando-os em lotes de PLAN_EXPIRY_BATCH_SIZE.
+
+Assim a expiração em massa (todos os planos black vencem na mesma data) vira
+algumas transações em segundo plano em vez de uma escrita por requisição.
+Com vários workers a varredura roda em cada um; a transação relê os
+documentos, então um usuário já revertido não é gravado de novo.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from .plano_service import plano_service
+
+logger = logging.getLogger(__name__)
+
+
+class VarreduraPlanos:
+    """Thread que reverte periodicamente os planos vencidos"""
+
+    def __init__(self):
+        self.configurar(
+            intervalo=float(os.getenv('PLAN_EXPIRY_SWEEP_INTERVAL', '300')),
+            tamanho_lote=int(os.getenv('PLAN_EXPIRY_BATCH_SIZE', '200')),
+        )
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self._parar.set)
+
+    def configurar(self, intervalo: float = 300.0, tamanho_lote: int = 200):
+        """Troca a configuração em tempo de execução"""
+        self.intervalo = intervalo
+        self.tamanho_lote = max(1, min(tamanho_lote, 500))  # limite de escritas por transação
+
+    def executar_uma_vez(self) -> int:
+        """Roda uma varredura completa e retorna quantos planos foram revertidos"""
+        inicio = time.perf_counter()
+        revertidos = plano_service.expirar_planos_vencidos(self.tamanho_lote)
+        if revertidos:
+            logger.info("Planos vencidos revertidos para gratuito", extra={'campos': {
+                'revertidos': revertidos,
+                'duracao_ms': round((time.perf_counter() - inicio) * 1000, 1),
+            }})
+        return revertidos
+
+    def _garantir_thread(self):
+        """Inicia a varredura sob demanda (uma por processo, seguro após fork)"""
+        if self.intervalo <= 0:
+            return
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='varredura-planos', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.executar_uma_vez()
+            except Exception as e:
+                logger.error(f"Erro na varredura de planos vencidos: {e}")
+            self._parar.wait(self.intervalo)
+
+    def encerrar(self):
+        self._parar.set()
+
+    def init_app(self, app):
+        """Inicia a varredura na primeira requisição de cada processo"""
+
+        @app.before_request
+        def _iniciar_varredura_planos():
+            self._garantir_thread()
+
+
+# Instância global da varredura de planos
+varredura_planos = VarreduraPlanos()
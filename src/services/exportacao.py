@@ -0,0 +1,138 @@
+"""
+Exportação do histórico completo de estudo de um usuário
+
+Tudo é gerador: as páginas do Firestore (iterar_paginas) viram linhas de
+NDJSON ou CSV, as linhas são agrupadas em blocos de ~TAMANHO_BLOCO bytes e,
+opcionalmente, passam por um compressor gzip incremental antes de ir para a
+resposta chunked. A memória usada é a de uma página e um bloco, qualquer que
+seja o tamanho do histórico.
+
+Cada registro leva o campo `registro`: 'resposta' (usuarios/{id}/respostas),
+'sessao_jogo' (jogos_sessoes) ou 'plano' (historico_planos).
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator
+
+from .firestore_repository import firestore_repository
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+FORMATOS = ('ndjson', 'csv')
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Documentos por consulta e bytes por chunk da resposta
+TAMANHO_PAGINA = 500
+TAMANHO_BLOCO = 64 * 1024
+
+# Colunas do CSV: comuns + campos de cada tipo de registro (vazias quando não se aplicam)
+COLUNAS_CSV = (
+    'registro', 'id', 'data',
+    'questao_id', 'tema', 'acertou', 'alternativa_escolhida', 'gabarito', 'tempo_resposta',
+    'jogo', 'bloco', 'status', 'pontos',
+    'tipo_plano', 'data_expiracao', 'metodo_pagamento', 'pagamento_id',
+)
+
+
+def registros(usuario_id: str, tamanho_pagina: int = TAMANHO_PAGINA) -> Iterator[Dict[str, Any]]:
+    """Respostas, sessões de jogo e histórico de planos do usuário, página a página"""
+    if not firestore_repository.is_connected():
+        return
+    db = firestore_repository.db
+    fontes = (
+        ('resposta', firestore_repository.respostas_ref(usuario_id), 'respondida_em'),
+        ('sessao_jogo', db.collection('jogos_sessoes').where('usuario_id', '==', usuario_id), None),
+        ('plano', db.collection('historico_planos').where('user_id', '==', usuario_id), None),
+    )
+    for registro, query, campo in fontes:
+        for pagina in firestore_repository.iterar_paginas(query, tamanho_pagina, campo=campo):
+            for doc in pagina:
+                dados = doc.to_dict() or {}
+                dados['id'] = doc.id
+                dados['registro'] = registro
+                yield dados
+
+
+def _padrao(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _linha_csv(dados: Dict[str, Any]) -> Dict[str, Any]:
+    registro = dados['registro']
+    if registro == 'resposta':
+        data = dados.get('respondida_em')
+    elif registro == 'sessao_jogo':
+        data = dados.get('inicio')
+    else:
+        data = dados.get('data_registro') or dados.get('data_ativacao')
+    linha = {coluna: dados.get(coluna) for coluna in COLUNAS_CSV}
+    linha.update({
+        'data': _padrao(data) if data is not None else None,
+        'jogo': dados.get('tipo') if registro == 'sessao_jogo' else None,
+    })
+    if isinstance(linha['data_expiracao'], datetime):
+        linha['data_expiracao'] = linha['data_expiracao'].isoformat()
+    return linha
+
+
+def ndjson(itens: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Uma linha JSON por registro"""
+    for dados in itens:
+        if orjson is not None:
+            yield orjson.dumps(dados, default=_padrao, option=orjson.OPT_NON_STR_KEYS) + b'\n'
+        else:
+            yield (json.dumps(dados, default=_padrao, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def csv_linhas(itens: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """Cabeçalho com COLUNAS_CSV e uma linha por registro"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUNAS_CSV, extrasaction='ignore')
+    escritor.writeheader()
+    for dados in itens:
+        escritor.writerow(_linha_csv(dados))
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():  # só o cabeçalho, quando não há registros
+        yield buffer.getvalue().encode('utf-8')
+
+
+def em_blocos(partes: Iterable[bytes], tamanho: int = TAMANHO_BLOCO) -> Iterator[bytes]:
+    """Agrupa pedaços pequenos em chunks de ~tamanho bytes"""
+    acumulado = []
+    total = 0
+    for parte in partes:
+        acumulado.append(parte)
+        total += len(parte)
+        if total >= tamanho:
+            yield b''.join(acumulado)
+            acumulado, total = [], 0
+    if acumulado:
+        yield b''.join(acumulado)
+
+
+def gzip_incremental(blocos: Iterable[bytes], nivel: int = 6) -> Iterator[bytes]:
+    """Comprime o fluxo em formato gzip sem juntar o corpo inteiro"""
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def exportar(usuario_id: str, formato: str = 'ndjson', gzip: bool = False) -> Iterator[bytes]:
+    """Corpo da exportação como gerador de bytes"""
+    itens = registros(usuario_id)
+    linhas = ndjson(itens) if formato == 'ndjson' else csv_linhas(itens)
+    blocos = em_blocos(linhas)
+    return gzip_incremental(blocos) if gzip else blocos
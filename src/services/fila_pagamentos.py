@@ -0,0 +1,329 @@
+"""
+Fila durável das notificações de pagamento do MercadoPago
+
+O webhook só grava o ID do pagamento aqui (um INSERT no SQLite) e responde.
+Uma thread por processo consome a fila, chama o processador registrado pela
+rota de pagamentos (consulta ao MercadoPago + ativação do plano) e guarda o
+status de cada pagamento, que o /payments/verify usa sem consultar o
+MercadoPago de novo.
+
+- notificacoes: uma linha pendente por pagamento (webhooks repetidos do mesmo
+  ID enquanto ele aguarda são descartados); falhas voltam com backoff
+  exponencial até PAYMENTS_MAX_ATTEMPTS tentativas
+- pagamentos: último status conhecido e o controle de ativação do plano
+  (pendente → em_andamento → concluida), reservado com um UPDATE condicional
+  para que só um processo/thread ative o plano de cada pagamento; a reserva
+  vale RESERVA_SEGUNDOS e, se o processo morrer antes de concluir, outro
+  chamador a retoma (ativar_plano_usuario ignora o pagamento já aplicado)
+
+Funciona com vários workers do gunicorn no mesmo arquivo (WAL e BEGIN
+IMMEDIATE, como o backend sqlite de armazenamento). PAYMENTS_QUEUE_PATH
+define o arquivo.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS notificacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payment_id TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    proxima_tentativa REAL NOT NULL,
+    reservado_ate REAL,
+    recebido_em REAL NOT NULL,
+    erro TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS notificacoes_pendente
+    ON notificacoes (payment_id) WHERE estado = 'pendente';
+CREATE INDEX IF NOT EXISTS notificacoes_estado ON notificacoes (estado, proxima_tentativa);
+CREATE TABLE IF NOT EXISTS pagamentos (
+    payment_id TEXT PRIMARY KEY,
+    status TEXT,
+    user_id TEXT,
+    tipo_plano TEXT,
+    ativacao TEXT NOT NULL DEFAULT 'pendente',
+    ativado_para TEXT,
+    ativacao_reservada_ate REAL,
+    atualizado_em REAL NOT NULL,
+    dados TEXT
+);
+"""
+
+# Tempo máximo de processamento de uma notificação (ou de uma ativação de plano)
+# antes de outro worker poder retomá-la
+RESERVA_SEGUNDOS = 120
+BACKOFF_MAXIMO = 600
+
+
+class FilaPagamentos:
+    """Fila de notificações em SQLite com worker em segundo plano"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or os.getenv('PAYMENTS_QUEUE_PATH', 'pagamentos.sqlite3')
+        self.intervalo = float(os.getenv('PAYMENTS_WORKER_INTERVAL', '2'))
+        self.max_tentativas = int(os.getenv('PAYMENTS_MAX_ATTEMPTS', '8'))
+        self.retencao_dias = float(os.getenv('PAYMENTS_RETENTION_DAYS', '30'))
+        self._processador: Optional[Callable[[str], Any]] = None
+        self._app = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self._parar.set)
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (e por processo, após fork); o arquivo só é aberto no primeiro uso"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conexao.row_factory = sqlite3.Row
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.executescript(_ESQUEMA)
+            colunas = {linha['name'] for linha in conexao.execute('PRAGMA table_info(pagamentos)')}
+            if 'ativacao_reservada_ate' not in colunas:
+                # Arquivos criados antes do prazo da reserva de ativação
+                conexao.execute('ALTER TABLE pagamentos ADD COLUMN ativacao_reservada_ate REAL')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    @contextmanager
+    def _transacao(self):
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            yield conexao
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+        conexao.execute('COMMIT')
+
+    # ------------------------------------------------------------------
+    # Entrada (webhook)
+    # ------------------------------------------------------------------
+
+    def enfileirar(self, payment_id: str) -> bool:
+        """Registra a notificação; False se o pagamento já estava aguardando na fila"""
+        agora = time.time()
+        cursor = self._conexao().execute(
+            'INSERT OR IGNORE INTO notificacoes (payment_id, proxima_tentativa, recebido_em) VALUES (?, ?, ?)',
+            (str(payment_id), agora, agora)
+        )
+        self._garantir_thread()
+        self._acordar.set()
+        return cursor.rowcount == 1
+
+    def registrar_processador(self, funcao: Callable[[str], Any]):
+        """Função chamada com o payment_id de cada notificação (levanta exceção para tentar de novo)"""
+        self._processador = funcao
+
+    # ------------------------------------------------------------------
+    # Status dos pagamentos
+    # ------------------------------------------------------------------
+
+    def status(self, payment_id: str) -> Optional[Dict[str, Any]]:
+        """Último status processado do pagamento (None se ainda não processado)"""
+        linha = self._conexao().execute(
+            'SELECT * FROM pagamentos WHERE payment_id = ?', (str(payment_id),)
+        ).fetchone()
+        if linha is None:
+            return None
+        registro = dict(linha)
+        registro['dados'] = json.loads(registro['dados']) if registro['dados'] else {}
+        return registro
+
+    def registrar_status(self, payment_id: str, status: Optional[str], user_id: Optional[str] = None,
+                         tipo_plano: Optional[str] = None, dados: Optional[Dict[str, Any]] = None):
+        """Grava o status consultado no MercadoPago (sem mexer no controle de ativação)"""
+        self._conexao().execute(
+            """INSERT INTO pagamentos (payment_id, status, user_id, tipo_plano, atualizado_em, dados)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (payment_id) DO UPDATE SET
+                   status = excluded.status,
+                   user_id = COALESCE(excluded.user_id, pagamentos.user_id),
+                   tipo_plano = COALESCE(excluded.tipo_plano, pagamentos.tipo_plano),
+                   atualizado_em = excluded.atualizado_em,
+                   dados = excluded.dados""",
+            (str(payment_id), status, user_id, tipo_plano, time.time(),
+             json.dumps(dados or {}, ensure_ascii=False, default=str))
+        )
+
+    def reservar_ativacao(self, payment_id: str) -> bool:
+        """True para um único chamador por pagamento; os demais recebem False
+
+        Uma reserva cujo prazo venceu (processo morto entre reservar e
+        concluir) pode ser retomada.
+        """
+        agora = time.time()
+        cursor = self._conexao().execute(
+            "UPDATE pagamentos SET ativacao = 'em_andamento', ativacao_reservada_ate = ?, atualizado_em = ? "
+            "WHERE payment_id = ? AND (ativacao = 'pendente' OR (ativacao = 'em_andamento' "
+            "AND (ativacao_reservada_ate IS NULL OR ativacao_reservada_ate < ?)))",
+            (agora + RESERVA_SEGUNDOS, agora, str(payment_id), agora)
+        )
+        return cursor.rowcount == 1
+
+    def concluir_ativacao(self, payment_id: str, user_id: str):
+        self._conexao().execute(
+            "UPDATE pagamentos SET ativacao = 'concluida', ativado_para = ?, ativacao_reservada_ate = NULL, "
+            "atualizado_em = ? WHERE payment_id = ?",
+            (user_id, time.time(), str(payment_id))
+        )
+
+    def liberar_ativacao(self, payment_id: str):
+        """Desfaz a reserva depois de uma falha, permitindo nova tentativa"""
+        self._conexao().execute(
+            "UPDATE pagamentos SET ativacao = 'pendente', ativacao_reservada_ate = NULL, atualizado_em = ? "
+            "WHERE payment_id = ? AND ativacao = 'em_andamento'",
+            (time.time(), str(payment_id))
+        )
+
+    # ------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------
+
+    def _reservar_proxima(self) -> Optional[sqlite3.Row]:
+        agora = time.time()
+        with self._transacao() as conexao:
+            linha = conexao.execute(
+                """SELECT id, payment_id, tentativas FROM notificacoes
+                   WHERE (estado = 'pendente' AND proxima_tentativa <= ?)
+                      OR (estado = 'processando' AND reservado_ate < ?)
+                   ORDER BY id LIMIT 1""",
+                (agora, agora)
+            ).fetchone()
+            if linha is not None:
+                conexao.execute(
+                    "UPDATE notificacoes SET estado = 'processando', reservado_ate = ? WHERE id = ?",
+                    (agora + RESERVA_SEGUNDOS, linha['id'])
+                )
+        return linha
+
+    def _finalizar(self, notificacao: sqlite3.Row, erro: Optional[Exception]):
+        conexao = self._conexao()
+        if erro is None:
+            conexao.execute("UPDATE notificacoes SET estado = 'feito', erro = NULL WHERE id = ?", (notificacao['id'],))
+            return
+        tentativas = notificacao['tentativas'] + 1
+        if tentativas >= self.max_tentativas:
+            logger.error(f"Notificação do pagamento {notificacao['payment_id']} descartada após "
+                         f"{tentativas} tentativas: {erro}")
+            conexao.execute("UPDATE notificacoes SET estado = 'erro', tentativas = ?, erro = ? WHERE id = ?",
+                            (tentativas, str(erro), notificacao['id']))
+            return
+        espera = min(2 ** tentativas, BACKOFF_MAXIMO)
+        try:
+            conexao.execute(
+                "UPDATE notificacoes SET estado = 'pendente', tentativas = ?, proxima_tentativa = ?, erro = ? "
+                "WHERE id = ?",
+                (tentativas, time.time() + espera, str(erro), notificacao['id'])
+            )
+        except sqlite3.IntegrityError:
+            # Chegou outra notificação do mesmo pagamento enquanto esta era processada
+            conexao.execute("UPDATE notificacoes SET estado = 'substituida', erro = ? WHERE id = ?",
+                            (str(erro), notificacao['id']))
+        logger.warning(f"Falha ao processar pagamento {notificacao['payment_id']} "
+                       f"(tentativa {tentativas}, nova em {espera}s): {erro}")
+
+    def processar_pendentes(self, limite: Optional[int] = None) -> int:
+        """Processa as notificações prontas; retorna quantas foram tratadas"""
+        if self._processador is None:
+            return 0
+        tratadas = 0
+        while limite is None or tratadas < limite:
+            notificacao = self._reservar_proxima()
+            if notificacao is None:
+                break
+            erro = None
+            try:
+                if self._app is not None:
+                    with self._app.app_context():
+                        self._processador(notificacao['payment_id'])
+                else:
+                    self._processador(notificacao['payment_id'])
+            except Exception as e:
+                erro = e
+            self._finalizar(notificacao, erro)
+            tratadas += 1
+        return tratadas
+
+    def pendentes(self) -> int:
+        """Notificações aguardando processamento (inclui as em backoff)"""
+        return self._conexao().execute(
+            "SELECT COUNT(*) FROM notificacoes WHERE estado IN ('pendente', 'processando')"
+        ).fetchone()[0]
+
+    def limpar_antigas(self) -> int:
+        """Remove notificações encerradas há mais de PAYMENTS_RETENTION_DAYS"""
+        limite = time.time() - self.retencao_dias * 86400
+        cursor = self._conexao().execute(
+            "DELETE FROM notificacoes WHERE estado NOT IN ('pendente', 'processando') AND recebido_em < ?",
+            (limite,)
+        )
+        return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _garantir_thread(self):
+        """Inicia o worker sob demanda (um por processo, seguro após fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='fila-pagamentos', daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        proxima_limpeza = 0.0
+        while not self._parar.is_set():
+            self._acordar.clear()
+            try:
+                if time.monotonic() >= proxima_limpeza:
+                    self.limpar_antigas()
+                    proxima_limpeza = time.monotonic() + 3600
+                tratadas = self.processar_pendentes()
+            except Exception as e:
+                logger.error(f"Erro no worker da fila de pagamentos: {e}")
+                tratadas = 0
+            if not tratadas:
+                self._acordar.wait(self.intervalo)
+
+    def encerrar(self):
+        self._parar.set()
+        self._acordar.set()
+
+    def init_app(self, app):
+        """Guarda a app (contexto do processador) e inicia o worker na primeira requisição de cada processo,
+        retomando notificações que ficaram na fila após um restart"""
+        self._app = app
+
+        @app.before_request
+        def _iniciar_fila_pagamentos():
+            self._garantir_thread()
+
+
+# Instância global da fila de pagamentos
+fila_pagamentos = FilaPagamentos()
@@ -0,0 +1,666 @@
+"""
+Camada central de acesso ao Firestore
+
+Todas as rotas e serviços obtêm o cliente por aqui. O cliente é envolvido por
+wrappers que contabilizam leituras, escritas e latência por requisição e por
+endpoint, o que dá um único ponto para cache, lotes e medição de custo.
+"""
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import g, has_request_context, request
+
+from ..config.firebase_config import firebase_config
+from ..config.inicializacao import ModuloTardio
+from .metrics import metrics
+from .paginacao import codificar_cursor, decodificar_cursor
+from .tracing import tracer
+
+# Endpoint usado para operações feitas fora de uma requisição (threads de flush, jobs)
+ENDPOINT_BACKGROUND = '<background>'
+
+firestore = ModuloTardio('firebase_admin.firestore')
+
+
+def _desembrulhar(obj):
+    """Retorna o objeto original do Firestore por trás de um wrapper instrumentado"""
+    return getattr(obj, '_alvo', obj)
+
+
+class EstatisticasFirestore:
+    """Acumula contadores de operações do Firestore por endpoint"""
+
+    CAMPOS = ('leituras', 'escritas', 'exclusoes', 'chamadas', 'tempo_ms')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_endpoint: Dict[str, Dict[str, float]] = {}
+
+    def acumular(self, endpoint: str, contadores: Dict[str, float], requisicao: bool = True):
+        """Soma os contadores de uma requisição (ou operação avulsa) ao endpoint"""
+        with self._lock:
+            atual = self._por_endpoint.setdefault(endpoint, {'requisicoes': 0, **{c: 0 for c in self.CAMPOS}})
+            if requisicao:
+                atual['requisicoes'] += 1
+            for campo in self.CAMPOS:
+                atual[campo] += contadores.get(campo, 0)
+
+    def por_endpoint(self) -> Dict[str, Dict[str, float]]:
+        """Cópia dos contadores acumulados por endpoint"""
+        with self._lock:
+            return {endpoint: dict(contadores) for endpoint, contadores in self._por_endpoint.items()}
+
+    def limpar(self):
+        with self._lock:
+            self._por_endpoint.clear()
+
+
+class _Instrumentado:
+    """Base dos wrappers: repassa atributos desconhecidos ao objeto original"""
+
+    def __init__(self, alvo, repositorio, colecao=None):
+        self._alvo = alvo
+        self._repositorio = repositorio
+        self._colecao = colecao
+
+    def __getattr__(self, nome):
+        return getattr(self._alvo, nome)
+
+    def _medir(self, tipo: str, funcao: Callable, quantidade: Callable[[Any], int] = lambda _: 1):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        self._repositorio.registrar_operacao(tipo, self._colecao, quantidade(resultado), time.perf_counter() - inicio)
+        return resultado
+
+
+class _ConsultaInstrumentada(_Instrumentado):
+    """Wrapper de Query: encadeia filtros e contabiliza os documentos lidos"""
+
+    def _encadear(self, nome, *args, **kwargs):
+        return _ConsultaInstrumentada(getattr(self._alvo, nome)(*args, **kwargs), self._repositorio, self._colecao)
+
+    def where(self, *args, **kwargs):
+        return self._encadear('where', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._encadear('order_by', *args, **kwargs)
+
+    def limit(self, *args, **kwargs):
+        return self._encadear('limit', *args, **kwargs)
+
+    def offset(self, *args, **kwargs):
+        return self._encadear('offset', *args, **kwargs)
+
+    def select(self, *args, **kwargs):
+        return self._encadear('select', *args, **kwargs)
+
+    def start_after(self, *args, **kwargs):
+        return self._encadear('start_after', *args, **kwargs)
+
+    def start_at(self, *args, **kwargs):
+        return self._encadear('start_at', *args, **kwargs)
+
+    def end_before(self, *args, **kwargs):
+        return self._encadear('end_before', *args, **kwargs)
+
+    def end_at(self, *args, **kwargs):
+        return self._encadear('end_at', *args, **kwargs)
+
+    def get(self, *args, **kwargs):
+        kwargs = _desembrulhar_transacao(kwargs)
+        # Consultas vazias também custam uma leitura
+        return self._medir('leituras', lambda: list(self._alvo.get(*args, **kwargs)), lambda docs: max(len(docs), 1))
+
+    def stream(self, *args, **kwargs):
+        kwargs = _desembrulhar_transacao(kwargs)
+        inicio = time.perf_counter()
+        lidos = 0
+        try:
+            for doc in self._alvo.stream(*args, **kwargs):
+                lidos += 1
+                yield doc
+        finally:
+            self._repositorio.registrar_operacao('leituras', self._colecao, max(lidos, 1), time.perf_counter() - inicio)
+
+
+class _ColecaoInstrumentada(_ConsultaInstrumentada):
+    """Wrapper de CollectionReference"""
+
+    def document(self, *args, **kwargs):
+        return _DocumentoInstrumentado(self._alvo.document(*args, **kwargs), self._repositorio, self._colecao)
+
+    def add(self, *args, **kwargs):
+        return self._medir('escritas', lambda: self._alvo.add(*args, **kwargs))
+
+
+class _DocumentoInstrumentado(_Instrumentado):
+    """Wrapper de DocumentReference"""
+
+    def get(self, *args, **kwargs):
+        kwargs = _desembrulhar_transacao(kwargs)
+        return self._medir('leituras', lambda: self._alvo.get(*args, **kwargs))
+
+    def set(self, *args, **kwargs):
+        return self._medir('escritas', lambda: self._alvo.set(*args, **kwargs))
+
+    def create(self, *args, **kwargs):
+        return self._medir('escritas', lambda: self._alvo.create(*args, **kwargs))
+
+    def update(self, *args, **kwargs):
+        return self._medir('escritas', lambda: self._alvo.update(*args, **kwargs))
+
+    def delete(self, *args, **kwargs):
+        return self._medir('exclusoes', lambda: self._alvo.delete(*args, **kwargs))
+
+    def collection(self, nome):
+        return _ColecaoInstrumentada(self._alvo.collection(nome), self._repositorio, nome)
+
+
+class _EscritaAgrupada(_Instrumentado):
+    """Base de lotes e transações: desembrulha referências e conta as operações"""
+
+    def _operacao(self, nome, tipo, referencia, *args, **kwargs):
+        self._pendentes.append((tipo, getattr(referencia, '_colecao', None)))
+        return getattr(self._alvo, nome)(_desembrulhar(referencia), *args, **kwargs)
+
+    def set(self, referencia, *args, **kwargs):
+        return self._operacao('set', 'escritas', referencia, *args, **kwargs)
+
+    def create(self, referencia, *args, **kwargs):
+        return self._operacao('create', 'escritas', referencia, *args, **kwargs)
+
+    def update(self, referencia, *args, **kwargs):
+        return self._operacao('update', 'escritas', referencia, *args, **kwargs)
+
+    def delete(self, referencia, *args, **kwargs):
+        return self._operacao('delete', 'exclusoes', referencia, *args, **kwargs)
+
+    def _registrar_pendentes(self, duracao: float):
+        pendentes, self._pendentes = self._pendentes, []
+        for indice, (tipo, colecao) in enumerate(pendentes):
+            # A latência do commit é atribuída uma única vez
+            self._repositorio.registrar_operacao(tipo, colecao, 1, duracao if indice == 0 else 0.0)
+
+
+class _LoteInstrumentado(_EscritaAgrupada):
+    """Wrapper de WriteBatch"""
+
+    def __init__(self, alvo, repositorio):
+        super().__init__(alvo, repositorio)
+        self._pendentes = []
+
+    def commit(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        resultado = self._alvo.commit(*args, **kwargs)
+        self._registrar_pendentes(time.perf_counter() - inicio)
+        return resultado
+
+    def __len__(self):
+        return len(self._pendentes)
+
+
+class _TransacaoInstrumentada(_EscritaAgrupada):
+    """Wrapper de Transaction entregue à função executada por executar_transacao"""
+
+    def __init__(self, alvo, repositorio):
+        super().__init__(alvo, repositorio)
+        self._pendentes = []
+
+    def get(self, referencia, *args, **kwargs):
+        colecao = getattr(referencia, '_colecao', None)
+        inicio = time.perf_counter()
+        resultado = self._alvo.get(_desembrulhar(referencia), *args, **kwargs)
+        if hasattr(resultado, '__iter__') and not hasattr(resultado, 'exists'):
+            resultado = list(resultado)
+            quantidade = max(len(resultado), 1)
+        else:
+            quantidade = 1
+        self._repositorio.registrar_operacao('leituras', colecao, quantidade, time.perf_counter() - inicio)
+        return resultado
+
+    def get_all(self, referencias, *args, **kwargs):
+        referencias = list(referencias)
+        colecao = getattr(referencias[0], '_colecao', None) if referencias else None
+        inicio = time.perf_counter()
+        snapshots = list(self._alvo.get_all([_desembrulhar(r) for r in referencias], *args, **kwargs))
+        self._repositorio.registrar_operacao('leituras', colecao, max(len(snapshots), 1), time.perf_counter() - inicio)
+        return snapshots
+
+
+class _ClienteInstrumentado(_Instrumentado):
+    """Wrapper do cliente do Firestore"""
+
+    def collection(self, nome):
+        return _ColecaoInstrumentada(self._alvo.collection(nome), self._repositorio, nome)
+
+    def document(self, caminho):
+        colecao = caminho.split('/')[-2] if '/' in caminho else None
+        return _DocumentoInstrumentado(self._alvo.document(caminho), self._repositorio, colecao)
+
+    def batch(self):
+        return _LoteInstrumentado(self._alvo.batch(), self._repositorio)
+
+    def get_all(self, referencias, *args, **kwargs):
+        referencias = list(referencias)
+        colecao = getattr(referencias[0], '_colecao', None) if referencias else None
+        kwargs = _desembrulhar_transacao(kwargs)
+        inicio = time.perf_counter()
+        snapshots = list(self._alvo.get_all([_desembrulhar(r) for r in referencias], *args, **kwargs))
+        self._repositorio.registrar_operacao('leituras', colecao, max(len(snapshots), 1), time.perf_counter() - inicio)
+        return snapshots
+
+
+def _desembrulhar_transacao(kwargs):
+    if kwargs.get('transaction') is not None:
+        kwargs = dict(kwargs, transaction=_desembrulhar(kwargs['transaction']))
+    return kwargs
+
+
+class FirestoreRepository:
+    """Ponto único de acesso ao Firestore com contabilização de operações"""
+
+    ASCENDENTE = 'ASCENDING'
+    DESCENDENTE = 'DESCENDING'
+    ID_DOCUMENTO = '__name__'
+
+    def __init__(self, config=firebase_config):
+        self._config = config
+        self._cliente_base = None
+        self._cliente = None
+        self.estatisticas = EstatisticasFirestore()
+
+    # ------------------------------------------------------------------
+    # Cliente
+    # ------------------------------------------------------------------
+
+    def is_connected(self) -> bool:
+        """Verifica se há um banco disponível"""
+        return self._config.is_connected()
+
+    @property
+    def db(self):
+        """Cliente instrumentado (None em modo desenvolvimento)"""
+        base = self._config.get_db()
+        if base is None:
+            return None
+        if base is not self._cliente_base:
+            self._cliente_base = base
+            self._cliente = _ClienteInstrumentado(base, self)
+        return self._cliente
+
+    @staticmethod
+    def incremento(valor: float):
+        """Transformação de incremento atômico para set/update"""
+        return firestore.Increment(valor)
+
+    @staticmethod
+    def timestamp_servidor():
+        """Sentinela de timestamp do servidor para set/update"""
+        return firestore.SERVER_TIMESTAMP
+
+    def executar_transacao(self, funcao: Callable, *args, **kwargs):
+        """Executa funcao(transacao, *args) dentro de uma transação com retentativas"""
+        db = self.db
+        tentativas = []
+
+        def _corpo(transacao, *a, **kw):
+            instrumentada = _TransacaoInstrumentada(transacao, self)
+            tentativas.append(instrumentada)
+            return funcao(instrumentada, *a, **kw)
+
+        inicio = time.perf_counter()
+        base = _desembrulhar(db)
+        if hasattr(base, 'executar_transacao'):
+            # Backends locais (memory, sqlite) têm transação própria
+            resultado = base.executar_transacao(_corpo, *args, **kwargs)
+        else:
+            resultado = firestore.transactional(_corpo)(base.transaction(), *args, **kwargs)
+        # Apenas as escritas da tentativa confirmada são contabilizadas
+        tentativas[-1]._registrar_pendentes(time.perf_counter() - inicio)
+        return resultado
+
+    def paginar(self, query, campo: str, limite: int, cursor: Optional[str] = None,
+                direcao: str = DESCENDENTE) -> Tuple[List[Any], Optional[str]]:
+        """Uma página da consulta ordenada por `campo` (desempate pelo ID) e o cursor da próxima
+
+        Lê limite + 1 documentos para saber se há mais; o cursor é None na
+        última página. Levanta CursorInvalido para tokens malformados.
+        """
+        query = query.order_by(campo, direction=direcao).order_by(self.ID_DOCUMENTO, direction=direcao)
+        if cursor:
+            valor, doc_id = decodificar_cursor(cursor, campo)
+            query = query.start_after({campo: valor, self.ID_DOCUMENTO: doc_id})
+        docs = list(query.limit(limite + 1).stream())
+        if len(docs) <= limite:
+            return docs, None
+        docs = docs[:limite]
+        return docs, codificar_cursor(campo, docs[-1].get(campo), docs[-1].id)
+
+    def iterar_paginas(self, query, tamanho_pagina: int = 500, campo: Optional[str] = None,
+                       direcao: str = ASCENDENTE, apos_id: Optional[str] = None) -> Iterator[List[Any]]:
+        """Percorre a consulta em páginas (start_after), sem carregar o resultado inteiro
+
+        Ordena por `campo` (se houver) e pelo ID do documento; `apos_id`
+        retoma depois de um documento quando não há `campo`.
+        """
+        if campo:
+            query = query.order_by(campo, direction=direcao)
+        query = query.order_by(self.ID_DOCUMENTO, direction=direcao)
+        cursor = {self.ID_DOCUMENTO: apos_id} if apos_id and not campo else None
+        while True:
+            pagina = query.limit(tamanho_pagina)
+            if cursor is not None:
+                pagina = pagina.start_after(cursor)
+            docs = list(pagina.stream())
+            if docs:
+                yield docs
+            if len(docs) < tamanho_pagina:
+                return
+            ultimo = docs[-1]
+            cursor = {self.ID_DOCUMENTO: ultimo.id}
+            if campo:
+                cursor[campo] = ultimo.get(campo)
+
+    # ------------------------------------------------------------------
+    # usuarios
+    # ------------------------------------------------------------------
+
+    def usuario_ref(self, usuario_id: str):
+        return self.db.collection('usuarios').document(usuario_id)
+
+    def obter_usuario(self, usuario_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados do usuário ou None se não existir"""
+        if not self.is_connected() or not usuario_id:
+            return None
+        doc = self.usuario_ref(usuario_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def salvar_usuario(self, usuario_id: str, dados: Dict[str, Any], merge: bool = True):
+        if self.is_connected():
+            self.usuario_ref(usuario_id).set(dados, merge=merge)
+
+    def atualizar_usuario(self, usuario_id: str, dados: Dict[str, Any]):
+        """Atualiza campos de um usuário existente"""
+        if self.is_connected():
+            self.usuario_ref(usuario_id).update(dados)
+
+    def listar_planos_vencidos(self, ate: str, limite: int, apos=None) -> List[Any]:
+        """Snapshots (só plano.data_expiracao) dos usuários com plano vencido até `ate`
+
+        Usa o índice de campo único de plano.data_expiracao: planos sem
+        expiração (None) não entram na faixa. `apos` é o último snapshot da
+        página anterior.
+        """
+        if not self.is_connected():
+            return []
+        query = self.db.collection('usuarios')\
+            .where('plano.data_expiracao', '<=', ate)\
+            .order_by('plano.data_expiracao')\
+            .select(['plano.data_expiracao'])\
+            .limit(limite)
+        if apos is not None:
+            query = query.start_after(apos)
+        return list(query.stream())
+
+    def incrementar_usuario(self, usuario_id: str, incrementos: Dict[str, float], extras: Optional[Dict[str, Any]] = None):
+        """Soma valores a campos numéricos sem ler o documento antes"""
+        if not self.is_connected():
+            return
+        dados = {campo: self.incremento(valor) for campo, valor in incrementos.items()}
+        dados.update(extras or {})
+        self.atualizar_usuario(usuario_id, dados)
+
+    # ------------------------------------------------------------------
+    # usuarios/{id}/respostas (log de respostas, só inclusão)
+    # ------------------------------------------------------------------
+
+    def respostas_ref(self, usuario_id: str):
+        return self.usuario_ref(usuario_id).collection('respostas')
+
+    def registrar_resposta(self, usuario_id: str, resposta: Dict[str, Any], resposta_id: Optional[str] = None):
+        """Acrescenta uma resposta ao log do usuário (uma escrita; ID automático se não informado)"""
+        if self.is_connected():
+            self.respostas_ref(usuario_id).document(resposta_id).set(resposta)
+
+    def listar_respostas(self, usuario_id: str, limite: Optional[int] = None,
+                         desde=None) -> List[Dict[str, Any]]:
+        """Respostas do usuário, das mais recentes para as mais antigas (desde: respondida_em mínimo)"""
+        if not self.is_connected():
+            return []
+        query = self.respostas_ref(usuario_id)
+        if desde is not None:
+            query = query.where('respondida_em', '>=', desde)
+        query = query.order_by('respondida_em', direction=self.DESCENDENTE)
+        if limite:
+            query = query.limit(limite)
+        respostas = []
+        for doc in query.stream():
+            resposta = doc.to_dict()
+            resposta['id'] = doc.id
+            respostas.append(resposta)
+        return respostas
+
+    def paginar_respostas(self, usuario_id: str, limite: int,
+                          cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Página do log de respostas (mais recentes primeiro) e o cursor da próxima"""
+        if not self.is_connected():
+            return [], None
+        docs, proximo = self.paginar(self.respostas_ref(usuario_id), 'respondida_em', limite, cursor)
+        respostas = []
+        for doc in docs:
+            resposta = doc.to_dict()
+            resposta['id'] = doc.id
+            respostas.append(resposta)
+        return respostas, proximo
+
+    # ------------------------------------------------------------------
+    # usuarios/{id}/revisoes (fila de revisão espaçada, um cartão por questão)
+    # ------------------------------------------------------------------
+
+    def revisoes_ref(self, usuario_id: str):
+        return self.usuario_ref(usuario_id).collection('revisoes')
+
+    def obter_revisao(self, usuario_id: str, questao_id: str) -> Optional[Dict[str, Any]]:
+        if not self.is_connected() or not questao_id:
+            return None
+        doc = self.revisoes_ref(usuario_id).document(questao_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def salvar_revisao(self, usuario_id: str, questao_id: str, cartao: Dict[str, Any]):
+        if self.is_connected():
+            self.revisoes_ref(usuario_id).document(questao_id).set(cartao)
+
+    def listar_revisoes_pendentes(self, usuario_id: str, ate, limite: int) -> List[Dict[str, Any]]:
+        """Cartões com proxima_revisao <= ate, os mais atrasados primeiro
+
+        O índice automático de proxima_revisao faz a fila de prioridade: a
+        consulta lê só os `limite` primeiros, sem percorrer o histórico.
+        """
+        if not self.is_connected():
+            return []
+        query = self.revisoes_ref(usuario_id)\
+            .where('proxima_revisao', '<=', ate)\
+            .order_by('proxima_revisao')\
+            .limit(limite)
+        return [dict(doc.to_dict(), questao_id=doc.id) for doc in query.stream()]
+
+    def proxima_revisao(self, usuario_id: str, apos):
+        """Data da primeira revisão agendada depois de `apos` (None se a fila estiver vazia)"""
+        if not self.is_connected():
+            return None
+        docs = self.revisoes_ref(usuario_id)\
+            .where('proxima_revisao', '>', apos)\
+            .order_by('proxima_revisao')\
+            .select(['proxima_revisao'])\
+            .limit(1)\
+            .get()
+        return docs[0].to_dict().get('proxima_revisao') if docs else None
+
+    # ------------------------------------------------------------------
+    # banco_questoes (provas anteriores importadas)
+    # ------------------------------------------------------------------
+
+    # Limite de valores do operador 'in' no Firestore
+    MAXIMO_VALORES_IN = 30
+
+    def obter_questao_banco(self, questao_id: str) -> Optional[Dict[str, Any]]:
+        if not self.is_connected() or not questao_id:
+            return None
+        doc = self.db.collection('banco_questoes').document(questao_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def obter_questoes_banco(self, questao_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Questões importadas por ID numa única leitura em lote"""
+        if not self.is_connected() or not questao_ids:
+            return {}
+        refs = [self.db.collection('banco_questoes').document(qid) for qid in questao_ids]
+        return {doc.id: doc.to_dict() for doc in self.db.get_all(refs) if doc.exists}
+
+    def atualizar_questao_banco(self, questao_id: str, dados: Dict[str, Any]):
+        if self.is_connected():
+            self.db.collection('banco_questoes').document(questao_id).update(dados)
+
+    def questoes_banco_por_dificuldade(self, topico_ids: List[str], alvo: float, quantidade: int = 1,
+                                       excluir=()) -> List[Dict[str, Any]]:
+        """Questões dos tópicos com dificuldade_irt mais próxima de `alvo`, fora de `excluir`
+
+        Duas consultas no índice composto topico_id + dificuldade_irt (as
+        primeiras acima e as primeiras abaixo do alvo). Questões importadas
+        antes dos ratings não têm o campo: sem resultado, cai no sorteio.
+        """
+        if not self.is_connected() or not topico_ids:
+            return []
+        excluir = set(excluir)
+        base = self.db.collection('banco_questoes')\
+            .where('topico_id', 'in', list(topico_ids)[:self.MAXIMO_VALORES_IN])
+        limite = quantidade + len(excluir)
+        questoes = {}
+        for query in (base.where('dificuldade_irt', '>=', alvo).order_by('dificuldade_irt'),
+                      base.where('dificuldade_irt', '<', alvo).order_by('dificuldade_irt', direction=self.DESCENDENTE)):
+            for doc in query.limit(limite).stream():
+                if doc.id not in excluir:
+                    questoes[doc.id] = doc.to_dict()
+        if not questoes:
+            return self.sortear_questoes_banco(topico_ids, quantidade, excluir)
+        proximas = sorted(questoes.values(), key=lambda q: abs(q['dificuldade_irt'] - alvo))
+        return proximas[:quantidade]
+
+    def sortear_questoes_banco(self, topico_ids: List[str], quantidade: int = 5,
+                               excluir=()) -> List[Dict[str, Any]]:
+        """Até `quantidade` questões dos tópicos, em ordem aleatória, fora de `excluir`
+
+        Usa o campo `aleatorio` gravado na importação: lê a partir de um ponto
+        sorteado e, se não completar, recomeça do início (índice composto
+        topico_id + aleatorio). Custa no máximo 2 consultas de quantidade + len(excluir).
+        """
+        if not self.is_connected() or not topico_ids:
+            return []
+        excluir = set(excluir)
+        base = self.db.collection('banco_questoes')\
+            .where('topico_id', 'in', list(topico_ids)[:self.MAXIMO_VALORES_IN])
+        limite = quantidade + len(excluir)
+        ponto = random.random()
+        questoes: Dict[str, Dict[str, Any]] = {}
+        for query in (base.where('aleatorio', '>=', ponto), base.where('aleatorio', '<', ponto)):
+            for doc in query.order_by('aleatorio').limit(limite).stream():
+                if doc.id not in excluir and doc.id not in questoes:
+                    questoes[doc.id] = doc.to_dict()
+            if len(questoes) >= quantidade:
+                break
+        return list(questoes.values())[:quantidade]
+
+    # ------------------------------------------------------------------
+    # jogos_sessoes
+    # ------------------------------------------------------------------
+
+    def obter_sessao_jogo(self, sessao_id: str) -> Optional[Dict[str, Any]]:
+        if not self.is_connected() or not sessao_id:
+            return None
+        doc = self.db.collection('jogos_sessoes').document(sessao_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def salvar_sessao_jogo(self, sessao: Dict[str, Any]):
+        if self.is_connected():
+            self.db.collection('jogos_sessoes').document(sessao['id']).set(sessao)
+
+    def atualizar_sessao_jogo(self, sessao_id: str, dados: Dict[str, Any]):
+        if self.is_connected():
+            self.db.collection('jogos_sessoes').document(sessao_id).update(dados)
+
+    def listar_sessoes_jogo(self, usuario_id: str) -> List[Dict[str, Any]]:
+        if not self.is_connected():
+            return []
+        docs = self.db.collection('jogos_sessoes').where('usuario_id', '==', usuario_id).get()
+        return [doc.to_dict() for doc in docs]
+
+    # ------------------------------------------------------------------
+    # historico_planos
+    # ------------------------------------------------------------------
+
+    def registrar_historico_plano(self, historico: Dict[str, Any]):
+        if self.is_connected():
+            self.db.collection('historico_planos').add(historico)
+
+    def listar_historico_planos(self, user_id: str, limite: int,
+                                cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Página do histórico de planos (mais recentes primeiro) e o cursor da próxima"""
+        if not self.is_connected():
+            return [], None
+        query = self.db.collection('historico_planos').where('user_id', '==', user_id)
+        docs, proximo = self.paginar(query, 'data_registro', limite, cursor)
+        return [doc.to_dict() for doc in docs], proximo
+
+    def usuario_ja_usou_plano(self, user_id: str, tipo_plano: str) -> bool:
+        if not self.is_connected():
+            return False
+        docs = self.db.collection('historico_planos')\
+            .where('user_id', '==', user_id)\
+            .where('tipo_plano', '==', tipo_plano)\
+            .limit(1)\
+            .get()
+        return len(docs) > 0
+
+    # ------------------------------------------------------------------
+    # Contabilização
+    # ------------------------------------------------------------------
+
+    def registrar_operacao(self, tipo: str, colecao: Optional[str], quantidade: int, duracao: float):
+        """Contabiliza uma operação na requisição atual (ou em <background>)"""
+        metrics.registrar_firestore(tipo, colecao, quantidade, duracao)
+        tracer.registrar_span(f"firestore.{tipo}", duracao, collection=colecao, documents=quantidade)
+        tempo_ms = duracao * 1000
+        if has_request_context():
+            contadores = g.setdefault('_firestore_ops', {c: 0 for c in EstatisticasFirestore.CAMPOS})
+            contadores[tipo] += quantidade
+            contadores['chamadas'] += 1
+            contadores['tempo_ms'] += tempo_ms
+        else:
+            self.estatisticas.acumular(
+                ENDPOINT_BACKGROUND,
+                {tipo: quantidade, 'chamadas': 1, 'tempo_ms': tempo_ms},
+                requisicao=False
+            )
+
+    def estatisticas_requisicao(self) -> Dict[str, float]:
+        """Contadores da requisição atual"""
+        if not has_request_context():
+            return {c: 0 for c in EstatisticasFirestore.CAMPOS}
+        return dict(g.get('_firestore_ops') or {c: 0 for c in EstatisticasFirestore.CAMPOS})
+
+    def init_app(self, app):
+        """Registra a contabilização por requisição na aplicação Flask"""
+
+        @app.after_request
+        def _contabilizar_firestore(response):
+            contadores = self.estatisticas_requisicao()
+            self.estatisticas.acumular(request.endpoint or 'desconhecido', contadores)
+            response.headers['X-Firestore-Reads'] = str(int(contadores['leituras']))
+            response.headers['X-Firestore-Writes'] = str(int(contadores['escritas'] + contadores['exclusoes']))
+            response.headers['X-Firestore-Time-Ms'] = f"{contadores['tempo_ms']:.1f}"
+            return response
+
+
+# Instância global do repositório
+firestore_repository = FirestoreRepository()
@@ -0,0 +1,405 @@
+"""
+Importação em massa de questões de provas anteriores (FGV, CNU...) para banco_questoes
+
+Lê o arquivo em fluxo (JSON em array ou NDJSON, CSV, XLSX exportado de
+planilha), normaliza cada linha para o formato de questao_completa usado em
+/gerar e grava em lotes de até 500 documentos:
+
+- alternativas: lista ["A) texto", ...], lista de {id, texto}, objeto
+  {"A": "texto"} ou colunas a..e / alternativa_a..alternativa_e; sem
+  alternativas e gabarito C/E, vira questão de certo ou errado
+- tema: resolvido para o tópico do catálogo do edital (topico_id), restrito
+  ao cargo/bloco quando informados; o texto original fica em tema_original
+- ID derivado do enunciado e das alternativas (sem acento, caixa e ordem):
+  a mesma questão em dois arquivos, ou importada duas vezes, é gravada uma vez.
+  Cada lote consulta os IDs já existentes (get_all) antes de gravar.
+
+Linhas inválidas (sem enunciado, com menos de duas alternativas ou gabarito
+fora das alternativas) são contadas e registradas no log com o número da linha.
+
+Uso:
+    python -m src.services.importador_questoes provas_fgv.csv --banca FGV --ano 2024
+    python -m src.services.importador_questoes cnu.xlsx --cargo Enfermeiro --bloco "Bloco 1 - Seguridade Social"
+    python -m src.services.importador_questoes questoes.ndjson --simular
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .catalogo_edital import catalogo_edital
+from .firestore_repository import firestore_repository
+from .proficiencia import DIFICULDADE_ROTULO
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - dependência opcional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+COLECAO = 'banco_questoes'
+FORMATOS = ('json', 'csv', 'xlsx')
+
+# Um lote do Firestore aceita até 500 escritas
+TAMANHO_LOTE = 500
+
+# Linhas inválidas detalhadas no log (as demais só entram na contagem)
+MAXIMO_ERROS_LOGADOS = 50
+
+LETRAS = 'ABCDEFGHIJ'
+
+# Nome normalizado da coluna → campo
+_ALIASES = {
+    'questao': ('questao', 'enunciado', 'pergunta', 'texto', 'comando'),
+    'gabarito': ('gabarito', 'resposta', 'resposta_correta', 'correta', 'alternativa_correta'),
+    'tema': ('tema', 'assunto', 'materia', 'disciplina', 'topico', 'conteudo'),
+    'explicacao': ('explicacao', 'comentario', 'resolucao', 'justificativa'),
+    'dificuldade': ('dificuldade', 'nivel'),
+    'banca': ('banca', 'organizadora'),
+    'ano': ('ano',),
+    'cargo': ('cargo',),
+    'bloco': ('bloco',),
+    'alternativas': ('alternativas', 'opcoes'),
+}
+_CERTO_ERRADO = {'C': 'C', 'CERTO': 'C', 'E': 'E', 'ERRADO': 'E'}
+
+
+class LinhaInvalida(ValueError):
+    """Linha do arquivo que não pode virar questão"""
+
+
+def _chave(texto: str) -> str:
+    sem_acento = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', sem_acento.casefold()).strip('_')
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return re.sub(r'\s+', ' ', str(valor)).strip()
+
+
+# ----------------------------------------------------------------------
+# Leitura em fluxo
+# ----------------------------------------------------------------------
+
+def _ler_json(arquivo) -> Iterator[Dict[str, Any]]:
+    """Array JSON (decodificado objeto a objeto) ou NDJSON"""
+    decodificador = json.JSONDecoder()
+    buffer = arquivo.read(65536).lstrip()
+    if not buffer.startswith('['):
+        for linha in _concatenar(io.StringIO(buffer), arquivo):
+            if linha.strip():
+                yield json.loads(linha)
+        return
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            objeto, fim = decodificador.raw_decode(buffer)
+        except json.JSONDecodeError:
+            mais = arquivo.read(65536)
+            if not mais:
+                raise
+            buffer += mais
+            continue
+        yield objeto
+        buffer = buffer[fim:]
+        if len(buffer) < 4096:
+            buffer += arquivo.read(65536)
+
+
+def _concatenar(inicio: io.StringIO, resto) -> Iterator[str]:
+    """Linhas do trecho já lido seguidas das linhas do restante do arquivo"""
+    pendente = ''
+    for linha in inicio:
+        if linha.endswith('\n'):
+            yield pendente + linha
+            pendente = ''
+        else:
+            pendente += linha
+    for linha in resto:
+        yield pendente + linha
+        pendente = ''
+    if pendente:
+        yield pendente
+
+
+def _ler_csv(arquivo) -> Iterator[Dict[str, Any]]:
+    amostra = arquivo.read(8192)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    yield from csv.DictReader(arquivo, dialect=dialeto)
+
+
+def _ler_xlsx(caminho: str) -> Iterator[Dict[str, Any]]:
+    if openpyxl is None:
+        raise RuntimeError("Importar XLSX requer o pacote openpyxl (pip install openpyxl)")
+    pasta = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = pasta.worksheets[0].iter_rows(values_only=True)
+        cabecalho = [_texto(c) for c in next(linhas, ())]
+        for valores in linhas:
+            if any(v not in (None, '') for v in valores):
+                yield dict(zip(cabecalho, valores))
+    finally:
+        pasta.close()
+
+
+def detectar_formato(caminho: str) -> str:
+    extensao = os.path.splitext(caminho)[1].lower().lstrip('.')
+    if extensao in ('json', 'ndjson', 'jsonl'):
+        return 'json'
+    if extensao in ('csv', 'tsv', 'txt'):
+        return 'csv'
+    if extensao in ('xlsx', 'xlsm'):
+        return 'xlsx'
+    raise ValueError(f"Formato não reconhecido para {caminho}: use {', '.join(FORMATOS)}")
+
+
+def ler_registros(caminho: str, formato: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(número da linha/item, registro bruto) do arquivo, sem carregá-lo inteiro"""
+    formato = formato or detectar_formato(caminho)
+    if formato == 'xlsx':
+        # Linha 1 é o cabeçalho
+        yield from enumerate(_ler_xlsx(caminho), start=2)
+        return
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        if formato == 'csv':
+            yield from enumerate(_ler_csv(arquivo), start=2)
+        else:
+            yield from enumerate(_ler_json(arquivo), start=1)
+
+
+# ----------------------------------------------------------------------
+# Normalização
+# ----------------------------------------------------------------------
+
+def _campo(registro: Dict[str, Any], nome: str):
+    for alias in _ALIASES[nome]:
+        valor = registro.get(alias)
+        if valor not in (None, ''):
+            return valor
+    return None
+
+
+def _alternativas(registro: Dict[str, Any]) -> List[Dict[str, str]]:
+    bruto = _campo(registro, 'alternativas')
+    if isinstance(bruto, str) and bruto.strip().startswith(('[', '{')):
+        bruto = json.loads(bruto)
+    alternativas = []
+    if isinstance(bruto, dict):
+        alternativas = [{'id': _texto(k).upper(), 'texto': _texto(v)} for k, v in bruto.items()]
+    elif isinstance(bruto, list):
+        if len(bruto) > len(LETRAS):
+            raise LinhaInvalida(f'mais de {len(LETRAS)} alternativas')
+        for indice, item in enumerate(bruto):
+            if isinstance(item, dict):
+                alternativas.append({'id': _texto(item.get('id') or LETRAS[indice]).upper(),
+                                     'texto': _texto(item.get('texto'))})
+            else:
+                # "A) texto", "A - texto", "(A) texto" ou só o texto
+                texto = _texto(item)
+                casamento = re.match(r'^\(?([A-Ja-j])\s*[\)\.\-:]\s*(.*)$', texto)
+                if casamento:
+                    alternativas.append({'id': casamento.group(1).upper(), 'texto': casamento.group(2)})
+                else:
+                    alternativas.append({'id': LETRAS[indice], 'texto': texto})
+    else:
+        for letra in LETRAS:
+            minuscula = letra.lower()
+            valor = None
+            for coluna in (minuscula, f'alternativa_{minuscula}', f'opcao_{minuscula}', f'alt_{minuscula}'):
+                if registro.get(coluna) not in (None, ''):
+                    valor = registro[coluna]
+                    break
+            if valor is None:
+                break
+            alternativas.append({'id': letra, 'texto': _texto(valor)})
+    return [a for a in alternativas if a['texto']]
+
+
+def id_questao(enunciado: str, alternativas: List[Dict[str, str]]) -> str:
+    """ID estável: mesmo enunciado e mesmas alternativas (em qualquer ordem) → mesmo ID"""
+    partes = [_chave(enunciado)] + sorted(_chave(a['texto']) for a in alternativas)
+    return 'b_' + hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()[:20]
+
+
+def normalizar(bruto: Dict[str, Any], padrao: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Registro bruto → documento de banco_questoes (formato de questao_completa); levanta LinhaInvalida"""
+    registro = {_chave(k): v for k, v in bruto.items() if k is not None}
+    padrao = padrao or {}
+
+    enunciado = _texto(_campo(registro, 'questao'))
+    if not enunciado:
+        raise LinhaInvalida('enunciado vazio')
+
+    try:
+        alternativas = _alternativas(registro)
+    except ValueError as e:
+        raise LinhaInvalida(f'alternativas inválidas: {e}')
+    gabarito = _texto(_campo(registro, 'gabarito')).upper()
+    tipo = 'múltipla escolha'
+    if not alternativas and gabarito in _CERTO_ERRADO:
+        alternativas = [{'id': 'C', 'texto': 'Certo'}, {'id': 'E', 'texto': 'Errado'}]
+        gabarito = _CERTO_ERRADO[gabarito]
+        tipo = 'certo ou errado'
+    gabarito = gabarito[:1] if tipo == 'múltipla escolha' else gabarito
+    if len(alternativas) < 2:
+        raise LinhaInvalida('menos de duas alternativas')
+    if gabarito not in {a['id'] for a in alternativas}:
+        raise LinhaInvalida(f"gabarito '{gabarito}' fora das alternativas")
+
+    cargo = _texto(_campo(registro, 'cargo')) or padrao.get('cargo')
+    bloco = _texto(_campo(registro, 'bloco')) or padrao.get('bloco')
+    tema_original = _texto(_campo(registro, 'tema'))
+    topico = catalogo_edital.resolver_topico(tema_original, cargo, bloco) if tema_original else None
+    ano = _texto(_campo(registro, 'ano')) or padrao.get('ano')
+    dificuldade = _chave(_texto(_campo(registro, 'dificuldade'))) or 'medio'
+
+    return {
+        'id': id_questao(enunciado, alternativas),
+        'questao': enunciado,
+        'tipo': tipo,
+        'alternativas': alternativas,
+        'gabarito': gabarito,
+        'tema': topico.nome if topico else (tema_original or 'Tema geral'),
+        'tema_original': tema_original or None,
+        'topico_id': topico.id if topico else None,
+        'dificuldade': dificuldade,
+        # Rating inicial (logits) pelo rótulo; ajustado pelas respostas (ver proficiencia)
+        'dificuldade_irt': DIFICULDADE_ROTULO.get(dificuldade, 0.0),
+        'respostas_irt': 0,
+        'explicacao': _texto(_campo(registro, 'explicacao')),
+        'banca': _texto(_campo(registro, 'banca')) or padrao.get('banca'),
+        'ano': int(ano) if str(ano or '').isdigit() else None,
+        'cargo': cargo,
+        'bloco': bloco,
+        'origem': 'importacao',
+        # Sorteio sem ler a coleção inteira: where('aleatorio', '>=', r).limit(n)
+        'aleatorio': random.random(),
+    }
+
+
+# ----------------------------------------------------------------------
+# Gravação
+# ----------------------------------------------------------------------
+
+def _gravar_lote(lote: List[Dict[str, Any]], resumo: Dict[str, Any], simular: bool, arquivo: str):
+    db = firestore_repository.db
+    referencias = [db.collection(COLECAO).document(q['id']) for q in lote]
+    existentes = {doc.id for doc in db.get_all(referencias) if doc.exists}
+    novos = [q for q in lote if q['id'] not in existentes]
+    resumo['duplicadas'] += len(lote) - len(novos)
+    if novos and not simular:
+        escrita = db.batch()
+        agora = datetime.now(timezone.utc)
+        for questao in novos:
+            escrita.set(db.collection(COLECAO).document(questao['id']),
+                        dict(questao, importado_em=agora, arquivo=arquivo))
+        escrita.commit()
+    resumo['gravadas'] += len(novos)
+
+
+def importar(caminho: str, formato: Optional[str] = None, padrao: Optional[Dict[str, Any]] = None,
+             tamanho_lote: int = TAMANHO_LOTE, simular: bool = False,
+             progresso: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Importa o arquivo para banco_questoes e retorna o resumo
+
+    `padrao` preenche banca/ano/cargo/bloco ausentes nas linhas; `progresso`
+    é chamado com o resumo parcial após cada lote gravado.
+    """
+    if firestore_repository.db is None:
+        raise RuntimeError("Banco de dados não disponível")
+    tamanho_lote = max(1, min(tamanho_lote, TAMANHO_LOTE))
+    arquivo = os.path.basename(caminho)
+    resumo = {'arquivo': arquivo, 'lidas': 0, 'gravadas': 0, 'duplicadas': 0, 'invalidas': 0,
+              'sem_topico': 0, 'segundos': 0.0}
+    inicio = time.perf_counter()
+    vistos = set()
+    lote: List[Dict[str, Any]] = []
+
+    def _descarregar():
+        _gravar_lote(lote, resumo, simular, arquivo)
+        lote.clear()
+        resumo['segundos'] = round(time.perf_counter() - inicio, 2)
+        logger.info("Lote de questões importado", extra={'campos': dict(resumo)})
+        if progresso is not None:
+            progresso(dict(resumo))
+
+    for numero, bruto in ler_registros(caminho, formato):
+        resumo['lidas'] += 1
+        try:
+            if not isinstance(bruto, dict):
+                raise LinhaInvalida('registro não é um objeto')
+            questao = normalizar(bruto, padrao)
+        except LinhaInvalida as e:
+            resumo['invalidas'] += 1
+            if resumo['invalidas'] <= MAXIMO_ERROS_LOGADOS:
+                logger.warning(f"{arquivo}:{numero} ignorada: {e}")
+            continue
+        if questao['id'] in vistos:
+            resumo['duplicadas'] += 1
+            continue
+        vistos.add(questao['id'])
+        if questao['topico_id'] is None:
+            resumo['sem_topico'] += 1
+        lote.append(questao)
+        if len(lote) >= tamanho_lote:
+            _descarregar()
+    if lote:
+        _descarregar()
+    resumo['segundos'] = round(time.perf_counter() - inicio, 2)
+    return resumo
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Importa questões de provas anteriores para banco_questoes')
+    parser.add_argument('arquivos', nargs='+', help='arquivos .json/.ndjson, .csv ou .xlsx')
+    parser.add_argument('--formato', choices=FORMATOS, help='força o formato (padrão: pela extensão)')
+    parser.add_argument('--banca', help='banca das questões sem a coluna banca')
+    parser.add_argument('--ano', help='ano das questões sem a coluna ano')
+    parser.add_argument('--cargo', help='cargo usado para resolver os temas (quando não há coluna cargo)')
+    parser.add_argument('--bloco', help='bloco usado para resolver os temas (quando não há coluna bloco)')
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE, help='questões por lote (máx. 500)')
+    parser.add_argument('--simular', action='store_true', help='lê, normaliza e deduplica sem gravar')
+    args = parser.parse_args(argv)
+
+    from ..config.logging_config import configurar_logging
+    configurar_logging()
+
+    padrao = {'banca': args.banca, 'ano': args.ano, 'cargo': args.cargo, 'bloco': args.bloco}
+
+    def _progresso(resumo):
+        taxa = resumo['lidas'] / resumo['segundos'] if resumo['segundos'] else 0
+        print(f"\r{resumo['arquivo']}: {resumo['lidas']} lidas, {resumo['gravadas']} novas, "
+              f"{resumo['duplicadas']} duplicadas, {resumo['invalidas']} inválidas ({taxa:.0f}/s)",
+              end='', file=sys.stderr, flush=True)
+
+    for caminho in args.arquivos:
+        resumo = importar(caminho, args.formato, padrao, args.tamanho_lote, args.simular, _progresso)
+        print(file=sys.stderr)
+        print(json.dumps(resumo, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
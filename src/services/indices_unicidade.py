@@ -0,0 +1,132 @@
+"""
+Índices de unicidade do cadastro: emails/{email} e cpfs/{cpf} → userId
+
+O /signup cria os dois documentos na mesma transação do usuário; este
+módulo guarda a normalização das chaves e o backfill dos usuários
+cadastrados antes dos índices.
+
+O backfill lê users em páginas, confere os índices que já existem e cria os
+que faltam com create() — nunca sobrescreve. Email ou CPF que já pertence a
+outro usuário vira conflito no resumo, para ser resolvido à mão; rodar de
+novo só cria o que ainda falta.
+
+Uso:
+    python -m src.services.indices_unicidade --simular
+    python -m src.services.indices_unicidade
+"""
+import argparse
+import logging
+import re
+import sys
+
+from google.api_core.exceptions import AlreadyExists
+
+from .firestore_repository import firestore_repository
+
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de um lote de escrita do Firestore
+TAMANHO_LOTE = 500
+
+
+def normalizar_email(email):
+    """Normaliza o email usado como chave do indice de unicidade"""
+    return email.strip().lower()
+
+
+def normalizar_cpf(cpf):
+    """Mantem apenas os digitos do CPF usado como chave do indice de unicidade"""
+    return re.sub(r'\D', '', cpf)
+
+
+def _indices_do_usuario(db, user_data):
+    """Documentos emails/{email} e cpfs/{cpf} que devem apontar para o usuario"""
+    indices = []
+    if user_data.get('email'):
+        indices.append(db.collection('emails').document(normalizar_email(user_data['email'])))
+    if user_data.get('cpf') and normalizar_cpf(user_data['cpf']):
+        indices.append(db.collection('cpfs').document(normalizar_cpf(user_data['cpf'])))
+    return indices
+
+
+def backfill_indices_unicidade(simular=False):
+    """Cria emails/{email} e cpfs/{cpf} para usuarios cadastrados antes dos indices
+
+    Nunca sobrescreve um indice: os que ja existem sao lidos antes e os que
+    faltam sao gravados com create(). Email ou CPF que ja pertence a outro
+    usuario (no indice ou em outro cadastro antigo) vira conflito no resumo,
+    para ser resolvido a mao.
+    """
+    db = firestore_repository.db
+    resumo = {'usuarios': 0, 'criados': 0, 'existentes': 0, 'conflitos': []}
+    donos = {}
+
+    def conflito(ref, user_id, dono):
+        resumo['conflitos'].append({'indice': ref.path, 'userId': user_id, 'existente': dono})
+        logger.warning("Indice de unicidade em conflito",
+                       extra={'campos': {'indice': ref.path, 'userId': user_id, 'existente': dono}})
+
+    # Ate dois indices por usuario: cada pagina cabe num lote
+    for usuarios in firestore_repository.iterar_paginas(db.collection('users'), TAMANHO_LOTE // 2):
+        pares = [(ref, doc.id) for doc in usuarios for ref in _indices_do_usuario(db, doc.to_dict() or {})]
+        resumo['usuarios'] += len(usuarios)
+        existentes = {
+            snapshot.reference.path: (snapshot.to_dict() or {}).get('userId')
+            for snapshot in db.get_all([ref for ref, _ in pares]) if snapshot.exists
+        }
+        novos = []
+        for ref, user_id in pares:
+            dono = existentes.get(ref.path, donos.get(ref.path))
+            if dono is None:
+                donos[ref.path] = user_id
+                novos.append((ref, user_id))
+            elif dono == user_id:
+                resumo['existentes'] += 1
+            else:
+                conflito(ref, user_id, dono)
+        if simular or not novos:
+            resumo['criados'] += len(novos)
+            continue
+
+        batch = db.batch()
+        for ref, user_id in novos:
+            batch.create(ref, {'userId': user_id, 'createdAt': firestore_repository.timestamp_servidor()})
+        try:
+            batch.commit()
+            resumo['criados'] += len(novos)
+        except AlreadyExists:
+            # Um cadastro concorrente criou algum dos indices: o lote nao foi aplicado, refaz um a um
+            for ref, user_id in novos:
+                try:
+                    ref.create({'userId': user_id, 'createdAt': firestore_repository.timestamp_servidor()})
+                    resumo['criados'] += 1
+                except AlreadyExists:
+                    dono = (ref.get().to_dict() or {}).get('userId')
+                    if dono == user_id:
+                        resumo['existentes'] += 1
+                    else:
+                        conflito(ref, user_id, dono)
+    logger.info("Backfill dos indices de unicidade", extra={'campos': {
+        'usuarios': resumo['usuarios'], 'criados': resumo['criados'],
+        'existentes': resumo['existentes'], 'conflitos': len(resumo['conflitos']), 'simular': simular}})
+    return resumo
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Cria os indices emails/{email} e cpfs/{cpf} dos usuarios antigos')
+    parser.add_argument('--simular', action='store_true', help='le e confere sem gravar')
+    args = parser.parse_args(argv)
+
+    from ..config.logging_config import configurar_logging
+    configurar_logging()
+
+    resumo = backfill_indices_unicidade(simular=args.simular)
+    print(f"usuarios={resumo['usuarios']} criados={resumo['criados']} "
+          f"existentes={resumo['existentes']} conflitos={len(resumo['conflitos'])}")
+    for item in resumo['conflitos']:
+        print(f"conflito {item['indice']}: userId={item['userId']} existente={item['existente']}")
+    return 1 if resumo['conflitos'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
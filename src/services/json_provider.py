@@ -0,0 +1,86 @@
+"""
+Serialização das respostas: JSON rápido (orjson) e msgpack por negociação
+
+O provider substitui o `json` da stdlib no jsonify e nos dicts retornados pelas
+rotas. Com orjson instalado a codificação é feita em bytes, sem passar por str;
+sem ele, o comportamento é o do provider padrão do Flask.
+
+Clientes que enviam `Accept: application/msgpack` (ou application/x-msgpack)
+recebem o mesmo conteúdo em msgpack, codificado direto do objeto Python.
+
+JSON_PROVIDER: orjson (padrão, se instalado) ou stdlib.
+"""
+import os
+from typing import Any
+
+from flask import Response, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+MIMETYPE_MSGPACK = 'application/msgpack'
+MIMETYPES_MSGPACK = (MIMETYPE_MSGPACK, 'application/x-msgpack')
+
+
+def prefere_msgpack() -> bool:
+    """O cliente pediu msgpack com qualidade maior que a de JSON?"""
+    if msgpack is None or not has_request_context():
+        return False
+    aceitos = request.accept_mimetypes
+    melhor = aceitos.best_match(('application/json',) + MIMETYPES_MSGPACK, default='application/json')
+    return melhor in MIMETYPES_MSGPACK
+
+
+class GabaritaJSONProvider(DefaultJSONProvider):
+    """Provider do Flask com orjson (quando disponível) e resposta msgpack sob demanda"""
+
+    usar_orjson = orjson is not None
+
+    def _opcoes_orjson(self) -> int:
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        return opcoes
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.usar_orjson and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=self._opcoes_orjson()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if self.usar_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indentado = (self.compact is None and self._app.debug) or self.compact is False
+
+        if prefere_msgpack():
+            corpo = msgpack.packb(obj, default=self.default, use_bin_type=True, datetime=False)
+            resposta = self._app.response_class(corpo, mimetype=MIMETYPE_MSGPACK)
+        elif self.usar_orjson and not indentado:
+            corpo = orjson.dumps(obj, default=self.default, option=self._opcoes_orjson())
+            resposta = self._app.response_class(corpo, mimetype=self.mimetype)
+        else:
+            resposta = super().response(obj)
+
+        if msgpack is not None:
+            resposta.vary.add('Accept')
+        return resposta
+
+
+def configurar_json(app):
+    """Instala o provider na aplicação (JSON_PROVIDER=stdlib desliga o orjson)"""
+    provider = GabaritaJSONProvider(app)
+    if os.getenv('JSON_PROVIDER', 'orjson').lower() == 'stdlib':
+        provider.usar_orjson = False
+    app.json = provider
@@ -0,0 +1,172 @@
+"""
+Gravação e reprodução (cassetes) das chamadas aos LLMs
+
+LLM_CASSETTE_MODE:
+- off (padrão): chamadas reais
+- record: chamadas reais, gravando pedido, resposta e latência
+- replay: respostas servidas do cassete, sem rede
+
+Cassetes são arquivos JSON lines comprimidos com gzip em LLM_CASSETTE_DIR,
+um por nome (LLM_CASSETTE_NAME). No replay a latência original é reproduzida
+multiplicada por LLM_CASSETTE_LATENCY_SCALE (0 desliga a espera).
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from .metrics import metrics
+
+MODOS = ('off', 'record', 'replay')
+
+
+class CassetteMissError(Exception):
+    """Pedido sem resposta gravada no cassete (modo replay)"""
+
+
+def impressao_digital(provedor: str, pedido: Dict[str, Any]) -> str:
+    """Hash estável do pedido (provedor, modelo, mensagens e parâmetros)"""
+    canonico = json.dumps({'provedor': provedor, **pedido}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+def _familia(provedor: str, pedido: Dict[str, Any]) -> str:
+    """Pedidos do mesmo tipo (mesmo system prompt e parâmetros), usados quando o texto varia"""
+    mensagens = pedido.get('messages') or []
+    sistema = mensagens[0].get('content', '') if mensagens and mensagens[0].get('role') == 'system' else ''
+    return impressao_digital(provedor, {
+        'model': pedido.get('model'),
+        'system': sistema,
+        'temperature': pedido.get('temperature'),
+        'max_tokens': pedido.get('max_tokens'),
+    })
+
+
+class LLMCassette:
+    """Camada de gravação/reprodução na fronteira dos clientes de LLM"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configurar(
+            modo=os.getenv('LLM_CASSETTE_MODE', 'off'),
+            diretorio=os.getenv('LLM_CASSETTE_DIR', 'cassettes'),
+            nome=os.getenv('LLM_CASSETTE_NAME', 'default'),
+            escala_latencia=float(os.getenv('LLM_CASSETTE_LATENCY_SCALE', '1.0')),
+        )
+
+    def configurar(self, modo: str = 'off', diretorio: str = 'cassettes', nome: str = 'default',
+                   escala_latencia: float = 1.0):
+        """Troca o modo/cassete em tempo de execução (benchmarks, testes)"""
+        modo = (modo or 'off').strip().lower()
+        if modo not in MODOS:
+            raise ValueError(f"LLM_CASSETTE_MODE inválido: {modo} (opções: {', '.join(MODOS)})")
+        with self._lock:
+            self.modo = modo
+            self.caminho = os.path.join(diretorio, f"{nome}.jsonl.gz")
+            self.escala_latencia = max(escala_latencia, 0.0)
+            self._carregado = False
+            self._por_digital: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            self._por_familia: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            self._cursores: Dict[str, int] = defaultdict(int)
+
+    @property
+    def ativo(self) -> bool:
+        return self.modo != 'off'
+
+    def executar(self, provedor: str, pedido: Dict[str, Any],
+                 chamada: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Executa (ou reproduz) uma chamada; a resposta é um dict com 'content' e 'usage'"""
+        if self.modo == 'replay':
+            return self._reproduzir(provedor, pedido)
+        if self.modo == 'record':
+            inicio = time.perf_counter()
+            resposta = chamada()
+            self._gravar(provedor, pedido, resposta, time.perf_counter() - inicio)
+            return resposta
+        return chamada()
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+
+    def _gravar(self, provedor: str, pedido: Dict[str, Any], resposta: Dict[str, Any], latencia: float):
+        entrada = {
+            'digital': impressao_digital(provedor, pedido),
+            'familia': _familia(provedor, pedido),
+            'provedor': provedor,
+            'pedido': pedido,
+            'resposta': resposta,
+            'latencia_s': round(latencia, 4),
+            'gravado_em': datetime.now().isoformat(),
+        }
+        linha = (json.dumps(entrada, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            # Cada entrada vira um membro gzip; arquivos concatenados continuam legíveis
+            with open(self.caminho, 'ab') as arquivo:
+                arquivo.write(gzip.compress(linha))
+            if self._carregado:
+                self._indexar(entrada)
+
+    # ------------------------------------------------------------------
+    # Reprodução
+    # ------------------------------------------------------------------
+
+    def _indexar(self, entrada: Dict[str, Any]):
+        self._por_digital[entrada['digital']].append(entrada)
+        self._por_familia[entrada['familia']].append(entrada)
+
+    def _carregar(self):
+        if self._carregado:
+            return
+        if os.path.exists(self.caminho):
+            with gzip.open(self.caminho, 'rt', encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    if linha.strip():
+                        self._indexar(json.loads(linha))
+        self._carregado = True
+
+    def _proxima(self, chave: str, entradas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Percorre as gravações em ordem, recomeçando no fim (determinístico)"""
+        indice = self._cursores[chave] % len(entradas)
+        self._cursores[chave] += 1
+        return entradas[indice]
+
+    def _reproduzir(self, provedor: str, pedido: Dict[str, Any]) -> Dict[str, Any]:
+        digital = impressao_digital(provedor, pedido)
+        familia = _familia(provedor, pedido)
+        with self._lock:
+            self._carregar()
+            if self._por_digital.get(digital):
+                entrada = self._proxima(digital, self._por_digital[digital])
+                metrics.registrar_cache('llm_cassette', True)
+            elif self._por_familia.get(familia):
+                # Prompts com tópicos sorteados raramente se repetem: usa outra resposta do mesmo tipo
+                entrada = self._proxima(familia, self._por_familia[familia])
+                metrics.registrar_cache('llm_cassette', False)
+            else:
+                metrics.registrar_cache('llm_cassette', False)
+                raise CassetteMissError(f"Sem gravação para {provedor} em {self.caminho}")
+        if self.escala_latencia:
+            time.sleep(entrada['latencia_s'] * self.escala_latencia)
+        return entrada['resposta']
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Resumo do cassete carregado"""
+        with self._lock:
+            self._carregar()
+            return {
+                'modo': self.modo,
+                'arquivo': self.caminho,
+                'gravacoes': sum(len(v) for v in self._por_digital.values()),
+                'pedidos_distintos': len(self._por_digital),
+            }
+
+
+# Instância global do cassete de LLM
+llm_cassette = LLMCassette()
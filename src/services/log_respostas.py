@@ -0,0 +1,81 @@
+"""
+Log de respostas do usuário
+
+Cada resposta vira um documento em usuarios/{usuario_id}/respostas, gravado
+uma única vez e nunca alterado. O documento traz os campos que todas as
+telas usam, então histórico, estatísticas, atividades recentes e a geração
+de questões (para não repetir) leem só daqui:
+
+- questao_id, questao (texto, truncado), tema, materia
+- alternativa_escolhida, gabarito, acertou, tempo_resposta
+- respondida_em: timestamp nativo (UTC), campo de ordenação das consultas
+- origem: 'responder' ou a coleção legada de onde veio (migração)
+
+Por ficar numa subcoleção por usuário, as consultas por período usam o
+índice automático de respondida_em, sem índice composto com usuario_id.
+As coleções antigas (historico_respostas, questoes com respondida=True e
+questoes_respondidas) são copiadas para cá por migracao_respostas.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .firestore_repository import firestore_repository
+
+# Texto da questão guardado no log (suficiente para o prompt de não repetição)
+TAMANHO_MAXIMO_TEXTO = 500
+
+
+def como_timestamp(valor) -> Optional[datetime]:
+    """datetime com fuso (UTC) a partir de datetime ou ISO 8601; None se não der para converter"""
+    if isinstance(valor, str):
+        try:
+            valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(valor, datetime):
+        return None
+    if valor.tzinfo is None:
+        # ISO sem fuso gravado com datetime.now(): horário local do servidor
+        valor = valor.astimezone()
+    return valor.astimezone(timezone.utc)
+
+
+def montar_resposta(questao_id: Optional[str], acertou: bool, respondida_em=None, origem: str = 'responder',
+                    questao: Optional[str] = None, tema: Optional[str] = None, materia: Optional[str] = None,
+                    alternativa_escolhida: Optional[str] = None, gabarito: Optional[str] = None,
+                    tempo_resposta: Optional[float] = None) -> Dict[str, Any]:
+    """Documento do log no formato único lido por todas as consultas"""
+    return {
+        'questao_id': questao_id,
+        'questao': questao[:TAMANHO_MAXIMO_TEXTO] if questao else None,
+        'tema': tema or materia,
+        'materia': materia or tema,
+        'alternativa_escolhida': alternativa_escolhida,
+        'gabarito': gabarito,
+        'acertou': bool(acertou),
+        'tempo_resposta': tempo_resposta or 0,
+        'respondida_em': como_timestamp(respondida_em) or datetime.now(timezone.utc),
+        'origem': origem,
+    }
+
+
+def registrar(usuario_id: str, **campos) -> Dict[str, Any]:
+    """Grava uma resposta no log do usuário (uma escrita) e retorna o documento"""
+    resposta = montar_resposta(**campos)
+    firestore_repository.registrar_resposta(usuario_id, resposta)
+    return resposta
+
+
+def para_historico(resposta: Dict[str, Any]) -> Dict[str, Any]:
+    """Formato do /historico e das estatísticas (data_resposta em ISO 8601)"""
+    respondida_em = resposta.get('respondida_em')
+    return {
+        'id': resposta.get('id'),
+        'questao_id': resposta.get('questao_id'),
+        'questao': resposta.get('questao'),
+        'tema': resposta.get('tema'),
+        'acertou': resposta.get('acertou', False),
+        'alternativa_escolhida': resposta.get('alternativa_escolhida'),
+        'tempo_resposta': resposta.get('tempo_resposta', 0),
+        'data_resposta': respondida_em.isoformat() if isinstance(respondida_em, datetime) else respondida_em,
+    }
@@ -0,0 +1,176 @@
+"""
+Cliente do MercadoPago compartilhado pelo processo
+
+O HttpClient padrão do SDK abre uma requests.Session (e um handshake TLS) a
+cada chamada. Aqui o SDK é criado uma vez por processo/token, com um
+transporte que mantém as conexões abertas (keep-alive) em um pool e repete
+falhas transitórias (429/5xx, erros de conexão) com backoff exponencial.
+POST só é repetido em erro de conexão, para não duplicar preferências.
+
+O status dos pagamentos fica em cache por MP_STATUS_CACHE_TTL segundos: os
+polls do /payments/verify na página de sucesso não vão todos à API. O worker
+do webhook consulta sem cache (a notificação indica que o status mudou).
+
+Para testes e benchmarks, usar_sdk() troca o SDK por um stand-in com a
+mesma interface (preference().create, payment().get).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import current_app, has_app_context
+
+from ..config.inicializacao import ModuloTardio
+from .metrics import metrics
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+mercadopago = ModuloTardio('mercadopago')
+
+STATUS_REPETIVEIS = (429, 500, 502, 503, 504)
+
+
+def _criar_http_client(tamanho_pool: int, tentativas: int, backoff: float):
+    """HttpClient do SDK com uma única Session (pool de conexões e retry com backoff)"""
+    import requests
+    from mercadopago.http.http_client import HttpClient
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    class _HttpClientPersistente(HttpClient):
+        def __init__(self):
+            self.sessao = requests.Session()
+            adaptador = HTTPAdapter(
+                pool_connections=tamanho_pool,
+                pool_maxsize=tamanho_pool,
+                max_retries=Retry(total=tentativas, backoff_factor=backoff,
+                                  status_forcelist=STATUS_REPETIVEIS, raise_on_status=False),
+            )
+            self.sessao.mount('https://', adaptador)
+            self.sessao.mount('http://', adaptador)
+
+        def request(self, method, url, maxretries=None, **kwargs):
+            resposta = self.sessao.request(method, url, **kwargs)
+            resultado = {'status': resposta.status_code, 'response': None}
+            if resposta.status_code != 204 and resposta.content:
+                try:
+                    resultado['response'] = resposta.json()
+                except ValueError as e:
+                    logger.warning(f"Resposta do MercadoPago não é JSON: {e}")
+            return resultado
+
+    return _HttpClientPersistente()
+
+
+class ClienteMercadoPago:
+    """SDK do MercadoPago reutilizável, com cache de status de pagamento"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sdk = None
+        self._token = None
+        self._stand_in = None
+        self._cache: Dict[str, tuple] = {}
+        self.configurar(
+            ttl_status=float(os.getenv('MP_STATUS_CACHE_TTL', '10')),
+            tentativas=int(os.getenv('MP_MAX_RETRIES', '3')),
+            backoff=float(os.getenv('MP_RETRY_BACKOFF', '0.3')),
+            tamanho_pool=int(os.getenv('MP_POOL_SIZE', '10')),
+            timeout=float(os.getenv('MP_TIMEOUT', '10')),
+        )
+
+    def configurar(self, ttl_status: float = 10.0, tentativas: int = 3, backoff: float = 0.3,
+                   tamanho_pool: int = 10, timeout: float = 10.0):
+        """Troca a configuração em tempo de execução (o SDK é recriado no próximo uso)"""
+        with self._lock:
+            self.ttl_status = max(ttl_status, 0.0)
+            self.tentativas = max(tentativas, 0)
+            self.backoff = backoff
+            self.tamanho_pool = max(tamanho_pool, 1)
+            self.timeout = timeout
+            self._sdk = None
+            self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # SDK
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _token_configurado() -> str:
+        token = None
+        if has_app_context():
+            token = current_app.config.get("MERCADOPAGO_ACCESS_TOKEN")
+        token = token or os.getenv("MERCADOPAGO_ACCESS_TOKEN")
+        if not isinstance(token, str) or not token.strip():
+            raise RuntimeError("MERCADOPAGO_ACCESS_TOKEN não configurado. Defina a env var no Render.")
+        return token
+
+    @property
+    def sdk(self):
+        """SDK do processo (recriado se o token mudar); levanta RuntimeError sem token"""
+        if self._stand_in is not None:
+            return self._stand_in
+        token = self._token_configurado()
+        sdk = self._sdk
+        if sdk is None or self._token != token:
+            with self._lock:
+                if self._sdk is None or self._token != token:
+                    opcoes = mercadopago.config.RequestOptions(
+                        connection_timeout=self.timeout, max_retries=self.tentativas)
+                    http_client = _criar_http_client(self.tamanho_pool, self.tentativas, self.backoff)
+                    self._sdk = mercadopago.SDK(token, http_client=http_client, request_options=opcoes)
+                    self._token = token
+                    self._cache.clear()
+                sdk = self._sdk
+        return sdk
+
+    def usar_sdk(self, sdk):
+        """Usa um stand-in no lugar do SDK real (None volta ao SDK real)"""
+        with self._lock:
+            self._stand_in = sdk
+            self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # Operações
+    # ------------------------------------------------------------------
+
+    def criar_preferencia(self, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """preference().create; retorna {"status": ..., "response": ...} como o SDK"""
+        with tracer.span('mercadopago.preference.create'):
+            return self.sdk.preference().create(dados)
+
+    def consultar_pagamento(self, payment_id: str, usar_cache: bool = True) -> Dict[str, Any]:
+        """payment().get com cache de MP_STATUS_CACHE_TTL segundos das respostas 200"""
+        chave = str(payment_id)
+        agora = time.monotonic()
+        if usar_cache and self.ttl_status > 0:
+            item = self._cache.get(chave)
+            acerto = item is not None and item[0] > agora
+            metrics.registrar_cache('mercadopago_pagamento', acerto)
+            if acerto:
+                return item[1]
+
+        with tracer.span('mercadopago.payment.get', payment_id=chave):
+            resposta = self.sdk.payment().get(chave)
+
+        if resposta.get('status') == 200 and self.ttl_status > 0:
+            with self._lock:
+                if len(self._cache) > 4096:
+                    self._cache = {k: v for k, v in self._cache.items() if v[0] > agora}
+                self._cache[chave] = (agora + self.ttl_status, resposta)
+        return resposta
+
+    def invalidar(self, payment_id: Optional[str] = None):
+        """Descarta o status em cache de um pagamento (ou de todos)"""
+        with self._lock:
+            if payment_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(str(payment_id), None)
+
+
+# Instância global do cliente do MercadoPago
+mercadopago_client = ClienteMercadoPago()
@@ -0,0 +1,241 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (GET /metrics)
+
+- Latência (histograma) e contagem por status de cada rota, via middleware
+- Latência, chamadas e tokens dos LLMs por provedor e tipo de prompt
+- Acertos/erros de cache e a taxa de acerto por cache
+- Operações do Firestore por coleção, via wrapper do cliente
+
+Os valores são por processo: com vários workers do gunicorn, cada um expõe
+os próprios contadores (o Prometheus agrega por instância).
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Response, g, request
+
+BUCKETS_HTTP = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BUCKETS_LLM = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+BUCKETS_FIRESTORE = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+TIPOS_PROMPT = ('questao', 'explicacao', 'macetes', 'jogos')
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Tuple[str, ...], valores: Tuple, extra: str = '') -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos: Dict[str, str]) -> Tuple:
+        return tuple(str(rotulos.get(nome, '')) for nome in self.rotulos)
+
+    def exportar(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"] + self._amostras()
+
+    def _amostras(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._valores: Dict[Tuple, float] = {}
+
+    def inc(self, valor: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos) -> float:
+        with self._lock:
+            return self._valores.get(self._chave(rotulos), 0)
+
+    def valores(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._valores)
+
+    def _amostras(self):
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+                for chave, valor in sorted(self.valores().items())]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str] = (), buckets: Tuple[float, ...] = BUCKETS_HTTP):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            # [contagens por bucket..., soma, total]
+            serie = self._series.setdefault(chave, [0] * len(self.buckets) + [0.0, 0])
+            for indice, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[indice] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def _amostras(self):
+        with self._lock:
+            series = {chave: list(serie) for chave, serie in self._series.items()}
+        linhas = []
+        for chave, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_formatar_rotulos(self.rotulos, chave)} {serie[-2]!r}")
+            linhas.append(f"{self.nome}_count{_formatar_rotulos(self.rotulos, chave)} {serie[-1]}")
+        return linhas
+
+
+class GaugeCalculado(_Metrica):
+    """Gauge calculado no momento da coleta"""
+    tipo = 'gauge'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Iterable[str], funcao: Callable[[], Dict[Tuple, float]]):
+        super().__init__(nome, ajuda, rotulos)
+        self._funcao = funcao
+
+    def _amostras(self):
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+                for chave, valor in sorted(self._funcao().items())]
+
+
+class MetricsRegistry:
+    """Registro das métricas da aplicação e middleware do Flask"""
+
+    def __init__(self):
+        self.http_duracao = Histograma(
+            'http_request_duration_seconds', 'Latência das requisições HTTP por rota',
+            ('endpoint', 'method'), BUCKETS_HTTP)
+        self.http_requisicoes = Contador(
+            'http_requests_total', 'Requisições HTTP por rota e status', ('endpoint', 'method', 'status'))
+        self.llm_duracao = Histograma(
+            'llm_request_duration_seconds', 'Latência das chamadas aos LLMs',
+            ('provider', 'prompt_type'), BUCKETS_LLM)
+        self.llm_requisicoes = Contador(
+            'llm_requests_total', 'Chamadas aos LLMs por resultado', ('provider', 'prompt_type', 'outcome'))
+        self.llm_tokens = Contador(
+            'llm_tokens_total', 'Tokens consumidos nos LLMs', ('provider', 'prompt_type', 'kind'))
+        self.cache_requisicoes = Contador(
+            'cache_requests_total', 'Consultas a caches por resultado', ('cache', 'result'))
+        self.cache_taxa_acerto = GaugeCalculado(
+            'cache_hit_ratio', 'Taxa de acerto de cada cache (acertos / consultas)', ('cache',), self._taxas_acerto)
+        self.firestore_operacoes = Contador(
+            'firestore_operations_total', 'Documentos lidos/gravados/excluídos no Firestore',
+            ('collection', 'operation'))
+        self.firestore_duracao = Histograma(
+            'firestore_call_duration_seconds', 'Latência das chamadas ao Firestore',
+            ('operation',), BUCKETS_FIRESTORE)
+        self._metricas = [
+            self.http_duracao, self.http_requisicoes,
+            self.llm_duracao, self.llm_requisicoes, self.llm_tokens,
+            self.cache_requisicoes, self.cache_taxa_acerto,
+            self.firestore_operacoes, self.firestore_duracao,
+        ]
+
+    # ------------------------------------------------------------------
+    # Coleta
+    # ------------------------------------------------------------------
+
+    def observar_llm(self, provedor: str, tipo_prompt: str, duracao: float,
+                     usage: Optional[Dict[str, int]] = None, sucesso: bool = True):
+        """Registra uma chamada a LLM (latência, resultado e tokens)"""
+        self.llm_duracao.observar(duracao, provider=provedor, prompt_type=tipo_prompt)
+        self.llm_requisicoes.inc(provider=provedor, prompt_type=tipo_prompt, outcome='ok' if sucesso else 'error')
+        for tipo in ('prompt_tokens', 'completion_tokens'):
+            quantidade = (usage or {}).get(tipo) or 0
+            if quantidade:
+                self.llm_tokens.inc(quantidade, provider=provedor, prompt_type=tipo_prompt, kind=tipo.split('_')[0])
+
+    def medir_llm(self, provedor: str, tipo_prompt: str, chamada: Callable[[], Dict]) -> Dict:
+        """Executa a chamada ao LLM medindo latência e tokens da resposta ({'content', 'usage'})"""
+        inicio = time.perf_counter()
+        try:
+            resposta = chamada()
+        except Exception:
+            self.observar_llm(provedor, tipo_prompt, time.perf_counter() - inicio, sucesso=False)
+            raise
+        self.observar_llm(provedor, tipo_prompt, time.perf_counter() - inicio, resposta.get('usage'))
+        return resposta
+
+    def registrar_cache(self, cache: str, acerto: bool):
+        self.cache_requisicoes.inc(cache=cache, result='hit' if acerto else 'miss')
+
+    def _taxas_acerto(self) -> Dict[Tuple, float]:
+        totais: Dict[str, List[float]] = {}
+        for (cache, resultado), valor in self.cache_requisicoes.valores().items():
+            acertos_total = totais.setdefault(cache, [0, 0])
+            acertos_total[1] += valor
+            if resultado == 'hit':
+                acertos_total[0] += valor
+        return {(cache,): acertos / total for cache, (acertos, total) in totais.items() if total}
+
+    def registrar_firestore(self, tipo: str, colecao: Optional[str], quantidade: int, duracao: float):
+        self.firestore_operacoes.inc(quantidade, collection=colecao or 'desconhecida', operation=tipo)
+        self.firestore_duracao.observar(duracao, operation=tipo)
+
+    # ------------------------------------------------------------------
+    # Exposição
+    # ------------------------------------------------------------------
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
+
+    def init_app(self, app):
+        """Middleware de latência/status por rota e endpoint GET /metrics"""
+
+        @app.before_request
+        def _iniciar_medicao():
+            g._metrics_inicio = time.perf_counter()
+
+        @app.after_request
+        def _registrar_requisicao(response):
+            inicio = g.pop('_metrics_inicio', None)
+            if inicio is not None:
+                endpoint = request.endpoint or 'desconhecido'
+                self.http_duracao.observar(time.perf_counter() - inicio, endpoint=endpoint, method=request.method)
+                self.http_requisicoes.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+            return response
+
+        def _metrics():
+            return Response(self.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+        app.add_url_rule('/metrics', 'metrics', _metrics, methods=['GET'])
+
+
+# Instância global das métricas
+metrics = MetricsRegistry()
@@ -0,0 +1,133 @@
+"""
+Migração das coleções legadas de respostas para o log usuarios/{id}/respostas
+
+Lê cada coleção em páginas ordenadas pelo ID do documento (start_after, sem
+carregar a coleção inteira na memória) e grava as entradas convertidas em
+lotes de até TAMANHO_LOTE escritas, um commit por página.
+
+O ID da entrada migrada é derivado do documento de origem
+({colecao}-{doc_id}), então rodar de novo (ou retomar com --apos depois de
+uma falha) regrava as mesmas entradas em vez de duplicá-las. Documentos sem
+usuario_id ou sem data de resposta são ignorados e contados no resumo.
+
+Uso:
+    python -m src.services.migracao_respostas --simular
+    python -m src.services.migracao_respostas --colecao questoes --tamanho-lote 200
+    python -m src.services.migracao_respostas --colecao historico_respostas --apos <ultimo_id>
+"""
+import argparse
+import logging
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from . import log_respostas
+from .firestore_repository import firestore_repository
+
+logger = logging.getLogger(__name__)
+
+COLECOES_LEGADAS = ('questoes', 'questoes_respondidas', 'historico_respostas')
+
+# Filtros de cada coleção (em questoes só as já respondidas são respostas)
+FILTROS = {
+    'questoes': (('respondida', '==', True),),
+}
+
+# Um lote do Firestore aceita até 500 escritas
+TAMANHO_LOTE = 400
+
+_CAMPOS_DATA = ('respondida_em', 'data_resposta', 'timestamp', 'data')
+
+
+def converter(colecao: str, doc_id: str, dados: Dict[str, Any],
+              criado_em=None) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """(usuario_id, id da entrada, documento do log) para um documento legado; None se não der"""
+    usuario_id = dados.get('usuario_id') or dados.get('user_id')
+    if not usuario_id:
+        return None
+    respondida_em = None
+    for campo in _CAMPOS_DATA:
+        respondida_em = log_respostas.como_timestamp(dados.get(campo))
+        if respondida_em is not None:
+            break
+    respondida_em = respondida_em or log_respostas.como_timestamp(criado_em)
+    if respondida_em is None:
+        return None
+
+    questao = dados.get('questao')
+    resposta = log_respostas.montar_resposta(
+        questao_id=dados.get('questao_id') or (doc_id if colecao == 'questoes' else None),
+        acertou=dados.get('acertou', dados.get('correta', False)),
+        respondida_em=respondida_em,
+        origem=colecao,
+        questao=questao if isinstance(questao, str) else None,
+        tema=dados.get('tema'),
+        materia=dados.get('materia'),
+        alternativa_escolhida=dados.get('alternativa_escolhida') or dados.get('resposta'),
+        gabarito=dados.get('gabarito'),
+        tempo_resposta=dados.get('tempo_resposta'),
+    )
+    return usuario_id, f"{colecao}-{doc_id}", resposta
+
+
+def migrar_colecao(colecao: str, tamanho_lote: int = TAMANHO_LOTE, apos: Optional[str] = None,
+                   simular: bool = False) -> Dict[str, Any]:
+    """Copia uma coleção legada para o log, página a página; retorna o resumo"""
+    db = firestore_repository.db
+    if db is None:
+        raise RuntimeError("Banco de dados não disponível")
+    tamanho_lote = max(1, min(tamanho_lote, 500))
+
+    query = db.collection(colecao)
+    for campo, operador, valor in FILTROS.get(colecao, ()):
+        query = query.where(campo, operador, valor)
+
+    resumo = {'colecao': colecao, 'lidos': 0, 'gravados': 0, 'ignorados': 0, 'ultimo_id': apos}
+    for docs in firestore_repository.iterar_paginas(query, tamanho_lote, apos_id=apos):
+        lote = db.batch()
+        for doc in docs:
+            convertido = converter(colecao, doc.id, doc.to_dict() or {}, getattr(doc, 'create_time', None))
+            if convertido is None:
+                resumo['ignorados'] += 1
+                continue
+            usuario_id, resposta_id, resposta = convertido
+            lote.set(firestore_repository.respostas_ref(usuario_id).document(resposta_id), resposta)
+        gravados = len(lote)
+        if gravados and not simular:
+            lote.commit()
+
+        resumo['lidos'] += len(docs)
+        resumo['gravados'] += gravados
+        resumo['ultimo_id'] = docs[-1].id
+        logger.info("Página migrada", extra={'campos': dict(resumo)})
+    return resumo
+
+
+def migrar(colecoes=COLECOES_LEGADAS, tamanho_lote: int = TAMANHO_LOTE, simular: bool = False):
+    """Migra todas as coleções legadas, uma de cada vez"""
+    return [migrar_colecao(colecao, tamanho_lote, simular=simular) for colecao in colecoes]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Migra as respostas legadas para usuarios/{id}/respostas')
+    parser.add_argument('--colecao', action='append', choices=COLECOES_LEGADAS,
+                        help='coleção a migrar (repetível; padrão: todas)')
+    parser.add_argument('--tamanho-lote', type=int, default=TAMANHO_LOTE, help='documentos por página/lote')
+    parser.add_argument('--apos', help='retoma depois deste ID de documento (requer uma única --colecao)')
+    parser.add_argument('--simular', action='store_true', help='lê e converte sem gravar')
+    args = parser.parse_args(argv)
+    colecoes = args.colecao or list(COLECOES_LEGADAS)
+    if args.apos and len(colecoes) != 1:
+        parser.error('--apos exige exatamente uma --colecao')
+
+    from ..config.logging_config import configurar_logging
+    configurar_logging()
+
+    for colecao in colecoes:
+        resumo = migrar_colecao(colecao, args.tamanho_lote, apos=args.apos, simular=args.simular)
+        print(f"{resumo['colecao']:22} lidos={resumo['lidos']} gravados={resumo['gravados']} "
+              f"ignorados={resumo['ignorados']} ultimo_id={resumo['ultimo_id']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Cursores opacos para paginação com start_after
+
+Paginar com offset faz o Firestore ler (e cobrar) todos os documentos
+pulados: a página 50 de 20 itens custa 1.000 leituras. O cursor guarda o
+valor do campo de ordenação e o ID do último documento da página; a próxima
+consulta começa logo depois dele (start_after), então cada página custa o
+seu tamanho, em qualquer profundidade. O ID desempata documentos com o mesmo
+valor, deixando a ordem estável entre páginas.
+
+O token é JSON em base64url e carrega o nome do campo, para que um cursor de
+um endpoint não seja aceito em outro.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+# Maior página aceita nos endpoints paginados
+TAMANHO_MAXIMO_PAGINA = 100
+
+
+class CursorInvalido(ValueError):
+    """Token de paginação malformado ou emitido para outra listagem"""
+
+
+def _codificar_valor(valor):
+    if isinstance(valor, datetime):
+        return {'$dt': valor.isoformat()}
+    return valor
+
+
+def _decodificar_valor(valor):
+    if isinstance(valor, dict) and '$dt' in valor:
+        return datetime.fromisoformat(valor['$dt'])
+    return valor
+
+
+def codificar_cursor(campo: str, valor: Any, doc_id: str) -> str:
+    """Token opaco que aponta para logo depois do documento (valor, doc_id)"""
+    bruto = json.dumps([campo, _codificar_valor(valor), doc_id], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(token: str, campo: str) -> Tuple[Any, str]:
+    """Valor do campo de ordenação e ID do documento; levanta CursorInvalido"""
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        campo_token, valor, doc_id = json.loads(bruto.decode('utf-8'))
+        valor = _decodificar_valor(valor)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise CursorInvalido(f"Cursor de paginação inválido: {e}")
+    if campo_token != campo or not isinstance(doc_id, str):
+        raise CursorInvalido("Cursor de paginação inválido para esta listagem")
+    return valor, doc_id
+
+
+def tamanho_pagina(valor: Optional[str], padrao: int) -> int:
+    """Tamanho de página pedido na query string, limitado a TAMANHO_MAXIMO_PAGINA"""
+    if valor in (None, ''):
+        return padrao
+    return max(1, min(int(valor), TAMANHO_MAXIMO_PAGINA))
@@ -1,15 +1,21 @@
 """
 Serviço de integração com Perplexity AI para feedback educativo
 """
+import logging
 import os
 import json
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from .llm_cassette import llm_cassette
+from .metrics import metrics
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 class PerplexityService:
     def __init__(self):
         self.api_key = os.getenv('PERPLEXITY_API_KEY', 'pplx-dummy-key')
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = os.getenv('PERPLEXITY_API_BASE', 'https://api.perplexity.ai').rstrip('/') + "/chat/completions"
         self.model = "llama-3.1-sonar-small-128k-online"
         
         self.headers = {
@@ -17,7 +23,52 @@ class PerplexityService:
             "Content-Type": "application/json"
         }
         
-        print(f"🔧 Perplexity configurado com modelo: {self.model}")
+        logger.info(f"Perplexity configurado com modelo: {self.model}")
+    
+    def _completar(self, mensagens: List[Dict[str, str]], temperature: float, max_tokens: int,
+                   tipo_prompt: str = 'explicacao') -> str:
+        """Chamada única à API do Perplexity; levanta erro se a resposta não for 200"""
+        pedido = {
+            "model": self.model,
+            "messages": mensagens,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        with tracer.span('llm.perplexity', prompt_type=tipo_prompt, model=self.model) as span:
+            resposta = metrics.medir_llm(
+                'perplexity', tipo_prompt,
+                lambda: llm_cassette.executar('perplexity', pedido, lambda: self._chamar_api(pedido))
+            )
+            if span is not None:
+                span.atributos.update(resposta.get('usage') or {})
+        return resposta['content']
+    
+    def _chamar_api(self, pedido: Dict[str, Any]) -> Dict[str, Any]:
+        """Requisição real à API; retorna o texto e o consumo de tokens"""
+        response = requests.post(self.base_url, headers=self.headers, json=pedido, timeout=30)
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro na API Perplexity: {response.status_code} - {response.text}")
+        data = response.json()
+        usage = data.get('usage') or {}
+        return {
+            'content': data.get('choices', [{}])[0].get('message', {}).get('content', '').strip(),
+            'usage': {
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0)
+            }
+        }
+    
+    def gerar_explicacao(self, prompt: str, tipo_prompt: str = 'explicacao') -> str:
+        """Gera explicação/macetes para uma questão; erros sobem para o fallback do chamador"""
+        return self._completar(
+            [
+                {"role": "system", "content": "Você é um tutor especializado em concursos públicos brasileiros."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=800,
+            tipo_prompt=tipo_prompt
+        )
     
     def gerar_feedback_erro(self, questao: str, alternativa_escolhida: str, 
                            alternativa_correta: str, tema: str) -> Optional[Dict[str, Any]]:
@@ -50,39 +101,26 @@ class PerplexityService:
             Responda em formato JSON com as chaves: explicacao_erro, conceitos_importantes, fontes_estudo, dicas
             """
             
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": "Você é um tutor especializado em concursos públicos brasileiros."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 1000
-                },
-                timeout=30
+            content = self._completar(
+                [
+                    {"role": "system", "content": "Você é um tutor especializado em concursos públicos brasileiros."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=1000
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                
-                # Tentar extrair JSON da resposta
-                feedback_data = self._extrair_json_resposta(content)
-                
-                if feedback_data:
-                    return feedback_data
-                else:
-                    # Fallback: criar feedback estruturado manualmente
-                    return self._gerar_feedback_fallback(tema, alternativa_escolhida, alternativa_correta)
+            # Tentar extrair JSON da resposta
+            feedback_data = self._extrair_json_resposta(content)
+            
+            if feedback_data:
+                return feedback_data
             else:
-                print(f"❌ Erro na API Perplexity: {response.status_code} - {response.text}")
+                # Fallback: criar feedback estruturado manualmente
                 return self._gerar_feedback_fallback(tema, alternativa_escolhida, alternativa_correta)
                 
         except Exception as e:
-            print(f"❌ Erro ao gerar feedback: {e}")
+            logger.error(f"Erro ao gerar feedback: {e}")
             return self._gerar_feedback_fallback(tema, alternativa_escolhida, alternativa_correta)
     
     def pesquisar_conteudo(self, tema: str) -> Optional[str]:
@@ -98,30 +136,16 @@ class PerplexityService:
         try:
             prompt = f"Forneça informações atualizadas e precisas sobre: {tema}"
             
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.2,
-                    "max_tokens": 800
-                },
-                timeout=30
+            return self._completar(
+                [
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                max_tokens=800
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                content = data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                return content.strip()
-            else:
-                print(f"❌ Erro na pesquisa Perplexity: {response.status_code}")
-                return self._gerar_conteudo_fallback(tema)
                 
         except Exception as e:
-            print(f"❌ Erro na pesquisa: {e}")
+            logger.error(f"Erro na pesquisa: {e}")
             return self._gerar_conteudo_fallback(tema)
     
     def _gerar_feedback_fallback(self, tema: str, alternativa_escolhida: str, alternativa_correta: str) -> Dict[str, Any]:
@@ -195,20 +219,21 @@ class PerplexityService:
     
     def _extrair_json_resposta(self, resposta: str) -> Optional[Dict[str, Any]]:
         """Extrai JSON da resposta da API"""
-        try:
-            # Tentar encontrar JSON na resposta
-            import re
-            json_match = re.search(r'\{.*\}', resposta, re.DOTALL)
-            
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            else:
-                return None
+        with tracer.span('json.extrair', provider='perplexity', chars=len(resposta or '')):
+            try:
+                # Tentar encontrar JSON na resposta
+                import re
+                json_match = re.search(r'\{.*\}', resposta, re.DOTALL)
                 
-        except Exception as e:
-            print(f"❌ Erro ao extrair JSON: {e}")
-            return None
+                if json_match:
+                    json_str = json_match.group()
+                    return json.loads(json_str)
+                else:
+                    return None
+                    
+            except Exception as e:
+                logger.error(f"Erro ao extrair JSON: {e}")
+                return None
 
 # Instância global do serviço
 perplexity_service = PerplexityService()
@@ -1,6 +1,8 @@
+import logging
 from datetime import datetime, timedelta
-from firebase_admin import firestore
-from ..config.firebase_config import firebase_config
+from ..services.firestore_repository import firestore_repository
+
+logger = logging.getLogger(__name__)
 
 class PlanoService:
     """Serviço para gerenciamento de planos de usuário"""
@@ -133,8 +135,10 @@ class PlanoService:
         }
     }
     
-    def __init__(self):
-        self.db = firebase_config.get_db() if firebase_config.is_connected() else None
+    @property
+    def db(self):
+        """Cliente do Firestore obtido da camada central de acesso"""
+        return firestore_repository.db
     
     def obter_plano_usuario(self, user_id):
         """Obtém o plano atual do usuário"""
@@ -142,27 +146,25 @@ class PlanoService:
             if not self.db:
                 return self._plano_padrao()
             
-            user_doc = self.db.collection('usuarios').document(user_id).get()
-            if not user_doc.exists:
+            user_data = firestore_repository.obter_usuario(user_id)
+            if not user_data:
                 return self._plano_padrao()
             
-            user_data = user_doc.to_dict()
             plano_info = user_data.get('plano', {})
             
-            # Verificar se o plano ainda está válido
+            # Plano vencido vale como gratuito; a gravação fica com a varredura
+            # de expiração (expirar_planos_vencidos), fora do caminho de leitura
             if self._plano_expirado(plano_info):
-                # Plano expirado, reverter para gratuito
-                self._reverter_plano_gratuito(user_id)
                 return self._plano_padrao()
             
             return plano_info
             
         except Exception as e:
-            print(f"Erro ao obter plano do usuário: {e}")
+            logger.error(f"Erro ao obter plano do usuário: {e}")
             return self._plano_padrao()
     
-    def ativar_plano(self, user_id, tipo_plano, metodo_pagamento=None):
-        """Ativa um plano para o usuário"""
+    def ativar_plano(self, user_id, tipo_plano, metodo_pagamento=None, pagamento_id=None):
+        """Ativa um plano para o usuário (pagamento_id identifica a cobrança que o ativou)"""
         try:
             if tipo_plano not in self.TIPOS_PLANOS.values():
                 raise ValueError(f"Tipo de plano inválido: {tipo_plano}")
@@ -182,12 +184,14 @@ class PlanoService:
                 'metodo_pagamento': metodo_pagamento,
                 'pode_renovar': self.RENOVACAO_PLANOS.get(tipo_plano, False)
             }
+            if pagamento_id:
+                plano_info['pagamento_id'] = str(pagamento_id)
             
             if not self.db:
                 return plano_info
             
             # Atualizar no Firestore
-            self.db.collection('usuarios').document(user_id).update({
+            firestore_repository.atualizar_usuario(user_id, {
                 'plano': plano_info,
                 'data_ultima_atualizacao': datetime.now().isoformat()
             })
@@ -198,7 +202,7 @@ class PlanoService:
             return plano_info
             
         except Exception as e:
-            print(f"Erro ao ativar plano: {e}")
+            logger.error(f"Erro ao ativar plano: {e}")
             raise e
     
     def verificar_acesso_recurso(self, user_id, recurso):
@@ -211,7 +215,7 @@ class PlanoService:
             return recursos.get(recurso, False)
             
         except Exception as e:
-            print(f"Erro ao verificar acesso ao recurso: {e}")
+            logger.error(f"Erro ao verificar acesso ao recurso: {e}")
             return False
     
     def obter_limite_questoes(self, user_id):
@@ -228,7 +232,7 @@ class PlanoService:
                 return None  # Ilimitado
                 
         except Exception as e:
-            print(f"Erro ao obter limite de questões: {e}")
+            logger.error(f"Erro ao obter limite de questões: {e}")
             return 3  # Padrão gratuito
     
     def _plano_padrao(self):
@@ -242,7 +246,7 @@ class PlanoService:
             'pode_renovar': False
         }
     
-    def _plano_expirado(self, plano_info):
+    def _plano_expirado(self, plano_info, agora=None):
         """Verifica se um plano está expirado"""
         if not plano_info.get('ativo', False):
             return True
@@ -253,7 +257,7 @@ class PlanoService:
         
         try:
             data_expiracao = datetime.fromisoformat(data_expiracao_str.replace('Z', '+00:00'))
-            return datetime.now() > data_expiracao
+            return (agora or datetime.now()) > data_expiracao
         except:
             return True  # Se não conseguir parsear, considerar expirado
     
@@ -274,27 +278,51 @@ class PlanoService:
             if not self.db:
                 return False
             
-            historico = self.db.collection('historico_planos').where('user_id', '==', user_id).where('tipo_plano', '==', 'promo').limit(1).get()
-            return len(historico) > 0
+            return firestore_repository.usuario_ja_usou_plano(user_id, 'promo')
             
         except Exception as e:
-            print(f"Erro ao verificar uso do plano promo: {e}")
+            logger.error(f"Erro ao verificar uso do plano promo: {e}")
             return False
     
-    def _reverter_plano_gratuito(self, user_id):
-        """Reverte o usuário para o plano gratuito"""
-        try:
-            if not self.db:
-                return
-            
-            plano_gratuito = self._plano_padrao()
-            self.db.collection('usuarios').document(user_id).update({
-                'plano': plano_gratuito,
+    def expirar_planos_vencidos(self, tamanho_lote=200, agora=None):
+        """Reverte para gratuito os planos vencidos, em lotes; retorna quantos foram revertidos
+
+        Consulta só os usuários com plano.data_expiracao já passada (custo
+        proporcional aos planos vencendo, não às leituras). Cada página é
+        regravada numa transação que relê os documentos: um plano renovado
+        entre a consulta e a escrita não é revertido.
+        """
+        if not self.db:
+            return 0
+        agora = agora or datetime.now()
+        revertidos = 0
+        ultimo = None
+        while True:
+            pagina = firestore_repository.listar_planos_vencidos(agora.isoformat(), tamanho_lote, apos=ultimo)
+            if not pagina:
+                break
+            ultimo = pagina[-1]
+            referencias = [firestore_repository.usuario_ref(doc.id) for doc in pagina]
+            revertidos += firestore_repository.executar_transacao(self._reverter_lote, referencias, agora)
+            if len(pagina) < tamanho_lote:
+                break
+        return revertidos
+
+    def _reverter_lote(self, transacao, referencias, agora):
+        """Grava o plano gratuito nos documentos do lote cujo plano ainda está vencido"""
+        revertidos = 0
+        for doc in transacao.get_all(referencias):
+            if not doc.exists:
+                continue
+            plano_info = (doc.to_dict() or {}).get('plano') or {}
+            if not self._plano_expirado(plano_info, agora):
+                continue
+            transacao.update(firestore_repository.usuario_ref(doc.id), {
+                'plano': self._plano_padrao(),
                 'data_ultima_atualizacao': datetime.now().isoformat()
             })
-            
-        except Exception as e:
-            print(f"Erro ao reverter para plano gratuito: {e}")
+            revertidos += 1
+        return revertidos
     
     def listar_planos(self):
         """Lista todos os planos disponíveis"""
@@ -341,7 +369,7 @@ class PlanoService:
             return planos
             
         except Exception as e:
-            print(f"Erro ao listar planos: {e}")
+            logger.error(f"Erro ao listar planos: {e}")
             return []
     
     def _registrar_historico_plano(self, user_id, plano_info):
@@ -356,13 +384,14 @@ class PlanoService:
                 'data_ativacao': plano_info['data_ativacao'],
                 'data_expiracao': plano_info.get('data_expiracao'),
                 'metodo_pagamento': plano_info.get('metodo_pagamento'),
+                'pagamento_id': plano_info.get('pagamento_id'),
                 'data_registro': datetime.now().isoformat()
             }
             
-            self.db.collection('historico_planos').add(historico)
+            firestore_repository.registrar_historico_plano(historico)
             
         except Exception as e:
-            print(f"Erro ao registrar histórico de plano: {e}")
+            logger.error(f"Erro ao registrar histórico de plano: {e}")
 
 # Instância global do serviço de planos
 plano_service = PlanoService()
\ No newline at end of file
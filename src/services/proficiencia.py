@@ -0,0 +1,329 @@
+"""
+Proficiência adaptativa: ratings Elo/Rasch de usuários (por tópico) e questões
+
+Modelo de Rasch (IRT 1PL) na escala logit: a chance de acerto do usuário com
+habilidade θ numa questão de dificuldade b é 1 / (1 + e^-(θ - b)).
+
+- On-line (O(1) por resposta): θ += K·(acertou - p) e b -= K·(acertou - p),
+  com K decrescente no número de respostas de cada lado (estimativas novas
+  se movem rápido, as estáveis pouco). Cabe na escrita que /responder já faz.
+- Em lote (recalibrar): ajuste MAP conjunto de todos os θ e b com os logs de
+  respostas (as questões fora do banco com b fixo em 0), com NumPy quando
+  instalado.
+
+Armazenamento compacto:
+- usuarios/{id}.proficiencia = {topico_id: [θ, respostas]}
+- banco_questoes/{id}: dificuldade_irt (b), respostas_irt e o rótulo
+  dificuldade (facil/medio/dificil) derivado de b
+
+A seleção do banco busca, nos tópicos pedidos, a questão com b mais próximo
+de θ - logit(ALVO_ACERTO): onde a resposta traz mais informação, o que reduz
+o número de questões até uma estimativa confiável.
+
+Uso:
+    python -m src.services.proficiencia --simular
+    python -m src.services.proficiencia --iteracoes 30
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .catalogo_edital import catalogo_edital
+from .firestore_repository import firestore_repository
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dependência opcional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Dificuldade inicial (logits) pelo rótulo da questão
+DIFICULDADE_ROTULO = {'facil': -1.0, 'medio': 0.0, 'dificil': 1.0}
+
+# Rótulo a partir de b: abaixo de -LIMIAR_ROTULO é fácil, acima de LIMIAR_ROTULO é difícil
+LIMIAR_ROTULO = 0.5
+
+# Passo do Elo: K_INICIAL / (1 + K_DECAIMENTO · respostas), nunca abaixo de K_MINIMO
+K_INICIAL = 0.8
+K_DECAIMENTO = 0.05
+K_MINIMO = 0.1
+
+# Chance de acerto visada na seleção (0.5 = máxima informação no modelo de Rasch)
+ALVO_ACERTO = 0.5
+
+# θ e b ficam em [-LIMITE_ESCALA, LIMITE_ESCALA]
+LIMITE_ESCALA = 4.0
+
+# Variância da priori N(0, σ²) no ajuste em lote (evita ±∞ para quem acerta ou erra tudo)
+VARIANCIA_PRIORI = 1.0
+
+TAMANHO_LOTE = 500
+
+
+def probabilidade(habilidade: float, dificuldade: float) -> float:
+    return 1.0 / (1.0 + math.exp(dificuldade - habilidade))
+
+
+def passo(respostas: int) -> float:
+    return max(K_MINIMO, K_INICIAL / (1.0 + K_DECAIMENTO * respostas))
+
+
+def rotulo(dificuldade: float) -> str:
+    if dificuldade < -LIMIAR_ROTULO:
+        return 'facil'
+    if dificuldade > LIMIAR_ROTULO:
+        return 'dificil'
+    return 'medio'
+
+
+def _limitar(valor: float) -> float:
+    return max(-LIMITE_ESCALA, min(LIMITE_ESCALA, valor))
+
+
+def dificuldade_questao(questao: Dict[str, Any]) -> Tuple[float, int]:
+    """(b, respostas) da questão; sem rating ainda, b vem do rótulo"""
+    if 'dificuldade_irt' in questao:
+        return questao['dificuldade_irt'], questao.get('respostas_irt', 0)
+    return DIFICULDADE_ROTULO.get(questao.get('dificuldade'), 0.0), 0
+
+
+def habilidade(dados_usuario: Optional[Dict[str, Any]], topico_id: str) -> Tuple[float, int]:
+    """(θ, respostas) do usuário no tópico; (0, 0) se nunca respondeu"""
+    valor = ((dados_usuario or {}).get('proficiencia') or {}).get(topico_id)
+    if not valor:
+        return 0.0, 0
+    return float(valor[0]), int(valor[1])
+
+
+def nivel_geral(dados_usuario: Optional[Dict[str, Any]], topico_ids=None) -> Optional[float]:
+    """θ médio (ponderado pelas respostas) nos tópicos dados ou em todos; None sem respostas"""
+    proficiencia = (dados_usuario or {}).get('proficiencia') or {}
+    pares = [proficiencia[t] for t in (topico_ids if topico_ids is not None else proficiencia) if t in proficiencia]
+    total = sum(n for _, n in pares)
+    if not total:
+        return None
+    return sum(theta * n for theta, n in pares) / total
+
+
+def dificuldade_alvo(habilidade_usuario: float) -> float:
+    """b em que a chance de acerto do usuário é ALVO_ACERTO"""
+    return habilidade_usuario - math.log(ALVO_ACERTO / (1 - ALVO_ACERTO))
+
+
+def atualizar(dados_usuario: Optional[Dict[str, Any]], topico_id: str, acertou: bool,
+              questao: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Passo Elo de uma resposta: (campos do usuário, campos da questão ou None)
+
+    Não grava nada: os campos do usuário entram no set(merge=True) que
+    /responder já faz, e os da questão (só do banco) num update à parte.
+    """
+    theta, n_usuario = habilidade(dados_usuario, topico_id)
+    b, n_questao = dificuldade_questao(questao or {})
+    erro = (1.0 if acertou else 0.0) - probabilidade(theta, b)
+
+    campos_usuario = {'proficiencia': {topico_id: [round(_limitar(theta + passo(n_usuario) * erro), 4),
+                                                   n_usuario + 1]}}
+    campos_questao = None
+    if questao is not None:
+        novo_b = round(_limitar(b - passo(n_questao) * erro), 4)
+        campos_questao = {'dificuldade_irt': novo_b, 'respostas_irt': n_questao + 1,
+                          'dificuldade': rotulo(novo_b)}
+    return campos_usuario, campos_questao
+
+
+def selecionar_questao(dados_usuario: Optional[Dict[str, Any]], topico_ids: List[str],
+                       excluir=()) -> Optional[Dict[str, Any]]:
+    """Questão dos tópicos com dificuldade mais próxima da ideal para o nível do usuário neles"""
+    nivel = nivel_geral(dados_usuario, topico_ids)
+    questoes = firestore_repository.questoes_banco_por_dificuldade(
+        topico_ids, dificuldade_alvo(nivel if nivel is not None else 0.0), excluir=excluir
+    )
+    return questoes[0] if questoes else None
+
+
+# ----------------------------------------------------------------------
+# Recalibração em lote
+# ----------------------------------------------------------------------
+
+# Índice do item que representa as questões fora do banco (geradas por IA): b fixo em 0,
+# como no passo on-line, que não conhece a dificuldade delas
+ITEM_FIXO = 0
+
+
+def _coletar() -> Tuple[List[Tuple[str, str]], List[Optional[str]], List[int], List[int], List[float],
+                        Dict[Tuple[str, str], int]]:
+    """Todas as respostas dos logs com tópico conhecido
+
+    Retorna (pares usuário/tópico, questões — a primeira é ITEM_FIXO —, índice
+    do par, índice da questão, acertos, respostas já gravadas por par).
+    """
+    db = firestore_repository.db
+    pessoas: Dict[Tuple[str, str], int] = {}
+    itens: Dict[Optional[str], int] = {None: ITEM_FIXO}
+    topico_da_questao: Dict[str, Optional[str]] = {}
+    topico_do_tema: Dict[Tuple[str, Optional[str], Optional[str]], Optional[str]] = {}
+    guardadas: Dict[Tuple[str, str], int] = {}
+    idx_pessoa: List[int] = []
+    idx_item: List[int] = []
+    acertos: List[float] = []
+
+    consulta_usuarios = db.collection('usuarios').select(['cargo', 'bloco', 'proficiencia'])
+    for usuarios in firestore_repository.iterar_paginas(consulta_usuarios, TAMANHO_LOTE):
+        for usuario in usuarios:
+            dados = usuario.to_dict() or {}
+            for topico_id, (_, n) in (dados.get('proficiencia') or {}).items():
+                guardadas[(usuario.id, topico_id)] = int(n)
+            consulta = firestore_repository.respostas_ref(usuario.id).select(['questao_id', 'acertou', 'tema'])
+            for respostas in firestore_repository.iterar_paginas(consulta, TAMANHO_LOTE):
+                respostas = [doc.to_dict() for doc in respostas]
+                do_banco = {r.get('questao_id') for r in respostas
+                            if str(r.get('questao_id') or '').startswith('b_')}
+                novas = list(do_banco - topico_da_questao.keys())
+                if novas:
+                    encontradas = firestore_repository.obter_questoes_banco(novas)
+                    for questao_id in novas:
+                        topico_da_questao[questao_id] = (encontradas.get(questao_id) or {}).get('topico_id')
+                for resposta in respostas:
+                    questao_id = resposta.get('questao_id')
+                    if questao_id in do_banco:
+                        topico_id = topico_da_questao.get(questao_id)
+                        item = questao_id if topico_id else None
+                    else:
+                        # Mesmo critério do /responder: tema resolvido no cargo/bloco do usuário
+                        chave = (resposta.get('tema'), dados.get('cargo'), dados.get('bloco'))
+                        if chave not in topico_do_tema:
+                            topico = catalogo_edital.resolver_topico(*chave) if chave[0] else None
+                            topico_do_tema[chave] = topico.id if topico else None
+                        topico_id = topico_do_tema[chave]
+                        item = None
+                    if topico_id is None:
+                        continue
+                    idx_pessoa.append(pessoas.setdefault((usuario.id, topico_id), len(pessoas)))
+                    idx_item.append(itens.setdefault(item, len(itens)))
+                    acertos.append(1.0 if resposta.get('acertou') else 0.0)
+    return list(pessoas), list(itens), idx_pessoa, idx_item, acertos, guardadas
+
+
+def _ajustar_numpy(n_pessoas, n_itens, idx_pessoa, idx_item, acertos, iteracoes):
+    pessoa = np.asarray(idx_pessoa, dtype=np.int64)
+    item = np.asarray(idx_item, dtype=np.int64)
+    y = np.asarray(acertos, dtype=np.float64)
+    theta = np.zeros(n_pessoas)
+    b = np.zeros(n_itens)
+    for _ in range(iteracoes):
+        # Um passo de Newton por parâmetro, alternando usuários e questões
+        p = 1.0 / (1.0 + np.exp(b[item] - theta[pessoa]))
+        gradiente = np.bincount(pessoa, weights=y - p, minlength=n_pessoas) - theta / VARIANCIA_PRIORI
+        curvatura = np.bincount(pessoa, weights=p * (1 - p), minlength=n_pessoas) + 1 / VARIANCIA_PRIORI
+        theta = np.clip(theta + gradiente / curvatura, -LIMITE_ESCALA, LIMITE_ESCALA)
+
+        p = 1.0 / (1.0 + np.exp(b[item] - theta[pessoa]))
+        gradiente = np.bincount(item, weights=p - y, minlength=n_itens) - b / VARIANCIA_PRIORI
+        curvatura = np.bincount(item, weights=p * (1 - p), minlength=n_itens) + 1 / VARIANCIA_PRIORI
+        b = np.clip(b + gradiente / curvatura, -LIMITE_ESCALA, LIMITE_ESCALA)
+        b[ITEM_FIXO] = 0.0
+    return theta.tolist(), b.tolist()
+
+
+def _ajustar_python(n_pessoas, n_itens, idx_pessoa, idx_item, acertos, iteracoes):
+    theta = [0.0] * n_pessoas
+    b = [0.0] * n_itens
+    for _ in range(iteracoes):
+        # Um passo de Newton por parâmetro, alternando usuários e questões
+        gradiente = [-v / VARIANCIA_PRIORI for v in theta]
+        curvatura = [1 / VARIANCIA_PRIORI] * n_pessoas
+        for j, i, y in zip(idx_pessoa, idx_item, acertos):
+            p = 1.0 / (1.0 + math.exp(b[i] - theta[j]))
+            gradiente[j] += y - p
+            curvatura[j] += p * (1 - p)
+        theta = [_limitar(v + g / c) for v, g, c in zip(theta, gradiente, curvatura)]
+
+        gradiente = [-v / VARIANCIA_PRIORI for v in b]
+        curvatura = [1 / VARIANCIA_PRIORI] * n_itens
+        for j, i, y in zip(idx_pessoa, idx_item, acertos):
+            p = 1.0 / (1.0 + math.exp(b[i] - theta[j]))
+            gradiente[i] += p - y
+            curvatura[i] += p * (1 - p)
+        b = [_limitar(v + g / c) for v, g, c in zip(b, gradiente, curvatura)]
+        b[ITEM_FIXO] = 0.0
+    return theta, b
+
+
+def recalibrar(iteracoes: int = 20, simular: bool = False) -> Dict[str, Any]:
+    """Reajusta θ e b com todas as respostas dos logs e grava os ratings; retorna o resumo
+
+    Respostas a questões fora do banco entram com b fixo em 0 (ITEM_FIXO),
+    então θ continua refletindo tudo o que o passo on-line já contou. O
+    número de respostas gravado nunca diminui.
+    """
+    db = firestore_repository.db
+    if db is None:
+        raise RuntimeError("Banco de dados não disponível")
+    inicio = time.perf_counter()
+    pessoas, itens, idx_pessoa, idx_item, acertos, guardadas = _coletar()
+    ajustar = _ajustar_numpy if np is not None else _ajustar_python
+    theta, b = ajustar(len(pessoas), len(itens), idx_pessoa, idx_item, acertos, iteracoes)
+
+    respostas_pessoa = [0] * len(pessoas)
+    respostas_item = [0] * len(itens)
+    for j, i in zip(idx_pessoa, idx_item):
+        respostas_pessoa[j] += 1
+        respostas_item[i] += 1
+
+    if not simular:
+        lote = db.batch()
+        for indice, questao_id in enumerate(itens):
+            if indice == ITEM_FIXO:
+                continue
+            lote.update(db.collection('banco_questoes').document(questao_id), {
+                'dificuldade_irt': round(b[indice], 4),
+                'respostas_irt': respostas_item[indice],
+                'dificuldade': rotulo(b[indice]),
+            })
+            if len(lote) >= TAMANHO_LOTE:
+                lote.commit()
+                lote = db.batch()
+        por_usuario: Dict[str, Dict[str, Any]] = {}
+        for indice, (usuario_id, topico_id) in enumerate(pessoas):
+            respostas = max(respostas_pessoa[indice], guardadas.get((usuario_id, topico_id), 0))
+            por_usuario.setdefault(usuario_id, {})[f'proficiencia.{topico_id}'] = [round(theta[indice], 4), respostas]
+        for usuario_id, campos in por_usuario.items():
+            lote.update(firestore_repository.usuario_ref(usuario_id), campos)
+            if len(lote) >= TAMANHO_LOTE:
+                lote.commit()
+                lote = db.batch()
+        if len(lote):
+            lote.commit()
+
+    resumo = {
+        'respostas': len(acertos),
+        'usuarios_topicos': len(pessoas),
+        'questoes': len(itens) - 1,
+        'iteracoes': iteracoes,
+        'numpy': np is not None,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+    logger.info("Ratings recalibrados", extra={'campos': resumo})
+    return resumo
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Recalibra os ratings de usuários e questões do banco')
+    parser.add_argument('--iteracoes', type=int, default=20, help='passos de Newton alternados')
+    parser.add_argument('--simular', action='store_true', help='ajusta sem gravar')
+    args = parser.parse_args(argv)
+
+    from ..config.logging_config import configurar_logging
+    configurar_logging()
+
+    print(json.dumps(recalibrar(args.iteracoes, args.simular), ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Profiling sob demanda: amostragem de CPU e tracemalloc por requisição
+
+Desligado por padrão (PROFILING_ENABLED=false). Ligado, uma requisição a uma
+rota selecionada (PROFILING_PATHS) é perfilada quando:
+
+- traz o cabeçalho X-Profile assinado com PROFILING_SECRET
+  (`<timestamp>.<hmac-sha256 de "<timestamp>:<path>">`, válido por 5 minutos), ou
+- cai na fração PROFILING_SAMPLE_RATE (0 a 1) do tráfego
+
+Durante a requisição uma thread amostra a pilha da thread que a atende a cada
+PROFILING_INTERVAL_MS e o tracemalloc compara snapshots do início e do fim.
+Os resultados são acumulados por endpoint em PROFILING_DIR:
+
+- <endpoint>.folded: pilhas no formato "folded" (flamegraph.pl, speedscope, inferno)
+- <endpoint>.alloc.txt: maiores origens de alocação (arquivo:linha)
+
+O tracemalloc só fica ligado enquanto houver requisição perfilada em andamento;
+com requisições simultâneas as alocações de uma aparecem na diferença da outra.
+"""
+import fnmatch
+import hashlib
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+CABECALHO_PROFILE = 'X-Profile'
+VALIDADE_ASSINATURA_S = 300
+MAXIMO_ALOCACOES = 30
+
+# Rotas mais pesadas: geração de questões, dashboards e jogos
+ROTAS_PADRAO = '/api/questoes/gerar,/api/questoes/dashboard/*,/api/jogos/iniciar/*,/api/jogos/jogada'
+
+
+def assinar(segredo: str, caminho: str, timestamp: Optional[int] = None) -> str:
+    """Valor do cabeçalho X-Profile para o caminho (usado por quem dispara o profiling)"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    assinatura = hmac.new(segredo.encode('utf-8'), f"{timestamp}:{caminho}".encode('utf-8'), hashlib.sha256)
+    return f"{timestamp}.{assinatura.hexdigest()}"
+
+
+def _nome_quadro(quadro) -> str:
+    codigo = quadro.f_code
+    modulo = quadro.f_globals.get('__name__') or os.path.basename(codigo.co_filename)
+    return f"{modulo}:{codigo.co_name}"
+
+
+class _AmostradorCPU:
+    """Thread única que amostra as pilhas das threads com requisição perfilada"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._alvos: Dict[int, Counter] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.intervalo = 0.005
+
+    def iniciar(self, thread_id: int):
+        with self._lock:
+            self._alvos[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='profiler-cpu', daemon=True)
+                self._thread.start()
+
+    def parar(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._alvos.pop(thread_id, Counter())
+
+    def _executar(self):
+        while True:
+            with self._lock:
+                if not self._alvos:
+                    self._thread = None
+                    return
+                quadros = sys._current_frames()
+                for thread_id, pilhas in self._alvos.items():
+                    quadro = quadros.get(thread_id)
+                    if quadro is None:
+                        continue
+                    pilha = []
+                    while quadro is not None:
+                        pilha.append(_nome_quadro(quadro))
+                        quadro = quadro.f_back
+                    pilhas[';'.join(reversed(pilha))] += 1
+            time.sleep(self.intervalo)
+
+
+class ProfilerRequisicoes:
+    """Decide quais requisições perfilar e acumula os resultados por endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._amostrador = _AmostradorCPU()
+        self._ativas = 0
+        self._pilhas: Dict[str, Counter] = {}
+        self._alocacoes: Dict[str, Dict[str, List[int]]] = {}
+        self.configurar(
+            habilitado=os.getenv('PROFILING_ENABLED', 'false').lower() == 'true',
+            segredo=os.getenv('PROFILING_SECRET', ''),
+            taxa_amostragem=float(os.getenv('PROFILING_SAMPLE_RATE', '0')),
+            rotas=os.getenv('PROFILING_PATHS', ROTAS_PADRAO),
+            diretorio=os.getenv('PROFILING_DIR', 'profiles'),
+            intervalo_ms=float(os.getenv('PROFILING_INTERVAL_MS', '5')),
+        )
+
+    def configurar(self, habilitado: bool = False, segredo: str = '', taxa_amostragem: float = 0.0,
+                   rotas: str = ROTAS_PADRAO, diretorio: str = 'profiles', intervalo_ms: float = 5.0):
+        """Troca a configuração em tempo de execução (benchmarks, testes)"""
+        self.habilitado = habilitado
+        self.segredo = segredo
+        self.taxa_amostragem = min(max(taxa_amostragem, 0.0), 1.0)
+        self.rotas = [rota.strip() for rota in rotas.split(',') if rota.strip()]
+        self.diretorio = diretorio
+        self._amostrador.intervalo = max(intervalo_ms, 1.0) / 1000
+
+    # ------------------------------------------------------------------
+    # Seleção
+    # ------------------------------------------------------------------
+
+    def _assinatura_valida(self, valor: str, caminho: str) -> bool:
+        if not self.segredo or '.' not in valor:
+            return False
+        timestamp, _, _ = valor.partition('.')
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > VALIDADE_ASSINATURA_S:
+            return False
+        return hmac.compare_digest(valor, assinar(self.segredo, caminho, int(timestamp)))
+
+    def deve_perfilar(self, caminho: str, cabecalho: Optional[str]) -> bool:
+        if not self.habilitado or not any(fnmatch.fnmatch(caminho, rota) for rota in self.rotas):
+            return False
+        if cabecalho:
+            return self._assinatura_valida(cabecalho, caminho)
+        return self.taxa_amostragem > 0 and random.random() < self.taxa_amostragem
+
+    # ------------------------------------------------------------------
+    # Coleta
+    # ------------------------------------------------------------------
+
+    def iniciar(self) -> Tuple[int, tracemalloc.Snapshot]:
+        with self._lock:
+            self._ativas += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(int(os.getenv('PROFILING_TRACEMALLOC_FRAMES', '1')))
+        snapshot = tracemalloc.take_snapshot()
+        thread_id = threading.get_ident()
+        self._amostrador.iniciar(thread_id)
+        return thread_id, snapshot
+
+    def finalizar(self, endpoint: str, thread_id: int, snapshot_inicial: tracemalloc.Snapshot):
+        pilhas = self._amostrador.parar(thread_id)
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diferencas = tracemalloc.take_snapshot().filter_traces(filtros).compare_to(
+            snapshot_inicial.filter_traces(filtros), 'lineno')
+        with self._lock:
+            self._ativas -= 1
+            if not self._ativas:
+                tracemalloc.stop()
+            self._pilhas.setdefault(endpoint, Counter()).update(pilhas)
+            alocacoes = self._alocacoes.setdefault(endpoint, {})
+            for diferenca in diferencas:
+                if diferenca.size_diff <= 0:
+                    continue
+                origem = str(diferenca.traceback[0]) if diferenca.traceback else '?'
+                total = alocacoes.setdefault(origem, [0, 0])
+                total[0] += diferenca.size_diff
+                total[1] += max(diferenca.count_diff, 0)
+            self._gravar(endpoint)
+
+    def _gravar(self, endpoint: str):
+        """Reescreve os arquivos acumulados do endpoint (chamado com o lock)"""
+        nome = endpoint.replace('/', '_')
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._substituir(os.path.join(self.diretorio, f"{nome}.folded"), [
+                f"{pilha} {contagem}" for pilha, contagem in self._pilhas[endpoint].most_common()
+            ])
+            maiores = sorted(self._alocacoes[endpoint].items(), key=lambda item: item[1][0], reverse=True)
+            self._substituir(os.path.join(self.diretorio, f"{nome}.alloc.txt"), [
+                f"{tamanho / 1024:10.1f} KiB {quantidade:8d} blocos  {origem}"
+                for origem, (tamanho, quantidade) in maiores[:MAXIMO_ALOCACOES]
+            ])
+        except OSError as e:
+            logger.warning(f"Erro ao gravar profiling de {endpoint}: {e}")
+
+    @staticmethod
+    def _substituir(caminho: str, linhas: List[str]):
+        temporario = f"{caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('\n'.join(linhas) + '\n')
+        os.replace(temporario, caminho)
+
+    def resumo(self) -> Dict[str, Dict[str, int]]:
+        """Amostras de CPU e origens de alocação acumuladas por endpoint"""
+        with self._lock:
+            return {
+                endpoint: {'amostras_cpu': sum(pilhas.values()), 'origens_alocacao': len(self._alocacoes.get(endpoint, {}))}
+                for endpoint, pilhas in self._pilhas.items()
+            }
+
+    # ------------------------------------------------------------------
+    # Flask
+    # ------------------------------------------------------------------
+
+    def init_app(self, app):
+        """Liga o profiling às rotas selecionadas (sem custo quando desligado)"""
+
+        @app.before_request
+        def _iniciar_profiling():
+            if self.deve_perfilar(request.path, request.headers.get(CABECALHO_PROFILE)):
+                g._profiling = self.iniciar()
+
+        @app.after_request
+        def _marcar_profiling(response):
+            if g.get('_profiling') is not None:
+                response.headers['X-Profiled'] = 'true'
+            return response
+
+        @app.teardown_request
+        def _finalizar_profiling(_erro=None):
+            estado = g.pop('_profiling', None)
+            if estado is not None:
+                self.finalizar(request.endpoint or 'desconhecido', *estado)
+
+
+# Instância global do profiler
+profiler = ProfilerRequisicoes()
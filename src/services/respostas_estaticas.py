@@ -0,0 +1,119 @@
+"""
+Respostas pré-computadas dos catálogos estáticos (planos, opções, matérias, notícias)
+
+Rotas marcadas com @respostas_estaticas.imutavel têm o corpo montado uma vez
+por caminho (e por formato: JSON ou msgpack), na inicialização via
+pre_aquecer ou no primeiro acesso. Junto com o corpo ficam:
+
+- as versões gzip/brotli no nível máximo de compressão
+- um ETag forte (hash do corpo; cada codificação tem o seu sufixo)
+- Cache-Control público com CATALOG_CACHE_MAX_AGE segundos
+
+Requisições com If-None-Match de um ETag conhecido recebem 304 sem corpo;
+as demais recebem os bytes prontos, sem executar a rota nem recomprimir.
+"""
+import hashlib
+import logging
+import os
+import threading
+from functools import wraps
+from typing import Any, Dict, Iterable, Tuple
+
+from flask import current_app, request
+
+from .compressao import compressao
+from .json_provider import MIMETYPE_MSGPACK, prefere_msgpack
+
+logger = logging.getLogger(__name__)
+
+# Caminhos inexistentes (ex.: cargo digitado errado) não devem crescer o cache sem limite
+LIMITE_ENTRADAS = 2048
+
+
+class RespostasEstaticas:
+    """Cache de corpos prontos, com ETag e variantes comprimidas"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.max_age = int(os.getenv('CATALOG_CACHE_MAX_AGE', '300'))
+
+    @staticmethod
+    def _chave() -> Tuple[str, str]:
+        # Sem a query string: as rotas imutáveis não a usam
+        return request.path, MIMETYPE_MSGPACK if prefere_msgpack() else 'application/json'
+
+    def _montar(self, response) -> Dict[str, Any]:
+        corpo = response.get_data()
+        digest = hashlib.sha256(corpo).hexdigest()[:32]
+        entrada = {
+            'mimetype': response.mimetype,
+            'headers': [(nome, valor) for nome, valor in response.headers
+                        if nome.lower() not in ('content-length', 'content-type', 'content-encoding')],
+            'corpos': {'identity': corpo},
+            'etags': {'identity': digest},
+        }
+        if len(corpo) >= compressao.tamanho_minimo:
+            for codificacao in compressao.codificacoes_disponiveis():
+                entrada['corpos'][codificacao] = compressao.comprimir(corpo, codificacao, maximo=True)
+                entrada['etags'][codificacao] = f"{digest}-{codificacao}"
+        return entrada
+
+    def _servir(self, entrada: Dict[str, Any]):
+        codificacao = compressao.codificacao_aceita() if compressao.habilitado else None
+        if codificacao not in entrada['corpos']:
+            codificacao = None
+        etag = entrada['etags'][codificacao or 'identity']
+
+        response = current_app.response_class(mimetype=entrada['mimetype'])
+        for nome, valor in entrada['headers']:
+            response.headers.add(nome, valor)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        response.vary.add('Accept-Encoding')
+
+        # Qualquer codificação do mesmo conteúdo valida o cache do cliente
+        if any(request.if_none_match.contains(valor) for valor in entrada['etags'].values()) \
+                or request.if_none_match.star_tag:
+            response.status_code = 304
+            return response
+        compressao.aplicar(response, entrada['corpos'][codificacao or 'identity'], codificacao)
+        return response
+
+    def imutavel(self, view):
+        """Marca uma rota GET cujo corpo só depende do caminho"""
+
+        @wraps(view)
+        def _envolvida(*args, **kwargs):
+            chave = self._chave()
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entrada = self._montar(response)
+                with self._lock:
+                    if len(self._entradas) < LIMITE_ENTRADAS:
+                        self._entradas[chave] = entrada
+            return self._servir(entrada)
+
+        return _envolvida
+
+    def pre_aquecer(self, app, caminhos: Iterable[str]):
+        """Monta as respostas dos catálogos na inicialização"""
+        for caminho in caminhos:
+            with app.test_request_context(caminho):
+                try:
+                    app.view_functions[request.endpoint](**request.view_args)
+                except Exception as e:
+                    logger.warning(f"Falha ao pré-computar {caminho}: {e}")
+
+    def limpar(self):
+        """Descarta os corpos prontos (ex.: depois de recarregar o catálogo)"""
+        with self._lock:
+            self._entradas.clear()
+
+
+# Instância global das respostas pré-computadas
+respostas_estaticas = RespostasEstaticas()
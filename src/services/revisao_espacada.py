@@ -0,0 +1,126 @@
+"""
+Revisão espaçada (SM-2) das questões respondidas
+
+Cada questão errada vira um cartão em usuarios/{id}/revisoes/{questao_id};
+as respostas seguintes à mesma questão reagendam o cartão pelo SM-2:
+
+- qualidade 0..5 da resposta: erro → 1; acerto → 5, 4 ou 3 conforme o tempo
+- erro (qualidade < 3): repetições voltam a 0 e a revisão é no dia seguinte
+- acerto: intervalo de 1 dia, depois 6, depois intervalo × facilidade
+- facilidade (EF) começa em 2.5, nunca fica abaixo de 1.3
+
+A atualização é incremental (uma leitura e uma escrita por resposta) e
+proxima_revisao é o campo de ordenação da fila: "o que revisar agora" é uma
+consulta por faixa no índice desse campo, que lê só os itens devolvidos.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from .firestore_repository import firestore_repository
+from .log_respostas import TAMANHO_MAXIMO_TEXTO
+
+logger = logging.getLogger(__name__)
+
+FACILIDADE_INICIAL = 2.5
+FACILIDADE_MINIMA = 1.3
+
+# Intervalos (dias) das duas primeiras repetições corretas
+PRIMEIRO_INTERVALO = 1
+SEGUNDO_INTERVALO = 6
+
+# Tempo de resposta (segundos) até o qual o acerto conta como fácil / normal
+TEMPO_FACIL = 30
+TEMPO_NORMAL = 90
+
+
+def qualidade(acertou: bool, tempo_resposta: Optional[float] = None) -> int:
+    """Nota SM-2 (0..5) de uma resposta a partir do acerto e do tempo gasto"""
+    if not acertou:
+        return 1
+    tempo = tempo_resposta or 0
+    if tempo and tempo <= TEMPO_FACIL:
+        return 5
+    if not tempo or tempo <= TEMPO_NORMAL:
+        return 4
+    return 3
+
+
+def reagendar(cartao: Optional[Dict[str, Any]], nota: int, agora: datetime) -> Dict[str, Any]:
+    """Novo estado do cartão após uma resposta com a nota dada (cartão None: primeiro contato)"""
+    cartao = dict(cartao or {})
+    repeticoes = cartao.get('repeticoes', 0)
+    intervalo = cartao.get('intervalo_dias', 0)
+    facilidade = cartao.get('facilidade', FACILIDADE_INICIAL)
+
+    if nota < 3:
+        repeticoes = 0
+        intervalo = PRIMEIRO_INTERVALO
+    else:
+        repeticoes += 1
+        if repeticoes == 1:
+            intervalo = PRIMEIRO_INTERVALO
+        elif repeticoes == 2:
+            intervalo = SEGUNDO_INTERVALO
+        else:
+            intervalo = round(intervalo * facilidade)
+    facilidade = max(FACILIDADE_MINIMA, facilidade + 0.1 - (5 - nota) * (0.08 + (5 - nota) * 0.02))
+
+    cartao.update({
+        'repeticoes': repeticoes,
+        'intervalo_dias': intervalo,
+        'facilidade': round(facilidade, 3),
+        'ultima_revisao': agora,
+        'proxima_revisao': agora + timedelta(days=intervalo),
+        'acertos': cartao.get('acertos', 0) + (1 if nota >= 3 else 0),
+        'erros': cartao.get('erros', 0) + (1 if nota < 3 else 0),
+    })
+    return cartao
+
+
+def registrar(usuario_id: str, questao_id: str, acertou: bool, tempo_resposta: Optional[float] = None,
+              questao: Optional[str] = None, tema: Optional[str] = None,
+              agora: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """Atualiza a fila do usuário com uma resposta; retorna o cartão (None se não entrou na fila)
+
+    Acertos de questões que não estão na fila não criam cartão: só o que o
+    usuário já errou é agendado.
+    """
+    if not firestore_repository.is_connected() or not questao_id:
+        return None
+    agora = agora or datetime.now(timezone.utc)
+    cartao = firestore_repository.obter_revisao(usuario_id, questao_id)
+    if cartao is None and acertou:
+        return None
+    cartao = reagendar(cartao, qualidade(acertou, tempo_resposta), agora)
+    if questao:
+        cartao['questao'] = questao[:TAMANHO_MAXIMO_TEXTO]
+    if tema:
+        cartao['tema'] = tema
+    cartao.setdefault('criado_em', agora)
+    firestore_repository.salvar_revisao(usuario_id, questao_id, cartao)
+    return cartao
+
+
+def pendentes(usuario_id: str, limite: int, agora: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Cartões vencidos do usuário, os mais atrasados primeiro"""
+    agora = agora or datetime.now(timezone.utc)
+    return firestore_repository.listar_revisoes_pendentes(usuario_id, agora, limite)
+
+
+def para_resposta(cartao: Dict[str, Any], agora: datetime) -> Dict[str, Any]:
+    """Formato do /revisao (datas em ISO 8601)"""
+    proxima = cartao.get('proxima_revisao')
+    atraso = (agora - proxima).total_seconds() / 86400 if isinstance(proxima, datetime) else 0
+    return {
+        'questao_id': cartao.get('questao_id'),
+        'questao': cartao.get('questao'),
+        'tema': cartao.get('tema'),
+        'repeticoes': cartao.get('repeticoes', 0),
+        'intervalo_dias': cartao.get('intervalo_dias', 0),
+        'facilidade': cartao.get('facilidade', FACILIDADE_INICIAL),
+        'acertos': cartao.get('acertos', 0),
+        'erros': cartao.get('erros', 0),
+        'proxima_revisao': proxima.isoformat() if isinstance(proxima, datetime) else proxima,
+        'dias_em_atraso': round(max(atraso, 0), 1),
+    }
@@ -0,0 +1,252 @@
+"""
+Rastreamento (tracing) de requisições: Flask → Firestore → LLM
+
+Cada requisição recebe um X-Request-ID (o do cliente é reaproveitado) e, se
+amostrada, um trace com spans aninhados:
+
+- a própria requisição (span raiz, com endpoint e status)
+- cada chamada ao Firestore, a partir do wrapper do cliente
+- cada chamada aos LLMs e cada extração de JSON das respostas
+- blocos marcados com `with tracer.span('nome'):`
+
+Os traces são gravados localmente, sem coletor externo:
+
+- TRACE_EXPORTER=jsonl: um span por linha (fácil de filtrar com jq)
+- TRACE_EXPORTER=chrome: Trace Event Format, abre em chrome://tracing ou Perfetto
+
+TRACE_SAMPLE_RATE (0 a 1) define a fração de requisições rastreadas; a decisão
+usa o hash do request ID, então a mesma requisição é sempre (ou nunca) amostrada.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+EXPORTADORES = ('jsonl', 'chrome')
+CABECALHO_REQUEST_ID = 'X-Request-ID'
+TAMANHO_MAXIMO_REQUEST_ID = 128
+
+
+class Span:
+    """Intervalo de tempo nomeado dentro de um trace"""
+
+    __slots__ = ('nome', 'span_id', 'pai_id', 'inicio', 'duracao', 'atributos', 'thread')
+
+    def __init__(self, nome: str, pai_id: Optional[str], inicio: float, atributos: Dict[str, Any]):
+        self.nome = nome
+        self.span_id = uuid.uuid4().hex[:16]
+        self.pai_id = pai_id
+        self.inicio = inicio
+        self.duracao = 0.0
+        self.atributos = atributos
+        self.thread = threading.get_ident()
+
+
+class Trace:
+    """Spans de uma requisição amostrada"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.spans: List[Span] = []
+        self.pilha: List[Span] = []
+
+    @property
+    def span_atual(self) -> Optional[Span]:
+        return self.pilha[-1] if self.pilha else None
+
+
+_trace_atual: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('trace_atual', default=None)
+
+
+_ORIGEM_RELOGIO = time.time()
+_ORIGEM_CONTADOR = time.perf_counter()
+
+
+def _agora() -> float:
+    """Instante atual em segundos desde a época (perf_counter ancorado no relógio)"""
+    return _ORIGEM_RELOGIO + (time.perf_counter() - _ORIGEM_CONTADOR)
+
+
+class Tracer:
+    """Cria traces por requisição e exporta os spans para arquivo local"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.configurar(
+            taxa_amostragem=float(os.getenv('TRACE_SAMPLE_RATE', '0')),
+            exportador=os.getenv('TRACE_EXPORTER', 'jsonl'),
+            arquivo=os.getenv('TRACE_FILE', ''),
+        )
+
+    def configurar(self, taxa_amostragem: float = 0.0, exportador: str = 'jsonl', arquivo: str = ''):
+        """Troca a amostragem/exportador em tempo de execução (benchmarks, testes)"""
+        exportador = (exportador or 'jsonl').strip().lower()
+        if exportador not in EXPORTADORES:
+            raise ValueError(f"TRACE_EXPORTER inválido: {exportador} (opções: {', '.join(EXPORTADORES)})")
+        with self._lock:
+            self.taxa_amostragem = min(max(taxa_amostragem, 0.0), 1.0)
+            self.exportador = exportador
+            self.arquivo = arquivo or os.path.join('traces', 'traces.jsonl' if exportador == 'jsonl' else 'trace.json')
+
+    # ------------------------------------------------------------------
+    # Traces e spans
+    # ------------------------------------------------------------------
+
+    def amostrar(self, request_id: str) -> bool:
+        """Decisão determinística de amostragem a partir do request ID"""
+        if self.taxa_amostragem <= 0:
+            return False
+        if self.taxa_amostragem >= 1:
+            return True
+        return zlib.crc32(request_id.encode('utf-8')) / 0xFFFFFFFF < self.taxa_amostragem
+
+    def iniciar_trace(self, request_id: str) -> Optional[Trace]:
+        """Ativa um trace no contexto atual se o request ID for amostrado"""
+        trace = Trace(request_id) if self.amostrar(request_id) else None
+        _trace_atual.set(trace)
+        return trace
+
+    def encerrar_trace(self) -> Optional[Trace]:
+        """Desativa o trace do contexto atual e exporta os spans"""
+        trace = _trace_atual.get()
+        _trace_atual.set(None)
+        if trace is not None and trace.spans:
+            self.exportar(trace)
+        return trace
+
+    @property
+    def ativo(self) -> bool:
+        return _trace_atual.get() is not None
+
+    def abrir_span(self, nome: str, **atributos) -> Optional[Span]:
+        trace = _trace_atual.get()
+        if trace is None:
+            return None
+        pai = trace.span_atual
+        span = Span(nome, pai.span_id if pai else None, _agora(), atributos)
+        trace.spans.append(span)
+        trace.pilha.append(span)
+        return span
+
+    def fechar_span(self, span: Optional[Span], **atributos):
+        trace = _trace_atual.get()
+        if span is None or trace is None:
+            return
+        span.duracao = _agora() - span.inicio
+        span.atributos.update(atributos)
+        if span in trace.pilha:
+            trace.pilha.remove(span)
+
+    @contextmanager
+    def span(self, nome: str, **atributos):
+        """Span aninhado ao span atual; sem trace ativo não faz nada"""
+        span = self.abrir_span(nome, **atributos)
+        try:
+            yield span
+        except Exception as e:
+            if span is not None:
+                span.atributos['erro'] = type(e).__name__
+            raise
+        finally:
+            self.fechar_span(span)
+
+    def registrar_span(self, nome: str, duracao: float, **atributos):
+        """Registra um span já concluído (terminado agora e com a duração medida)"""
+        trace = _trace_atual.get()
+        if trace is None:
+            return
+        pai = trace.span_atual
+        span = Span(nome, pai.span_id if pai else None, _agora() - duracao, atributos)
+        span.duracao = duracao
+        trace.spans.append(span)
+
+    # ------------------------------------------------------------------
+    # Exportação
+    # ------------------------------------------------------------------
+
+    def _linhas_jsonl(self, trace: Trace) -> List[str]:
+        return [json.dumps({
+            'request_id': trace.request_id,
+            'span_id': span.span_id,
+            'parent_id': span.pai_id,
+            'name': span.nome,
+            'start': round(span.inicio, 6),
+            'duration_ms': round(span.duracao * 1000, 3),
+            'attributes': span.atributos,
+        }, ensure_ascii=False, default=str) for span in trace.spans]
+
+    def _linhas_chrome(self, trace: Trace) -> List[str]:
+        # Eventos "X" (completos); o visualizador aceita o array sem o ']' final,
+        # o que permite acrescentar eventos ao arquivo sem reescrevê-lo
+        return [json.dumps({
+            'name': span.nome,
+            'cat': span.nome.split('.')[0],
+            'ph': 'X',
+            'ts': int(span.inicio * 1_000_000),
+            'dur': max(int(span.duracao * 1_000_000), 1),
+            'pid': os.getpid(),
+            'tid': span.thread,
+            'args': {'request_id': trace.request_id, **span.atributos},
+        }, ensure_ascii=False, default=str) + ',' for span in trace.spans]
+
+    def exportar(self, trace: Trace):
+        linhas = self._linhas_jsonl(trace) if self.exportador == 'jsonl' else self._linhas_chrome(trace)
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.arquivo) or '.', exist_ok=True)
+                novo = not os.path.exists(self.arquivo) or os.path.getsize(self.arquivo) == 0
+                with open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                    if novo and self.exportador == 'chrome':
+                        arquivo.write('[\n')
+                    arquivo.write('\n'.join(linhas) + '\n')
+        except OSError as e:
+            logger.warning(f"Erro ao exportar trace {trace.request_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Flask
+    # ------------------------------------------------------------------
+
+    def request_id_atual(self) -> Optional[str]:
+        return g.get('request_id')
+
+    def init_app(self, app):
+        """Gera/propaga o X-Request-ID e abre o span raiz de cada requisição"""
+
+        @app.before_request
+        def _iniciar_trace():
+            recebido = (request.headers.get(CABECALHO_REQUEST_ID) or '').strip()
+            g.request_id = recebido[:TAMANHO_MAXIMO_REQUEST_ID] or uuid.uuid4().hex
+            if self.iniciar_trace(g.request_id) is not None:
+                g._trace_span = self.abrir_span(
+                    'http.request', method=request.method, path=request.path)
+
+        @app.after_request
+        def _encerrar_trace(response):
+            request_id = g.get('request_id')
+            if request_id:
+                response.headers[CABECALHO_REQUEST_ID] = request_id
+            span = g.pop('_trace_span', None)
+            if span is not None:
+                self.fechar_span(span, endpoint=request.endpoint or 'desconhecido', status=response.status_code)
+            self.encerrar_trace()
+            return response
+
+        @app.teardown_request
+        def _descartar_trace(_erro=None):
+            # Exceções não tratadas pulam o after_request; o trace não vaza para a próxima requisição
+            if self.ativo:
+                self.encerrar_trace()
+
+
+# Instância global do tracer
+tracer = Tracer()
@@ -0,0 +1,39 @@
+"""
+Backends de armazenamento com a superfície do Firestore usada pela aplicação
+
+STORAGE_BACKEND escolhe o backend:
+- firestore (padrão): Firestore real, exige as credenciais do Firebase
+- memory: documentos em memória no processo
+- sqlite: documentos em um arquivo SQLite (SQLITE_PATH)
+"""
+import os
+
+from .document_store import DocumentStoreClient
+from .memory_backend import criar_cliente_memoria
+from .sqlite_backend import criar_cliente_sqlite
+
+BACKENDS_LOCAIS = ('memory', 'sqlite')
+
+
+def backend_configurado() -> str:
+    """Nome do backend escolhido em STORAGE_BACKEND"""
+    return os.getenv('STORAGE_BACKEND', 'firestore').strip().lower()
+
+
+def criar_backend_local(nome: str) -> DocumentStoreClient:
+    """Cria o cliente de um backend local (memory ou sqlite)"""
+    if nome == 'memory':
+        return criar_cliente_memoria()
+    if nome == 'sqlite':
+        return criar_cliente_sqlite()
+    raise ValueError(f"STORAGE_BACKEND desconhecido: {nome}")
+
+
+__all__ = [
+    'BACKENDS_LOCAIS',
+    'DocumentStoreClient',
+    'backend_configurado',
+    'criar_backend_local',
+    'criar_cliente_memoria',
+    'criar_cliente_sqlite',
+]
@@ -0,0 +1,520 @@
+"""
+Cliente de documentos com a mesma superfície do Firestore usada pela aplicação
+
+Implementa collection/document/get/set/update/delete, consultas com
+where/order_by/limit/offset/cursores, lotes e transações sobre um
+armazenamento simples de chave (coleção, id) -> dicionário. Os backends
+(memória, SQLite) fornecem apenas o armazenamento; a semântica do Firestore
+(merge, caminhos com ponto, Increment, SERVER_TIMESTAMP, ArrayUnion...) fica aqui.
+"""
+import copy
+import functools
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+ASCENDENTE = 'ASCENDING'
+DESCENDENTE = 'DESCENDING'
+
+# Caminho especial do ID do documento (FieldPath.document_id() no Firestore)
+ID_DOCUMENTO = '__name__'
+
+# Ordem entre tipos diferentes, como no Firestore
+_ORDEM_TIPOS = (
+    (type(None), 0),
+    (bool, 1),
+    (int, 2),
+    (float, 2),
+    (datetime, 3),
+    (str, 4),
+    (bytes, 5),
+    (list, 7),
+    (dict, 8),
+)
+
+_AUSENTE = object()
+
+
+class DocumentStore:
+    """Armazenamento base: os backends implementam ler, listar e aplicar"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def ler(self, colecao: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def listar(self, colecao: str, igualdades: List[Tuple[str, Any]]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """Documentos da coleção; os filtros de igualdade podem ser usados como pré-filtro"""
+        raise NotImplementedError
+
+    def aplicar(self, operacoes: List[Tuple[str, str, Optional[Dict[str, Any]]]]):
+        """Grava atomicamente (coleção, id, dados); dados None exclui o documento"""
+        raise NotImplementedError
+
+    @contextmanager
+    def bloqueio(self):
+        """Serializa transações e lotes"""
+        with self._lock:
+            yield
+
+
+# ----------------------------------------------------------------------
+# Valores e caminhos de campo
+# ----------------------------------------------------------------------
+
+def _partes(caminho: str) -> List[str]:
+    return caminho.split('.')
+
+
+def _obter_campo(dados: Dict[str, Any], caminho: str, doc_id: Optional[str] = None):
+    if caminho == ID_DOCUMENTO and doc_id is not None:
+        return doc_id
+    atual = dados
+    for parte in _partes(caminho):
+        if not isinstance(atual, dict) or parte not in atual:
+            return _AUSENTE
+        atual = atual[parte]
+    return atual
+
+
+def _aplicar_valor(atual, valor):
+    """Resolve transformações (Increment, SERVER_TIMESTAMP, ArrayUnion...) contra o valor atual"""
+    if valor is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(valor, transforms.Increment):
+        if isinstance(atual, (int, float)) and not isinstance(atual, bool):
+            return atual + valor.value
+        return valor.value
+    if isinstance(valor, transforms.Maximum):
+        if isinstance(atual, (int, float)) and not isinstance(atual, bool):
+            return max(atual, valor.value)
+        return valor.value
+    if isinstance(valor, transforms.Minimum):
+        if isinstance(atual, (int, float)) and not isinstance(atual, bool):
+            return min(atual, valor.value)
+        return valor.value
+    if isinstance(valor, transforms.ArrayUnion):
+        lista = list(atual) if isinstance(atual, list) else []
+        for item in valor.values:
+            if item not in lista:
+                lista.append(item)
+        return lista
+    if isinstance(valor, transforms.ArrayRemove):
+        lista = list(atual) if isinstance(atual, list) else []
+        return [item for item in lista if item not in valor.values]
+    if isinstance(valor, dict):
+        base = atual if isinstance(atual, dict) else {}
+        return {chave: _aplicar_valor(base.get(chave, _AUSENTE), v) for chave, v in valor.items()
+                if v is not transforms.DELETE_FIELD}
+    return copy.deepcopy(valor)
+
+
+def _definir_campo(dados: Dict[str, Any], partes: List[str], valor):
+    atual = dados
+    for parte in partes[:-1]:
+        if not isinstance(atual.get(parte), dict):
+            atual[parte] = {}
+        atual = atual[parte]
+    if valor is transforms.DELETE_FIELD:
+        atual.pop(partes[-1], None)
+    else:
+        atual[partes[-1]] = _aplicar_valor(atual.get(partes[-1], _AUSENTE), valor)
+
+
+def _mesclar(destino: Dict[str, Any], origem: Dict[str, Any]):
+    """set(merge=True): mapas aninhados são mesclados campo a campo"""
+    for chave, valor in origem.items():
+        if isinstance(valor, dict) and isinstance(destino.get(chave), dict):
+            _mesclar(destino[chave], valor)
+        else:
+            _definir_campo(destino, [chave], valor)
+
+
+def _rank(valor) -> int:
+    for tipo, rank in _ORDEM_TIPOS:
+        if isinstance(valor, tipo):
+            return rank
+    return 9
+
+
+def _chave_valor(valor):
+    rank = _rank(valor)
+    if isinstance(valor, datetime) and valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    if rank in (0, 7, 8):
+        return (rank, repr(valor))
+    return (rank, valor)
+
+
+def _comparar_valores(a, b) -> int:
+    ka, kb = _chave_valor(a), _chave_valor(b)
+    if ka[0] != kb[0]:
+        return -1 if ka[0] < kb[0] else 1
+    return (ka[1] > kb[1]) - (ka[1] < kb[1])
+
+
+def _iguais(a, b) -> bool:
+    return _rank(a) == _rank(b) and _comparar_valores(a, b) == 0
+
+
+def _atende(valor, operador: str, alvo) -> bool:
+    if valor is _AUSENTE:
+        return False
+    if operador == '==':
+        return _iguais(valor, alvo)
+    if operador == '!=':
+        return not _iguais(valor, alvo)
+    if operador == 'in':
+        return any(_iguais(valor, item) for item in alvo)
+    if operador == 'not-in':
+        return not any(_iguais(valor, item) for item in alvo)
+    if operador == 'array-contains':
+        return isinstance(valor, list) and any(_iguais(item, alvo) for item in valor)
+    if operador == 'array-contains-any':
+        return isinstance(valor, list) and any(_iguais(item, a) for item in valor for a in alvo)
+    # Desigualdades só comparam valores do mesmo tipo
+    if _rank(valor) != _rank(alvo):
+        return False
+    comparacao = _comparar_valores(valor, alvo)
+    return {
+        '<': comparacao < 0,
+        '<=': comparacao <= 0,
+        '>': comparacao > 0,
+        '>=': comparacao >= 0,
+    }[operador]
+
+
+# ----------------------------------------------------------------------
+# Snapshots e referências
+# ----------------------------------------------------------------------
+
+class DocumentSnapshot:
+    """Snapshot imutável de um documento"""
+
+    def __init__(self, reference: 'DocumentReference', dados: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self._dados = dados
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._dados is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._dados) if self._dados is not None else None
+
+    def get(self, campo: str):
+        if self._dados is None:
+            return None
+        valor = _obter_campo(self._dados, campo)
+        if valor is _AUSENTE:
+            raise KeyError(campo)
+        return copy.deepcopy(valor)
+
+
+class DocumentReference:
+    """Referência a um documento (coleção, id)"""
+
+    def __init__(self, cliente: 'DocumentStoreClient', colecao: str, doc_id: str):
+        self._cliente = cliente
+        self._caminho_colecao = colecao
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self._caminho_colecao}/{self.id}"
+
+    @property
+    def parent(self) -> 'CollectionReference':
+        return CollectionReference(self._cliente, self._caminho_colecao)
+
+    def collection(self, nome: str) -> 'CollectionReference':
+        return CollectionReference(self._cliente, f"{self.path}/{nome}")
+
+    def get(self, field_paths=None, transaction=None) -> DocumentSnapshot:
+        dados = self._cliente._store.ler(self._caminho_colecao, self.id)
+        snapshot = DocumentSnapshot(self, dados)
+        if field_paths and dados is not None:
+            snapshot = DocumentSnapshot(self, _projetar(dados, field_paths))
+        return snapshot
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        return self._cliente._escrever([('set', self, document_data, merge)])
+
+    def create(self, document_data: Dict[str, Any]):
+        return self._cliente._escrever([('create', self, document_data, False)])
+
+    def update(self, field_updates: Dict[str, Any]):
+        return self._cliente._escrever([('update', self, field_updates, False)])
+
+    def delete(self):
+        return self._cliente._escrever([('delete', self, None, False)])
+
+    def __eq__(self, outro):
+        return isinstance(outro, DocumentReference) and outro.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def _projetar(dados: Dict[str, Any], campos: Iterable[str]) -> Dict[str, Any]:
+    projetado: Dict[str, Any] = {}
+    for campo in campos:
+        valor = _obter_campo(dados, campo)
+        if valor is not _AUSENTE:
+            _definir_campo(projetado, _partes(campo), valor)
+    return projetado
+
+
+class Query:
+    """Consulta imutável: cada chamada de filtro retorna uma nova consulta"""
+
+    ASCENDING = ASCENDENTE
+    DESCENDING = DESCENDENTE
+
+    def __init__(self, cliente: 'DocumentStoreClient', colecao: str, filtros=(), ordem=(),
+                 limite=None, deslocamento=0, projecao=None, inicio=None, fim=None):
+        self._cliente = cliente
+        self._colecao = colecao
+        self._filtros = tuple(filtros)
+        self._ordem = tuple(ordem)
+        self._limite = limite
+        self._deslocamento = deslocamento
+        self._projecao = projecao
+        self._inicio = inicio
+        self._fim = fim
+
+    def _copiar(self, **alteracoes) -> 'Query':
+        atributos = dict(
+            filtros=self._filtros, ordem=self._ordem, limite=self._limite,
+            deslocamento=self._deslocamento, projecao=self._projecao,
+            inicio=self._inicio, fim=self._fim,
+        )
+        atributos.update(alteracoes)
+        return Query(self._cliente, self._colecao, **atributos)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copiar(filtros=self._filtros + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDENTE):
+        return self._copiar(ordem=self._ordem + ((field_path, direction),))
+
+    def limit(self, count: int):
+        return self._copiar(limite=count)
+
+    def offset(self, num_to_skip: int):
+        return self._copiar(deslocamento=num_to_skip)
+
+    def select(self, field_paths: Iterable[str]):
+        return self._copiar(projecao=tuple(field_paths))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copiar(inicio=(self._cursor(document_fields_or_snapshot), True))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copiar(inicio=(self._cursor(document_fields_or_snapshot), False))
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._copiar(fim=(self._cursor(document_fields_or_snapshot), True))
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._copiar(fim=(self._cursor(document_fields_or_snapshot), False))
+
+    def _cursor(self, origem) -> Tuple[List[Any], Optional[str]]:
+        """Valores dos campos de ordenação (e id do documento, quando é um snapshot)"""
+        if isinstance(origem, DocumentSnapshot):
+            dados = origem.to_dict() or {}
+            return [_obter_campo(dados, campo, origem.id) for campo, _ in self._ordem], origem.id
+        if isinstance(origem, dict):
+            valores = [origem.get(campo, _AUSENTE) for campo, _ in self._ordem]
+            # Como no Firestore, o ID pode vir como string ou referência
+            return [v.id if isinstance(v, DocumentReference) else v for v in valores], None
+        return list(origem), None
+
+    def _comparar(self, a: Tuple[List[Any], Optional[str]], b: Tuple[List[Any], Optional[str]]) -> int:
+        for (valor_a, valor_b), (_, direcao) in zip(zip(a[0], b[0]), self._ordem):
+            comparacao = _comparar_valores(valor_a, valor_b)
+            if comparacao:
+                return -comparacao if direcao == DESCENDENTE else comparacao
+        if a[1] is None or b[1] is None:
+            return 0
+        return (a[1] > b[1]) - (a[1] < b[1])
+
+    def _executar(self, transaction=None) -> List[DocumentSnapshot]:
+        igualdades = [(campo, valor) for campo, operador, valor in self._filtros if operador == '==']
+        candidatos = []
+        for doc_id, dados in self._cliente._store.listar(self._colecao, igualdades):
+            if not all(_atende(_obter_campo(dados, campo, doc_id), operador, valor) for campo, operador, valor in self._filtros):
+                continue
+            # Documentos sem o campo de ordenação ficam fora do resultado, como no Firestore
+            valores = [_obter_campo(dados, campo, doc_id) for campo, _ in self._ordem]
+            if any(valor is _AUSENTE for valor in valores):
+                continue
+            candidatos.append(((valores, doc_id), dados))
+
+        candidatos.sort(key=functools.cmp_to_key(lambda x, y: self._comparar(x[0], y[0])))
+
+        if self._inicio is not None:
+            cursor, inclusivo = self._inicio
+            candidatos = [c for c in candidatos
+                          if self._comparar(c[0], cursor) > 0 or (inclusivo and self._comparar(c[0], cursor) == 0)]
+        if self._fim is not None:
+            cursor, inclusivo = self._fim
+            candidatos = [c for c in candidatos
+                          if self._comparar(c[0], cursor) < 0 or (inclusivo and self._comparar(c[0], cursor) == 0)]
+
+        candidatos = candidatos[self._deslocamento:]
+        if self._limite is not None:
+            candidatos = candidatos[:self._limite]
+
+        resultado = []
+        for (_, doc_id), dados in candidatos:
+            if self._projecao is not None:
+                dados = _projetar(dados, self._projecao)
+            resultado.append(DocumentSnapshot(DocumentReference(self._cliente, self._colecao, doc_id), dados))
+        return resultado
+
+    def get(self, transaction=None) -> List[DocumentSnapshot]:
+        return self._executar(transaction)
+
+    def stream(self, transaction=None) -> Iterator[DocumentSnapshot]:
+        yield from self._executar(transaction)
+
+
+class CollectionReference(Query):
+    """Referência a uma coleção (ou subcoleção)"""
+
+    def __init__(self, cliente: 'DocumentStoreClient', caminho: str):
+        super().__init__(cliente, caminho)
+
+    @property
+    def id(self) -> str:
+        return self._colecao.split('/')[-1]
+
+    def document(self, document_id: Optional[str] = None) -> DocumentReference:
+        return DocumentReference(self._cliente, self._colecao, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        referencia = self.document(document_id)
+        referencia.create(document_data)
+        return datetime.now(timezone.utc), referencia
+
+
+# ----------------------------------------------------------------------
+# Lotes e transações
+# ----------------------------------------------------------------------
+
+class WriteBatch:
+    """Acumula escritas e aplica todas de uma vez no commit"""
+
+    def __init__(self, cliente: 'DocumentStoreClient'):
+        self._cliente = cliente
+        self._operacoes = []
+
+    def set(self, reference: DocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._operacoes.append(('set', reference, document_data, merge))
+        return self
+
+    def create(self, reference: DocumentReference, document_data: Dict[str, Any]):
+        self._operacoes.append(('create', reference, document_data, False))
+        return self
+
+    def update(self, reference: DocumentReference, field_updates: Dict[str, Any]):
+        self._operacoes.append(('update', reference, field_updates, False))
+        return self
+
+    def delete(self, reference: DocumentReference):
+        self._operacoes.append(('delete', reference, None, False))
+        return self
+
+    def __len__(self):
+        return len(self._operacoes)
+
+    def commit(self):
+        operacoes, self._operacoes = self._operacoes, []
+        return self._cliente._escrever(operacoes)
+
+
+class Transaction(WriteBatch):
+    """Transação: leituras diretas, escritas aplicadas no final por executar_transacao"""
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, DocumentReference):
+            return ref_or_query.get()
+        return ref_or_query.stream()
+
+    def get_all(self, references):
+        return self._cliente.get_all(references)
+
+
+# ----------------------------------------------------------------------
+# Cliente
+# ----------------------------------------------------------------------
+
+class DocumentStoreClient:
+    """Cliente compatível com a parte do google.cloud.firestore.Client usada pela aplicação"""
+
+    def __init__(self, store: DocumentStore):
+        self._store = store
+
+    def collection(self, caminho: str) -> CollectionReference:
+        return CollectionReference(self, caminho.strip('/'))
+
+    def document(self, caminho: str) -> DocumentReference:
+        colecao, _, doc_id = caminho.strip('/').rpartition('/')
+        return DocumentReference(self, colecao, doc_id)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None) -> Iterator[DocumentSnapshot]:
+        for referencia in references:
+            yield referencia.get(field_paths=field_paths)
+
+    def executar_transacao(self, funcao, *args, **kwargs):
+        """Executa funcao(transacao, *args) de forma serializada e aplica as escritas ao final"""
+        with self._store.bloqueio():
+            transacao = Transaction(self)
+            resultado = funcao(transacao, *args, **kwargs)
+            transacao.commit()
+            return resultado
+
+    def _escrever(self, operacoes):
+        """Resolve set/create/update/delete contra o estado atual e grava atomicamente"""
+        agora = datetime.now(timezone.utc)
+        with self._store.bloqueio():
+            pendentes: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+            for tipo, referencia, dados, merge in operacoes:
+                chave = (referencia._caminho_colecao, referencia.id)
+                atual = pendentes[chave] if chave in pendentes else self._store.ler(*chave)
+                if tipo == 'delete':
+                    novo = None
+                elif tipo == 'create':
+                    if atual is not None:
+                        raise AlreadyExists(f"Documento já existe: {referencia.path}")
+                    novo = _aplicar_valor(_AUSENTE, dados)
+                elif tipo == 'update':
+                    if atual is None:
+                        raise NotFound(f"Documento não encontrado: {referencia.path}")
+                    novo = copy.deepcopy(atual)
+                    for campo, valor in dados.items():
+                        _definir_campo(novo, _partes(campo), valor)
+                elif merge:
+                    novo = copy.deepcopy(atual) if atual is not None else {}
+                    _mesclar(novo, dados)
+                else:
+                    novo = _aplicar_valor(_AUSENTE, dados)
+                pendentes[chave] = novo
+            self._store.aplicar([(colecao, doc_id, dados) for (colecao, doc_id), dados in pendentes.items()])
+        return [agora] * len(operacoes)
@@ -0,0 +1,47 @@
+"""
+Backend de armazenamento em memória
+
+Útil para testes de carga e profiling local sem credenciais do Firebase.
+Os dados vivem apenas no processo atual.
+"""
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from .document_store import DocumentStore, DocumentStoreClient
+
+
+class MemoryStore(DocumentStore):
+    """Documentos guardados em dicionários por caminho de coleção"""
+
+    def __init__(self):
+        super().__init__()
+        self._colecoes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def ler(self, colecao: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            dados = self._colecoes.get(colecao, {}).get(doc_id)
+            return copy.deepcopy(dados) if dados is not None else None
+
+    def listar(self, colecao: str, igualdades: List[Tuple[str, Any]]):
+        with self._lock:
+            # Snapshot da coleção: a consulta não enxerga escritas feitas durante a iteração
+            return list(self._colecoes.get(colecao, {}).items())
+
+    def aplicar(self, operacoes):
+        with self._lock:
+            for colecao, doc_id, dados in operacoes:
+                documentos = self._colecoes.setdefault(colecao, {})
+                if dados is None:
+                    documentos.pop(doc_id, None)
+                else:
+                    documentos[doc_id] = copy.deepcopy(dados)
+
+    def limpar(self):
+        """Remove todos os documentos"""
+        with self._lock:
+            self._colecoes.clear()
+
+
+def criar_cliente_memoria() -> DocumentStoreClient:
+    """Cria um cliente com a superfície do Firestore sobre um MemoryStore"""
+    return DocumentStoreClient(MemoryStore())
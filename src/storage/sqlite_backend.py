@@ -0,0 +1,134 @@
+"""
+Backend de armazenamento em SQLite
+
+Cada documento é uma linha (colecao, id, dados JSON). Filtros de igualdade
+são resolvidos com json_extract; o restante da consulta roda em Python.
+Seguro entre threads e entre processos (workers do gunicorn) via WAL e
+BEGIN IMMEDIATE.
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .document_store import DocumentStore, DocumentStoreClient
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    colecao TEXT NOT NULL,
+    id TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    PRIMARY KEY (colecao, id)
+)
+"""
+
+
+def _codificar(valor):
+    if isinstance(valor, datetime):
+        return {'__tipo__': 'datetime', 'valor': valor.isoformat()}
+    if isinstance(valor, bytes):
+        return {'__tipo__': 'bytes', 'valor': base64.b64encode(valor).decode('ascii')}
+    raise TypeError(f"Tipo não suportado: {type(valor).__name__}")
+
+
+def _decodificar(objeto):
+    tipo = objeto.get('__tipo__')
+    if tipo == 'datetime':
+        return datetime.fromisoformat(objeto['valor'])
+    if tipo == 'bytes':
+        return base64.b64decode(objeto['valor'])
+    return objeto
+
+
+def _serializar(dados: Dict[str, Any]) -> str:
+    return json.dumps(dados, default=_codificar, ensure_ascii=False)
+
+
+def _desserializar(texto: str) -> Dict[str, Any]:
+    return json.loads(texto, object_hook=_decodificar)
+
+
+class SQLiteStore(DocumentStore):
+    """Documentos persistidos em um arquivo SQLite"""
+
+    def __init__(self, caminho: str):
+        super().__init__()
+        self.caminho = caminho
+        self._local = threading.local()
+        with self._conexao() as conexao:
+            conexao.execute(_ESQUEMA)
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (e por processo, após fork)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+            self._local.profundidade = 0
+        return conexao
+
+    @contextmanager
+    def bloqueio(self):
+        with self._lock:
+            conexao = self._conexao()
+            externo = self._local.profundidade == 0
+            if externo:
+                conexao.execute('BEGIN IMMEDIATE')
+            self._local.profundidade += 1
+            try:
+                yield
+            except BaseException:
+                self._local.profundidade -= 1
+                if externo:
+                    conexao.execute('ROLLBACK')
+                raise
+            else:
+                self._local.profundidade -= 1
+                if externo:
+                    conexao.execute('COMMIT')
+
+    def ler(self, colecao: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        linha = self._conexao().execute(
+            'SELECT dados FROM documentos WHERE colecao = ? AND id = ?', (colecao, doc_id)
+        ).fetchone()
+        return _desserializar(linha[0]) if linha else None
+
+    def listar(self, colecao: str, igualdades: List[Tuple[str, Any]]):
+        sql = 'SELECT id, dados FROM documentos WHERE colecao = ?'
+        parametros: List[Any] = [colecao]
+        for campo, valor in igualdades:
+            # Apenas escalares simples vão para o SQL; a consulta refiltra tudo em Python
+            if isinstance(valor, (str, int, float)) and not isinstance(valor, bool):
+                sql += ' AND json_extract(dados, ?) = ?'
+                caminho_json = '$.' + '.'.join(f'"{parte}"' for parte in campo.split('.'))
+                parametros.extend([caminho_json, valor])
+        return [(doc_id, _desserializar(dados)) for doc_id, dados in self._conexao().execute(sql, parametros)]
+
+    def aplicar(self, operacoes):
+        with self.bloqueio():
+            conexao = self._conexao()
+            for colecao, doc_id, dados in operacoes:
+                if dados is None:
+                    conexao.execute('DELETE FROM documentos WHERE colecao = ? AND id = ?', (colecao, doc_id))
+                else:
+                    conexao.execute(
+                        'INSERT OR REPLACE INTO documentos (colecao, id, dados) VALUES (?, ?, ?)',
+                        (colecao, doc_id, _serializar(dados))
+                    )
+
+    def limpar(self):
+        """Remove todos os documentos"""
+        with self.bloqueio():
+            self._conexao().execute('DELETE FROM documentos')
+
+
+def criar_cliente_sqlite(caminho: Optional[str] = None) -> DocumentStoreClient:
+    """Cria um cliente com a superfície do Firestore sobre um arquivo SQLite (SQLITE_PATH)"""
+    return DocumentStoreClient(SQLiteStore(caminho or os.getenv('SQLITE_PATH', 'gabaritai.sqlite3')))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Testes do sorteio de tópicos ponderado pelos erros (tabela alias de Vose)
+
+Determinísticos: usam random.Random com semente fixa e o catálogo do edital
+do repositório.
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from src.services.amostrador_topicos import AmostradorTopicos, TabelaAlias
+from src.services.catalogo_edital import catalogo_edital
+
+BLOCO_DIVIDIDO = ('Enfermeiro', 'Bloco 1 - Seguridade Social')
+BLOCO_LISTA = ('Analista Cultural', 'Bloco 2 - Cultura e Educação')
+
+
+def _frequencias(tabela, sorteios, semente=42):
+    gerador = random.Random(semente)
+    contagem = Counter(tabela.sortear(gerador) for _ in range(sorteios))
+    return [contagem[i] / sorteios for i in range(len(tabela))]
+
+
+def test_frequencias_acompanham_os_pesos():
+    pesos = [1, 2, 3, 0.5, 10, 1 / 3]
+    total = sum(pesos)
+    for frequencia, peso in zip(_frequencias(TabelaAlias(pesos), 200000), pesos):
+        assert frequencia == pytest.approx(peso / total, abs=0.01)
+
+
+def test_peso_zero_nunca_sai_e_sobras_de_arredondamento():
+    # Pesos que não fecham exatamente em n na escala (sobras de arredondamento)
+    pesos = [0, 1 / 3, 0, 1 / 3, 1 / 3, 0]
+    frequencias = _frequencias(TabelaAlias(pesos), 30000)
+    assert frequencias[0] == frequencias[2] == frequencias[5] == 0
+    for i in (1, 3, 4):
+        assert frequencias[i] == pytest.approx(1 / 3, abs=0.02)
+
+
+def test_pesos_invalidos():
+    for pesos in ([], [0, 0]):
+        with pytest.raises(ValueError):
+            TabelaAlias(pesos)
+
+
+def test_sortear_devolve_topicos_distintos_mesmo_com_peso_concentrado():
+    amostrador = AmostradorTopicos()
+    amostrador.configurar(peso_erro=1000.0)
+    cargo, bloco = BLOCO_DIVIDIDO
+    topicos = catalogo_edital.topicos(cargo, bloco)
+    fraco = topicos[0]
+    gerador = random.Random(7)
+    vezes_fraco = 0
+    for _ in range(300):
+        escolhidos = amostrador.sortear('u1', cargo, bloco, erros_por_tema={fraco.nome: 5},
+                                        quantidade=3, gerador=gerador)
+        assert len(escolhidos) == 3
+        assert len({t.id for t in escolhidos}) == 3
+        vezes_fraco += fraco in escolhidos
+    assert vezes_fraco == 300
+
+    # Pedido maior que o bloco: todos os tópicos, sem repetir
+    escolhidos = amostrador.sortear('u1', cargo, bloco, quantidade=len(topicos) + 5, gerador=gerador)
+    assert sorted(t.id for t in escolhidos) == sorted(t.id for t in topicos)
+
+
+def test_bloco_dividido_respeita_tipo_de_conhecimento():
+    cargo, bloco = BLOCO_DIVIDIDO
+    gerais = {t.id for t in catalogo_edital.bloco(cargo, bloco).gerais}
+    escolhidos = AmostradorTopicos().sortear('u1', cargo, bloco, 'conhecimentos_gerais',
+                                             quantidade=3, gerador=random.Random(1))
+    assert escolhidos and {t.id for t in escolhidos} <= gerais
+
+
+def test_bloco_em_lista_simples_usa_todos_os_topicos():
+    cargo, bloco = BLOCO_LISTA
+    edital = catalogo_edital.bloco(cargo, bloco)
+    assert edital is not None and not edital.dividido
+    topicos = {t.id for t in edital.topicos()}
+    amostrador = AmostradorTopicos()
+    gerador = random.Random(3)
+    # O tipo de conhecimento é ignorado em blocos sem divisão
+    for tipo in ('todos', 'conhecimentos_gerais', 'conhecimentos_especificos'):
+        escolhidos = amostrador.sortear('u2', cargo, bloco, tipo, quantidade=len(topicos), gerador=gerador)
+        assert {t.id for t in escolhidos} == topicos
+    assert amostrador.sortear('u2', cargo, 'Bloco inexistente', gerador=gerador) == []
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main([__file__, '-q']))
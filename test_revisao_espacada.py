@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Testes do agendamento SM-2 da revisão espaçada
+
+Determinísticos: cada resposta acontece na data da revisão agendada pela
+anterior, a partir de uma data fixa.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.services.revisao_espacada import FACILIDADE_MINIMA, qualidade, reagendar
+
+INICIO = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _responder(notas):
+    """Aplica as notas em sequência; devolve os cartões após cada uma"""
+    cartao, agora, estados = None, INICIO, []
+    for nota in notas:
+        cartao = reagendar(cartao, nota, agora)
+        assert cartao['ultima_revisao'] == agora
+        assert cartao['proxima_revisao'] == agora + timedelta(days=cartao['intervalo_dias'])
+        estados.append(cartao)
+        agora = cartao['proxima_revisao']
+    return estados
+
+
+def test_intervalos_e_facilidade_ao_longo_das_respostas():
+    estados = _responder([5, 5, 5, 1, 4, 4, 3])
+    # (repetições, intervalo em dias, facilidade) após cada nota
+    esperado = [
+        (1, 1, 2.6),    # 1º acerto: 1 dia
+        (2, 6, 2.7),    # 2º acerto: 6 dias
+        (3, 16, 2.8),   # depois: round(6 × 2.7), com a facilidade anterior
+        (0, 1, 2.26),   # erro: repetições zeram, volta para 1 dia
+        (1, 1, 2.26),   # nota 4 não muda a facilidade
+        (2, 6, 2.26),
+        (3, 14, 2.12),  # round(6 × 2.26); nota 3 reduz a facilidade em 0.14
+    ]
+    for cartao, (repeticoes, intervalo, facilidade) in zip(estados, esperado):
+        assert cartao['repeticoes'] == repeticoes
+        assert cartao['intervalo_dias'] == intervalo
+        assert cartao['facilidade'] == pytest.approx(facilidade)
+    assert estados[-1]['acertos'] == 6
+    assert estados[-1]['erros'] == 1
+    assert estados[-1]['proxima_revisao'] == INICIO + timedelta(days=1 + 6 + 16 + 1 + 1 + 6 + 14)
+
+
+def test_facilidade_nunca_fica_abaixo_do_minimo():
+    estados = _responder([1, 1, 1, 1, 0])
+    assert [c['facilidade'] for c in estados] == pytest.approx([1.96, 1.42, 1.3, 1.3, 1.3])
+    assert min(c['facilidade'] for c in estados) >= FACILIDADE_MINIMA
+    assert all(c['repeticoes'] == 0 and c['intervalo_dias'] == 1 for c in estados)
+
+
+def test_qualidade_pelo_acerto_e_tempo():
+    assert qualidade(False, 5) == 1
+    assert qualidade(True, 10) == 5
+    assert qualidade(True, 60) == 4
+    assert qualidade(True, None) == 4
+    assert qualidade(True, 200) == 3
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main([__file__, '-q']))